@@ -0,0 +1,131 @@
+"""
+Benchmark de cold start da Lambda.
+
+Mede, em processos Python novos:
+  1. o custo de import de cada módulo ao carregar `lambda_function`
+     (equivalente a `python -X importtime`), e
+  2. o tempo de init + uma invocação do handler sem datas pendentes
+     (estado de ingestão simulado, sem acesso ao banco),
+e verifica que módulos pesados não são carregados nesse caminho.
+
+Uso:
+    python benchmarks/import_time.py [--top 20] [--json resultado.json]
+
+Sai com código 1 se algum orçamento for excedido.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamentos de cold start (ms), sobrescrevíveis por variável de ambiente
+IMPORT_BUDGET_MS = float(os.getenv("COLD_START_IMPORT_BUDGET_MS", "250"))
+ZERO_PENDING_BUDGET_MS = float(os.getenv("COLD_START_ZERO_PENDING_BUDGET_MS", "400"))
+
+# Módulos que não devem ser importados quando não há datas pendentes
+MODULOS_PESADOS = [
+    "boto3", "botocore", "pandas", "numpy", "openai", "langchain",
+    "langchain_openai", "requests", "pyarrow", "cryptography", "sentry_sdk",
+]
+
+_SCRIPT_ZERO_PENDENTES = """
+import json, sys, time
+inicio = time.perf_counter()
+import lambda_function
+import main
+main.ingestion_state.obter_datas_pendentes = lambda *args, **kwargs: []
+init_ms = (time.perf_counter() - inicio) * 1000
+lambda_function.lambda_handler({}, None)
+total_ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({
+    "init_ms": init_ms,
+    "total_ms": total_ms,
+    "modulos": sorted(m.split(".")[0] for m in sys.modules),
+}))
+"""
+
+
+def _ambiente():
+    env = dict(os.environ)
+    # Sentry e métricas ficam fora da medição do caminho da aplicação
+    env.pop("SENTRY_DSN", None)
+    env["METRICS_ENABLED"] = "false"
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def medir_imports(top):
+    """Executa `-X importtime` e retorna (total_ms, [(modulo, self_ms, cumulativo_ms)])."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import lambda_function"],
+        cwd=RAIZ, env=_ambiente(), capture_output=True, text=True, check=True
+    )
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        _, valores = linha.split(":", 1)
+        proprio, cumulativo, nome = valores.split("|")
+        modulos.append((nome.strip(), int(proprio) / 1000, int(cumulativo) / 1000))
+
+    total = next((cum for nome, _, cum in modulos if nome == "lambda_function"), 0.0)
+    modulos.sort(key=lambda m: m[2], reverse=True)
+    return total, modulos[:top]
+
+
+def medir_zero_pendentes():
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_ZERO_PENDENTES],
+        cwd=RAIZ, env=_ambiente(), capture_output=True, text=True, check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="Quantidade de módulos listados")
+    parser.add_argument("--json", help="Arquivo para gravar o resultado")
+    args = parser.parse_args()
+
+    import_ms, modulos = medir_imports(args.top)
+    zero = medir_zero_pendentes()
+    pesados = sorted(set(zero["modulos"]) & set(MODULOS_PESADOS))
+
+    print(f"{'módulo':<50} {'próprio (ms)':>12} {'cumulativo (ms)':>16}")
+    for nome, proprio, cumulativo in modulos:
+        print(f"{nome:<50} {proprio:>12.1f} {cumulativo:>16.1f}")
+    print()
+    print(f"import lambda_function:      {import_ms:8.1f} ms (orçamento {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"init + handler sem pendentes: {zero['total_ms']:7.1f} ms (orçamento {ZERO_PENDING_BUDGET_MS:.0f} ms)")
+    print(f"módulos pesados carregados:   {', '.join(pesados) or 'nenhum'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "import_ms": import_ms,
+                "zero_pending_init_ms": zero["init_ms"],
+                "zero_pending_total_ms": zero["total_ms"],
+                "modulos_pesados": pesados,
+                "top_modulos": [
+                    {"modulo": nome, "proprio_ms": proprio, "cumulativo_ms": cumulativo}
+                    for nome, proprio, cumulativo in modulos
+                ],
+            }, f, indent=2, ensure_ascii=False)
+
+    falhas = []
+    if import_ms > IMPORT_BUDGET_MS:
+        falhas.append("import acima do orçamento")
+    if zero["total_ms"] > ZERO_PENDING_BUDGET_MS:
+        falhas.append("caminho sem pendentes acima do orçamento")
+    if pesados:
+        falhas.append("módulos pesados no caminho sem pendentes")
+    if falhas:
+        print(f"FALHA: {'; '.join(falhas)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark da decodificação das páginas do extrato.
+
+Compara, sobre um dia grande sintético (páginas `listaLancamento` com
+--por-pagina lançamentos), o caminho anterior e o tipado:
+  1. json.loads (como response.json()) e transformação a partir de dicts,
+  2. decodificar_pagina (msgspec, registros Lancamento) e transformação
+     a partir dos registros tipados,
+reportando o tempo só da decodificação e da decodificação + transformação
+(melhor de --repeticoes), e o custo de gerar os dicts para o arquivo de
+páginas/checkpoint no caminho tipado. Também verifica que os dois caminhos
+produzem o mesmo lote.
+
+Uso:
+    python benchmarks/json_decode.py [--registros 50000] [--por-pagina 1000] [--json resultado.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+os.environ.setdefault("LOG_ASYNC", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from benchmarks.memory import gerar_payload  # noqa: E402
+from services.extrato_decoder import decodificar_pagina  # noqa: E402
+from services.transform import transformar_lancamentos, SCHEMA  # noqa: E402
+
+
+def _reagrupar(paginas, por_pagina):
+    """Reagrupa as páginas de 200 geradas por gerar_payload em páginas de `por_pagina` (bytes)."""
+    registros = [l for p in paginas for l in json.loads(p)["listaLancamento"]]
+    return [
+        json.dumps({"listaLancamento": registros[i:i + por_pagina], "quantidadeTotalPagina": 0}).encode("utf-8")
+        for i in range(0, len(registros), por_pagina)
+    ]
+
+
+def cronometrar(funcao, repeticoes):
+    """Melhor tempo (ms) de `repeticoes` execuções e o último resultado."""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = (time.perf_counter() - inicio) * 1000
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor, resultado
+
+
+def _iguais(a, b):
+    for coluna in SCHEMA:
+        if a.valores(coluna) != b.valores(coluna):
+            return False
+    return len(a) == len(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--registros", type=int, default=50000, help="Lançamentos do dia sintético")
+    parser.add_argument("--por-pagina", type=int, default=1000, help="Lançamentos por página")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções de cada caminho (vale a melhor)")
+    parser.add_argument("--json", help="Arquivo para gravar o resultado")
+    args = parser.parse_args()
+
+    paginas = _reagrupar(gerar_payload(args.registros), args.por_pagina)
+    n = args.registros
+    megabytes = sum(len(p) for p in paginas) / 1024 / 1024
+
+    ms_json, dicts = cronometrar(lambda: [json.loads(p)["listaLancamento"] for p in paginas], args.repeticoes)
+    ms_tipado, decodificadas = cronometrar(lambda: [decodificar_pagina(p) for p in paginas], args.repeticoes)
+    ms_brutos, _ = cronometrar(lambda: [d.__class__(d.total_paginas, d.lancamentos, conteudo=p).registros_brutos()
+                                        for d, p in zip(decodificadas, paginas)], args.repeticoes)
+
+    ms_json_total, lote_json = cronometrar(
+        lambda: [transformar_lancamentos(json.loads(p)["listaLancamento"]) for p in paginas], args.repeticoes
+    )
+    ms_tipado_total, lote_tipado = cronometrar(
+        lambda: [transformar_lancamentos(decodificar_pagina(p).lancamentos) for p in paginas], args.repeticoes
+    )
+
+    if not all(_iguais(a, b) for a, b in zip(lote_json, lote_tipado)):
+        print("ERRO: os lotes dos dois caminhos diferem")
+        sys.exit(1)
+    del dicts
+
+    resultados = [
+        {"caminho": "json.loads (dicts)", "decodificacao_ms": round(ms_json, 1), "com_transformacao_ms": round(ms_json_total, 1)},
+        {"caminho": "msgspec (Lancamento)", "decodificacao_ms": round(ms_tipado, 1), "com_transformacao_ms": round(ms_tipado_total, 1)},
+    ]
+    print(f"{n} lançamentos em {len(paginas)} páginas ({megabytes:.1f} MB)")
+    print(f"{'caminho':<24}{'decodificação ms':>18}{'+ transformação ms':>20}{'µs/registro':>13}")
+    for r in resultados:
+        print(f"{r['caminho']:<24}{r['decodificacao_ms']:>18}{r['com_transformacao_ms']:>20}"
+              f"{r['com_transformacao_ms'] * 1000 / n:>13.2f}")
+    print(f"aceleração: decodificação {ms_json / ms_tipado:.2f}x, com transformação {ms_json_total / ms_tipado_total:.2f}x")
+    print(f"dicts para arquivo/checkpoint (caminho tipado): {ms_brutos:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"registros": n, "paginas": len(paginas), "resultados": resultados,
+                       "registros_brutos_ms": round(ms_brutos, 1)}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de memória da representação dos lançamentos.
+
+Gera um dia grande sintético (páginas `listaLancamento` com a repetição de
+textos típica do extrato) e mede com tracemalloc, por lançamento:
+  1. os registros brutos decodificados do JSON (dict por lançamento),
+  2. o DataFrame tipado (representação anterior, com os mesmos dtypes),
+  3. o LoteLancamentos (representação atual, colunas compactas),
+  4. as tuplas montadas para o INSERT a partir do lote,
+reportando bytes retidos, pico durante a construção, blocos alocados e
+tempo de construção (tracemalloc ativo, então o tempo é apenas relativo).
+
+Uso:
+    python benchmarks/memory.py [--registros 50000] [--json resultado.json]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+os.environ.setdefault("LOG_ASYNC", "false")
+
+from handlers.database import COLUNAS_INSERCAO  # noqa: E402
+from services.transform import transformar_lancamentos  # noqa: E402
+
+DESCRICOES = ["Pix - Enviado", "Pix - Recebido", "Tarifa Pacote de Serviços", "Pagamento de Boleto",
+              "Transferência Enviada", "Cobrança", "TED Recebida", "Impostos"]
+
+
+def gerar_payload(registros, seed=42):
+    """JSON de um dia com `registros` lançamentos, em páginas de 200."""
+    aleatorio = random.Random(seed)
+    complementos = [f"FORNECEDOR {i:04d} LTDA" for i in range(300)]
+    paginas = []
+    for inicio in range(0, registros, 200):
+        lista = []
+        for i in range(inicio, min(inicio + 200, registros)):
+            lista.append({
+                "indicadorTipoLancamento": "1",
+                "dataLancamento": 15032025,
+                "dataMovimento": 15032025,
+                "codigoAgenciaOrigem": 1234,
+                "numeroLote": 14000 + i % 50,
+                "numeroDocumento": 100000 + i,
+                "codigoHistorico": aleatorio.choice([144, 470, 821, 976]),
+                "valorLancamento": round(aleatorio.uniform(1, 5000), 2),
+                "codigoBancoContrapartida": 1,
+                "codigoAgenciaContrapartida": aleatorio.randint(1, 9999),
+                "textoInformacaoComplementar": aleatorio.choice(complementos),
+                "numeroCpfCnpjContrapartida": aleatorio.randint(10**10, 10**14),
+                "indicadorTipoPessoaContrapartida": aleatorio.choice(["F", "J"]),
+                "numeroContaContrapartida": str(aleatorio.randint(1000, 999999)),
+                "textoDescricaoHistorico": aleatorio.choice(DESCRICOES),
+                "textoDvContaContrapartida": aleatorio.choice(["0", "X", " "]),
+                "indicadorSinalLancamento": aleatorio.choice(["C", "D"]),
+            })
+        paginas.append(json.dumps({"listaLancamento": lista, "quantidadeTotalPagina": 0}))
+    return paginas
+
+
+def medir(nome, construir, registros):
+    """Mede a memória retida pelo resultado de `construir()` e o pico durante a construção."""
+    gc.collect()
+    tracemalloc.start()
+    inicio, _ = tracemalloc.get_traced_memory()
+    antes = tracemalloc.take_snapshot()
+    relogio = time.perf_counter()
+    resultado = construir()
+    duracao = time.perf_counter() - relogio
+    gc.collect()
+    atual, pico = tracemalloc.get_traced_memory()
+    depois = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    blocos = sum(stat.count_diff for stat in depois.compare_to(antes, "filename"))
+    retido = atual - inicio
+    return resultado, {
+        "representacao": nome,
+        "bytes_por_registro": round(retido / registros, 1),
+        "pico_bytes_por_registro": round((pico - inicio) / registros, 1),
+        "blocos_por_registro": round(blocos / registros, 2),
+        "total_mb": round(retido / 1024 / 1024, 2),
+        "ms": round(duracao * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--registros", type=int, default=50000, help="Lançamentos do dia sintético")
+    parser.add_argument("--json", help="Arquivo para gravar o resultado")
+    args = parser.parse_args()
+
+    paginas = gerar_payload(args.registros)
+    n = args.registros
+
+    brutos, r_brutos = medir(
+        "dict por registro (JSON)",
+        lambda: [l for p in paginas for l in json.loads(p)["listaLancamento"]], n
+    )
+    # Importado antes da medição: o custo do módulo não entra na conta
+    import pandas  # noqa: F401
+    lote, r_lote = medir("LoteLancamentos", lambda: transformar_lancamentos(brutos), n)
+    # DataFrame montado a partir dos registros brutos (o lote intermediário é descartado)
+    _, r_df = medir("DataFrame tipado", lambda: transformar_lancamentos(brutos).to_dataframe(), n)
+    _, r_sql = medir("tuplas do INSERT", lambda: list(lote.linhas_sql(COLUNAS_INSERCAO)), n)
+
+    resultados = [r_brutos, r_df, r_lote, r_sql]
+    print(f"{n} lançamentos")
+    print(f"{'representação':<28}{'bytes/reg':>12}{'pico/reg':>12}{'blocos/reg':>12}{'total MB':>10}{'ms':>9}")
+    for r in resultados:
+        print(f"{r['representacao']:<28}{r['bytes_por_registro']:>12}{r['pico_bytes_por_registro']:>12}"
+              f"{r['blocos_por_registro']:>12}{r['total_mb']:>10}{r['ms']:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"registros": n, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
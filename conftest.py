@@ -0,0 +1,13 @@
+"""
+Configuração dos testes (python -m pytest, a partir da raiz do repositório).
+
+Os módulos são importados da raiz; logs são escritos de forma síncrona e as
+métricas EMF não são emitidas. Nenhum teste acessa banco, AWS ou APIs.
+"""
+import os
+
+os.environ.setdefault("LOG_ASYNC", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+# Script manual de classificação (acessa o banco e o LLM), não é teste unitário
+collect_ignore = ["test_classifiers.py"]
@@ -1,7 +1,39 @@
-import requests
 import logging
+import threading
+import time
+from utils.metrics import incr
+from handlers.http_client import HTTP_TIMEOUT_S, obter_sessao
+
+# Margem (s) antes do vencimento em que o token em cache deixa de ser usado
+TOKEN_EXPIRY_MARGIN = 60
+
+# Cache de tokens por credencial: (basic_auth, token_url, scope) -> (token, expira_em)
+_token_cache = {}
+_token_lock = threading.Lock()
 
 def get_token(basic_auth, token_url, scope):
+    token, _ = _request_token(basic_auth, token_url, scope)
+    return token
+
+def get_cached_token(basic_auth, token_url, scope):
+    """
+    Retorna um token válido para a credencial, reutilizando o último obtido
+    enquanto não estiver perto de expirar. Cada conta tem sua própria entrada.
+    """
+    chave = (basic_auth, token_url, scope)
+    with _token_lock:
+        em_cache = _token_cache.get(chave)
+        if em_cache and em_cache[1] > time.monotonic():
+            incr("cache_hits_token")
+            return em_cache[0]
+
+    token, expires_in = _request_token(basic_auth, token_url, scope)
+    with _token_lock:
+        _token_cache[chave] = (token, time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0))
+    incr("api_calls")
+    return token
+
+def _request_token(basic_auth, token_url, scope):
     headers = {
         'Authorization': basic_auth,
         'Content-Type': 'application/x-www-form-urlencoded'
@@ -10,11 +42,13 @@ def get_token(basic_auth, token_url, scope):
         'grant_type': 'client_credentials',
         'scope': scope
     }
-    response = requests.post(token_url, headers=headers, data=data)
+    # Timeout como nas chamadas do extrato: um endpoint OAuth travado não prende a execução
+    response = obter_sessao().post(token_url, headers=headers, data=data, timeout=HTTP_TIMEOUT_S)
     if response.status_code == 200:
-        token = response.json().get('access_token')
+        payload = response.json()
+        token = payload.get('access_token')
         logging.info("Token obtido com sucesso.")
-        return token
+        return token, int(payload.get('expires_in') or 0)
     else:
         logging.error(f"Erro ao obter o token: {response.status_code} - {response.text}")
         raise Exception(f"Erro ao obter o token: {response.status_code} - {response.text}")
@@ -93,3 +93,70 @@ class S3Handler:
                 logger.warning(f"Arquivo não encontrado para remoção: {local_path}")
         except Exception as e:
             logger.error(f"Erro ao remover certificado: {str(e)}")
+
+    def upload_bytes(self, bucket_name, s3_key, data, content_type='application/octet-stream'):
+        """
+        Grava um objeto no S3 a partir de bytes em memória.
+        
+        Args:
+            bucket_name: Nome do bucket S3
+            s3_key: Chave do objeto no S3
+            data: Conteúdo do objeto
+            content_type: Content-Type do objeto
+        """
+        try:
+            self.s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=data, ContentType=content_type)
+            logger.debug(f"Objeto gravado: s3://{bucket_name}/{s3_key} ({len(data)} bytes)")
+        except ClientError as e:
+            error_msg = f"Erro do S3 ao gravar {s3_key}: {e.response['Error']['Code']} - {e.response['Error']['Message']}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    def download_bytes(self, bucket_name, s3_key):
+        """
+        Lê um objeto do S3 para a memória.
+        
+        Returns:
+            bytes: Conteúdo do objeto
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+            return response['Body'].read()
+        except ClientError as e:
+            error_msg = f"Erro do S3 ao ler {s3_key}: {e.response['Error']['Code']} - {e.response['Error']['Message']}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    def list_keys(self, bucket_name, prefix):
+        """
+        Lista as chaves de objetos sob um prefixo.
+        
+        Returns:
+            list: Chaves encontradas, em ordem lexicográfica
+        """
+        keys = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+        return sorted(keys)
+    
+    def delete_keys(self, bucket_name, keys):
+        """
+        Remove objetos do S3 (em lotes de até 1000 chaves por requisição).
+        
+        Args:
+            bucket_name: Nome do bucket S3
+            keys: Chaves a remover
+        """
+        keys = list(keys)
+        for inicio in range(0, len(keys), 1000):
+            lote = keys[inicio:inicio + 1000]
+            response = self.s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in lote], 'Quiet': True}
+            )
+            erros = response.get('Errors', [])
+            if erros:
+                error_msg = f"Erro do S3 ao remover {len(erros)} objetos: {erros[0].get('Key')} - {erros[0].get('Message')}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
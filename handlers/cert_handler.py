@@ -2,6 +2,7 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography.hazmat.backends import default_backend
 import os
+import tempfile
 from utils.logger import setup_logger
 
 logger = setup_logger(
@@ -9,6 +10,24 @@ logger = setup_logger(
     log_file="logs/cert_handler.log"
 )
 
+def _temp_dir():
+    return "/tmp" if os.path.exists("/tmp") and os.access("/tmp", os.W_OK) else "."
+
+def _pem_paths():
+    """
+    Cria os arquivos PEM de um carregamento do certificado, com nomes únicos
+    por chamada: contas e datas da mesma conta processadas em paralelo não
+    sobrescrevem nem removem os arquivos umas das outras.
+    """
+    temp_dir = _temp_dir()
+    caminhos = []
+    for prefixo in ("private_key_", "cert_"):
+        # mkstemp cria o arquivo com permissão 0600 (a chave privada fica legível só pelo processo)
+        fd, caminho = tempfile.mkstemp(prefix=prefixo, suffix=".pem", dir=temp_dir)
+        os.close(fd)
+        caminhos.append(caminho)
+    return tuple(caminhos)
+
 def load_certificates(pfx_path, pfx_password):
     """
     Carrega certificado PFX e extrai chave privada e certificado em formato PEM.
@@ -16,9 +35,7 @@ def load_certificates(pfx_path, pfx_password):
     """
     # Determinar diretório para arquivos temporários
     # Lambda tem /tmp como único diretório writable
-    temp_dir = "/tmp" if os.path.exists("/tmp") and os.access("/tmp", os.W_OK) else "."
-    private_key_path = os.path.join(temp_dir, "private_key.pem")
-    cert_path = os.path.join(temp_dir, "cert.pem")
+    temp_dir = _temp_dir()
     
     logger.info(f"Carregando certificado PFX: {pfx_path}")
     logger.debug(f"Diretório temporário: {temp_dir}")
@@ -51,14 +68,19 @@ def load_certificates(pfx_path, pfx_password):
         
         logger.info("Certificado PFX carregado com sucesso")
         
-        # Escrever chave privada e certificado em arquivos PEM
-        with open(private_key_path, "wb") as key_file, open(cert_path, "wb") as cert_file:
-            key_file.write(private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.TraditionalOpenSSL,
-                encryption_algorithm=serialization.NoEncryption()
-            ))
-            cert_file.write(cert.public_bytes(serialization.Encoding.PEM))
+        # Escrever chave privada e certificado em arquivos PEM próprios desta chamada
+        private_key_path, cert_path = _pem_paths()
+        try:
+            with open(private_key_path, "wb") as key_file, open(cert_path, "wb") as cert_file:
+                key_file.write(private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.TraditionalOpenSSL,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+                cert_file.write(cert.public_bytes(serialization.Encoding.PEM))
+        except Exception:
+            clean_temp_files((private_key_path, cert_path))
+            raise
         
         logger.info(f"Arquivos PEM criados: {private_key_path}, {cert_path}")
         
@@ -81,18 +103,24 @@ def load_certificates(pfx_path, pfx_password):
         logger.error(f"Erro inesperado ao processar certificado: {type(e).__name__}: {str(e)}")
         raise
 
-def clean_temp_files():
-    """Remove arquivos temporários PEM criados."""
-    temp_dir = "/tmp" if os.path.exists("/tmp") and os.access("/tmp", os.W_OK) else "."
-    private_key_path = os.path.join(temp_dir, "private_key.pem")
-    cert_path = os.path.join(temp_dir, "cert.pem")
+def clean_temp_files(paths=None):
+    """
+    Remove arquivos temporários PEM criados.
+
+    Args:
+        paths: Caminhos retornados por load_certificates (padrão: todos os PEM gerados)
+    """
+    if paths is None:
+        temp_dir = _temp_dir()
+        paths = [
+            os.path.join(temp_dir, nome) for nome in os.listdir(temp_dir)
+            if nome.endswith(".pem") and nome.startswith(("private_key_", "cert_"))
+        ]
     
     try:
-        if os.path.exists(private_key_path):
-            os.remove(private_key_path)
-            logger.debug(f"Arquivo removido: {private_key_path}")
-        if os.path.exists(cert_path):
-            os.remove(cert_path)
-            logger.debug(f"Arquivo removido: {cert_path}")
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+                logger.debug(f"Arquivo removido: {path}")
     except Exception as e:
         logger.warning(f"Erro ao remover arquivos temporários: {e}")
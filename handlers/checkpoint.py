@@ -0,0 +1,144 @@
+import json
+from handlers.database import get_db_connection
+from handlers.ingestion_state import parse_data
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "checkpoint",
+    log_file="logs/checkpoint.log"
+)
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS extrato_checkpoint (
+        conta TEXT NOT NULL,
+        data DATE NOT NULL,
+        pagina INTEGER NOT NULL,
+        total_paginas INTEGER NOT NULL,
+        quantidade INTEGER NOT NULL,
+        chave_arquivo TEXT,
+        payload JSONB,
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (conta, data, pagina)
+    );
+"""
+
+_schema_verificado = False
+
+
+def garantir_schema(conn):
+    """Cria a tabela de checkpoints, se necessário (uma vez por processo)."""
+    global _schema_verificado
+    if _schema_verificado:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+    conn.commit()
+    _schema_verificado = True
+
+
+def carregar_paginas(conta, data, archive=None):
+    """
+    Carrega as páginas já obtidas de uma conta/data. O conteúdo vem do
+    arquivo de páginas brutas quando a página foi arquivada, ou do payload
+    guardado no próprio checkpoint.
+
+    Args:
+        conta: Identificador da conta (ver identificar_conta)
+        data: Data 'DDMMYYYY'
+        archive: ExtratoArchive usado para ler as páginas arquivadas
+
+    Returns:
+        tuple: (lista de (pagina, lancamentos) em ordem, total de páginas ou None)
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT pagina, total_paginas, chave_arquivo, payload
+                FROM extrato_checkpoint
+                WHERE conta = %s AND data = %s
+                ORDER BY pagina
+            """, (conta, parse_data(data)))
+            linhas = cursor.fetchall()
+        conn.commit()
+    except Exception as e:
+        # Sem checkpoints legíveis a data é obtida desde a primeira página
+        conn.rollback()
+        logger.error(f"Erro ao ler checkpoints ({conta}, {data}): {e}", exc_info=True)
+        return [], None
+    finally:
+        conn.close()
+
+    paginas = []
+    total = None
+    for pagina, total_paginas, chave_arquivo, payload in linhas:
+        # Apenas o prefixo contínuo 1..k é reaproveitado
+        if pagina != len(paginas) + 1:
+            break
+        if payload is not None:
+            lancamentos = payload
+        elif chave_arquivo and archive is not None:
+            try:
+                lancamentos = archive.ler_chave(chave_arquivo)
+            except Exception as e:
+                logger.warning(f"Página arquivada {chave_arquivo} indisponível: {e}")
+                break
+        else:
+            logger.warning(f"Checkpoint da página {pagina} ({conta}, {data}) sem conteúdo disponível")
+            break
+        paginas.append((pagina, lancamentos))
+        total = total_paginas
+
+    if paginas:
+        logger.info(f"Retomando {conta} {data} a partir da página {len(paginas) + 1} de {total}")
+    return paginas, total
+
+
+def salvar_pagina(conta, data, pagina, total_paginas, lancamentos, chave_arquivo=None):
+    """
+    Registra uma página obtida. Sem chave de arquivo, os lançamentos são
+    guardados no próprio checkpoint para permitir a retomada.
+    """
+    payload = None if chave_arquivo else json.dumps(lancamentos, ensure_ascii=False)
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO extrato_checkpoint
+                    (conta, data, pagina, total_paginas, quantidade, chave_arquivo, payload)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (conta, data, pagina) DO UPDATE SET
+                    total_paginas = EXCLUDED.total_paginas,
+                    quantidade = EXCLUDED.quantidade,
+                    chave_arquivo = EXCLUDED.chave_arquivo,
+                    payload = EXCLUDED.payload,
+                    criado_em = now()
+            """, (conta, parse_data(data), pagina, total_paginas, len(lancamentos), chave_arquivo, payload))
+        conn.commit()
+    except Exception as e:
+        # Sem checkpoint a data apenas não pode ser retomada: não interrompe a extração
+        conn.rollback()
+        logger.error(f"Erro ao registrar checkpoint da página {pagina} ({conta}, {data}): {e}", exc_info=True)
+    finally:
+        conn.close()
+
+
+def limpar(conta, data):
+    """Remove os checkpoints de uma conta/data (após a inserção concluída)."""
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM extrato_checkpoint WHERE conta = %s AND data = %s",
+                (conta, parse_data(data))
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao limpar checkpoints ({conta}, {data}): {e}", exc_info=True)
+    finally:
+        conn.close()
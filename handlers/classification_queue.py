@@ -0,0 +1,208 @@
+import os
+from dotenv import load_dotenv
+from handlers.database import get_db_connection, atualizar_categorias
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "classification_queue",
+    log_file="logs/classification_queue.log"
+)
+
+load_dotenv()
+
+# Classificação assíncrona: a ingestão insere os débitos sem categoria e os
+# enfileira; o worker (services/classification_worker.py) os classifica em lote
+CLASSIFICATION_ASYNC = os.getenv("CLASSIFICATION_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Tempo (s) em que um lote reservado fica invisível para os outros workers;
+# vencido (worker interrompido), o lote volta a ser reservável
+CLASSIFICATION_LEASE_SECONDS = int(os.getenv("CLASSIFICATION_LEASE_SECONDS", "300"))
+# Reservas de um lançamento antes de ele ficar de fora da fila (ver status())
+CLASSIFICATION_MAX_ATTEMPTS = int(os.getenv("CLASSIFICATION_MAX_ATTEMPTS", "5"))
+# Espera (s) após uma falha, dobrada a cada tentativa (máximo de 1 hora)
+CLASSIFICATION_RETRY_BASE_SECONDS = int(os.getenv("CLASSIFICATION_RETRY_BASE_SECONDS", "60"))
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS classificacao_pendente (
+        id BIGSERIAL PRIMARY KEY,
+        lancamento_id BIGINT NOT NULL,
+        datalancamento DATE NOT NULL,
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        disponivel_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        ultimo_erro TEXT,
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS ix_classificacao_pendente_disponivel
+        ON classificacao_pendente (disponivel_em, id);
+"""
+
+_schema_verificado = False
+
+
+def garantir_schema(conn):
+    """Cria a fila de classificação, se necessário (uma vez por processo)."""
+    global _schema_verificado
+    if _schema_verificado:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+    conn.commit()
+    _schema_verificado = True
+
+
+def preparar():
+    """Garante a fila antes da ingestão enfileirar (conexão do pool)."""
+    if _schema_verificado:
+        return
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+    finally:
+        conn.close()
+
+
+def reservar(limite, lease_s=CLASSIFICATION_LEASE_SECONDS):
+    """
+    Reserva até `limite` lançamentos da fila para este worker. As linhas já
+    bloqueadas por outro worker são puladas (FOR UPDATE SKIP LOCKED) e a
+    reserva é confirmada antes da classificação: nenhum lock fica aberto
+    durante as chamadas ao classificador.
+
+    Args:
+        limite: Máximo de lançamentos do lote
+        lease_s: Segundos até a reserva vencer
+
+    Returns:
+        list: (id do item, id do lançamento, descrição, complemento); itens
+            cujo lançamento não existe mais são removidos da fila
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE classificacao_pendente c
+                SET tentativas = c.tentativas + 1,
+                    disponivel_em = now() + make_interval(secs => %s)
+                FROM (
+                    SELECT id FROM classificacao_pendente
+                    WHERE disponivel_em <= now() AND tentativas < %s
+                    ORDER BY disponivel_em, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) r
+                WHERE c.id = r.id
+                RETURNING c.id, c.lancamento_id, c.datalancamento
+            """, (lease_s, CLASSIFICATION_MAX_ATTEMPTS, limite))
+            reservados = cursor.fetchall()
+        conn.commit()
+        if not reservados:
+            return []
+
+        with conn.cursor() as cursor:
+            # datalancamento restringe a busca às partições do lote
+            cursor.execute("""
+                SELECT id, textodescricaohistorico, textoinformacaocomplementar
+                FROM extrato_juridica
+                WHERE id = ANY(%s) AND datalancamento = ANY(%s)
+            """, ([r[1] for r in reservados], list({r[2] for r in reservados})))
+            textos = {id_lancamento: (descricao, info) for id_lancamento, descricao, info in cursor.fetchall()}
+
+            orfaos = [id_item for id_item, id_lancamento, _ in reservados if id_lancamento not in textos]
+            if orfaos:
+                cursor.execute("DELETE FROM classificacao_pendente WHERE id = ANY(%s)", (orfaos,))
+                logger.warning(f"{len(orfaos)} itens da fila sem lançamento correspondente removidos")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return [
+        (id_item, id_lancamento) + textos[id_lancamento]
+        for id_item, id_lancamento, _ in reservados if id_lancamento in textos
+    ]
+
+
+def concluir(ids_itens, alteracoes):
+    """
+    Grava as categorias (e os agregados diários, via atualizar_categorias) e
+    remove os itens da fila, na mesma transação.
+
+    Args:
+        ids_itens: Ids dos itens da fila concluídos
+        alteracoes: Lista de (id do lançamento, categoria)
+
+    Returns:
+        tuple: (lançamentos cuja categoria mudou, set de (process_name, data)
+            afetados, para regravar as cópias derivadas como o Parquet)
+    """
+    afetadas = set()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            alterados = atualizar_categorias(cursor, alteracoes, afetadas)
+            cursor.execute("DELETE FROM classificacao_pendente WHERE id = ANY(%s)", (list(ids_itens),))
+        conn.commit()
+        return alterados, afetadas
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def adiar(ids_itens, erro):
+    """Devolve os itens à fila após uma falha, com espera exponencial por tentativa."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE classificacao_pendente
+                SET ultimo_erro = %s,
+                    disponivel_em = now() + make_interval(
+                        secs => LEAST(%s * power(2, GREATEST(tentativas - 1, 0)), 3600)
+                    )
+                WHERE id = ANY(%s)
+            """, (str(erro)[:1000], CLASSIFICATION_RETRY_BASE_SECONDS, list(ids_itens)))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        # Sem o adiamento, a reserva apenas vence no prazo do lease
+        logger.error(f"Erro ao adiar {len(ids_itens)} itens da fila de classificação: {e}", exc_info=True)
+    finally:
+        conn.close()
+
+
+def status():
+    """
+    Situação da fila.
+
+    Returns:
+        dict: 'disponiveis', 'reservados' (lease vigente ou em espera após
+            falha), 'esgotados' (tentativas esgotadas) e 'mais_antigo'
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    count(*) FILTER (WHERE tentativas < %s AND disponivel_em <= now()),
+                    count(*) FILTER (WHERE tentativas < %s AND disponivel_em > now()),
+                    count(*) FILTER (WHERE tentativas >= %s),
+                    min(criado_em)
+                FROM classificacao_pendente
+            """, (CLASSIFICATION_MAX_ATTEMPTS,) * 3)
+            disponiveis, reservados, esgotados, mais_antigo = cursor.fetchone()
+        conn.commit()
+    finally:
+        conn.close()
+    return {
+        "disponiveis": disponiveis,
+        "reservados": reservados,
+        "esgotados": esgotados,
+        "mais_antigo": mais_antigo.isoformat() if mais_antigo else None,
+    }
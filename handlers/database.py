@@ -1,11 +1,14 @@
 import psycopg2
-from psycopg2 import sql, errors
-from tqdm import tqdm
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from decimal import Decimal
 from datetime import datetime
-from datetime import timedelta
 import os
+import threading
 from dotenv import load_dotenv
 from utils.logger import setup_logger
+from utils.metrics import incr
 
 # Configurar o logger específico para este módulo
 logger = setup_logger(
@@ -15,94 +18,408 @@ logger = setup_logger(
 
 load_dotenv()
 
-def get_db_connection():
+# Pool compartilhado entre threads (contas processadas em paralelo)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+
+# Última migração (migrations/NNNN) de que este código depende: colunas,
+# índices e funções usados aqui (partições, agregados, process_name, chave
+# natural única) só existem a partir dela
+VERSAO_SCHEMA = "0005"
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_schema_conferido = False
+
+class SchemaDesatualizadoError(Exception):
+    """O banco não tem as migrações exigidas pelo código."""
+
+class _PooledConnection:
     """
-    Cria e retorna uma conexão com o banco de dados usando as variáveis de ambiente.
+    Conexão emprestada do pool. Expõe a mesma interface da conexão psycopg2;
+    close() devolve a conexão ao pool em vez de fechá-la.
     """
-    try:
-        conn = psycopg2.connect(
-            dbname=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            host=os.getenv('DB_HOST'),
-            port=os.getenv('DB_PORT')
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # Não devolver ao pool uma transação aberta
+            if not conn.closed and conn.status != psycopg2.extensions.STATUS_READY:
+                conn.rollback()
+            _pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            _pool_slots.release()
+
+def _get_pool():
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                dbname=os.getenv('DB_NAME'),
+                user=os.getenv('DB_USER'),
+                password=os.getenv('DB_PASSWORD'),
+                host=os.getenv('DB_HOST'),
+                port=os.getenv('DB_PORT')
+            )
+            # O pool do psycopg2 falha quando esgotado; o semáforo faz a thread esperar
+            _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+            logger.debug(f"Pool de conexões criado (min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+    return _pool
+
+def _conferir_schema(conn):
+    """
+    Falha se o banco não estiver na VERSAO_SCHEMA (uma vez por processo): sem
+    as migrações, as consultas falhariam no meio do processamento.
+    """
+    global _schema_conferido
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        versao = None
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT max(versao) FROM schema_migrations")
+            versao = cursor.fetchone()[0]
+    conn.commit()
+    if versao is None or versao < VERSAO_SCHEMA:
+        raise SchemaDesatualizadoError(
+            f"Schema do banco na versão {versao or 'inicial'}; este código exige a {VERSAO_SCHEMA}. "
+            "Execute `python -m handlers.migrations` antes de iniciar a aplicação"
         )
-        logger.debug("Conexão com o banco de dados estabelecida com sucesso")
-        return conn
+    _schema_conferido = True
+
+def get_db_connection(conferir_schema=True):
+    """
+    Retorna uma conexão do pool compartilhado, configurado pelas variáveis de ambiente.
+    Chamar close() na conexão a devolve ao pool.
+
+    Args:
+        conferir_schema: Na primeira conexão do processo, exige o schema na
+            VERSAO_SCHEMA (SchemaDesatualizadoError); desligado apenas pelas
+            próprias migrações
+    """
+    try:
+        pool = _get_pool()
+        _pool_slots.acquire()
+        try:
+            conn = pool.getconn()
+            if conn.closed:
+                # Conexão derrubada pelo servidor enquanto ociosa
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+        except Exception:
+            _pool_slots.release()
+            raise
+        logger.debug("Conexão com o banco de dados obtida do pool")
+        conexao = _PooledConnection(conn)
+        if conferir_schema and not _schema_conferido:
+            try:
+                _conferir_schema(conexao)
+            except Exception:
+                conexao.close()
+                raise
+        return conexao
     except Exception as e:
         logger.error(f"Erro ao conectar ao banco de dados: {e}", exc_info=True)
         raise
 
-def inserir_no_banco(df):
-    if df.empty:
-        logger.warning("DataFrame vazio - nenhum registro para inserir")
+# Colunas do lote (services.transform.SCHEMA) na ordem do INSERT
+COLUNAS_INSERCAO = [
+    "indicadorTipoLancamento", "dataLancamento", "dataMovimento",
+    "codigoAgenciaOrigem", "numeroLote", "numeroDocumento",
+    "codigoHistorico", "valorLancamento", "codigoBancoContrapartida",
+    "codigoAgenciaContrapartida", "textoInformacaoComplementar",
+    "numeroCpfCnpjContrapartida", "indicadorTipoPessoaContrapartida",
+    "numeroContaContrapartida", "textoDescricaoHistorico",
+    "textoDvContaContrapartida", "indicadorSinalLancamento",
+    "finance_category"
+]
+
+# Colunas gravadas (no banco): as do lote mais a conta, igual para todo o lote
+COLUNAS_BANCO = [col.lower() for col in COLUNAS_INSERCAO] + ["process_name"]
+
+# Colunas (no banco) que identificam unicamente um lançamento: lançamentos
+# idênticos de contas diferentes não são duplicatas
+CHAVE_NATURAL = [
+    "datalancamento", "process_name", "codigoagenciaorigem", "numerolote", "numerodocumento",
+    "codigohistorico", "valorlancamento", "indicadorsinallancamento",
+    "numerocpfcnpjcontrapartida", "textoinformacaocomplementar"
+]
+
+# Posição de cada coluna da chave natural em COLUNAS_BANCO
+_INDICES_CHAVE = [COLUNAS_BANCO.index(col) for col in CHAVE_NATURAL]
+_INDICE_DATA = COLUNAS_INSERCAO.index("dataLancamento")
+
+# Espaços ignorados nas pontas das colunas de texto da chave, em
+# _normalizar_chave e no btrim do índice único (migrations/0004 e 0005)
+_ESPACOS_CHAVE = " \t\n\r\x0b\x0c"
+# Colunas de texto da chave: o índice compara COALESCE(btrim(coluna), ''),
+# de modo que nulo e vazio colidem, como em _normalizar_chave
+_TEXTO_CHAVE = {"indicadorsinallancamento", "numerocpfcnpjcontrapartida", "textoinformacaocomplementar"}
+# Alvo do ON CONFLICT: colunas e expressões do índice único da chave
+# natural (ux_extrato_juridica_conta_chave_natural, migrations/0005)
+_CONFLITO_CHAVE = "(" + ", ".join(
+    f"(COALESCE(btrim({col}, E' \\t\\n\\r\\x0b\\f'), ''))" if col in _TEXTO_CHAVE else col
+    for col in CHAVE_NATURAL
+) + ")"
+
+# INSERT em lote: duplicatas são ignoradas pelo banco (índice da chave
+# natural) e apenas as linhas efetivamente inseridas voltam no RETURNING.
+_INSERT_LOTE = """
+    INSERT INTO extrato_juridica (
+        indicadortipolancamento, datalancamento, datamovimento,
+        codigoagenciaorigem, numerolote, numerodocumento,
+        codigohistorico, valorlancamento, codigobancocontrapartida,
+        codigoagenciacontrapartida, textoinformacaocomplementar,
+        numerocpfcnpjcontrapartida, indicadortipopessoacontrapartida,
+        numerocontacontrapartida, textodescricaohistorico,
+        textodvcontacontrapartida, indicadorsinallancamento,
+        finance_category, process_name
+    ) VALUES %s
+    ON CONFLICT """ + _CONFLITO_CHAVE + """ DO NOTHING
+"""
+
+INSERT_LOTE_QUERY = _INSERT_LOTE + """
+    RETURNING datalancamento, process_name, finance_category, indicadorsinallancamento, valorlancamento
+"""
+
+# Classificação assíncrona: os débitos inseridos sem categoria entram na fila
+# de classificação (handlers/classification_queue.py) na mesma instrução
+INSERT_LOTE_ENFILEIRAR_QUERY = """
+    WITH inseridos AS (""" + _INSERT_LOTE + """
+        RETURNING id, datalancamento, process_name, finance_category, indicadorsinallancamento, valorlancamento
+    ),
+    enfileirados AS (
+        INSERT INTO classificacao_pendente (lancamento_id, datalancamento)
+        SELECT id, datalancamento FROM inseridos
+        WHERE indicadorsinallancamento = 'D' AND finance_category IS NULL
+    )
+    SELECT datalancamento, process_name, finance_category, indicadorsinallancamento, valorlancamento
+    FROM inseridos
+"""
+
+# Soma dos deltas nos agregados diários (migrations/0003 e 0005)
+UPSERT_AGREGADOS_QUERY = """
+    INSERT INTO extrato_agregado_diario (data, process_name, categoria, sinal, valor_total, quantidade)
+    VALUES %s
+    ON CONFLICT (data, process_name, categoria, sinal) DO UPDATE SET
+        valor_total = extrato_agregado_diario.valor_total + EXCLUDED.valor_total,
+        quantidade = extrato_agregado_diario.quantidade + EXCLUDED.quantidade
+"""
+
+# Troca de categoria por id, devolvendo a categoria anterior de cada linha alterada
+RECLASSIFICAR_QUERY = """
+    WITH novas (id, categoria) AS (VALUES %s),
+    anteriores AS (
+        SELECT e.id, e.finance_category AS categoria
+        FROM extrato_juridica e
+        JOIN novas n ON n.id = e.id
+        FOR UPDATE OF e
+    )
+    UPDATE extrato_juridica e
+    SET finance_category = n.categoria
+    FROM novas n
+    JOIN anteriores a ON a.id = n.id
+    WHERE e.id = n.id AND e.finance_category IS DISTINCT FROM n.categoria
+    RETURNING e.datalancamento, e.process_name, a.categoria, n.categoria, e.indicadorsinallancamento, e.valorlancamento
+"""
+
+def _normalizar_chave(valores):
+    """
+    Normaliza os valores da chave natural para comparação entre o lote
+    e o banco (Decimal x float, None x texto vazio, espaços), com as mesmas
+    regras do índice único da chave natural.
+    """
+    chave = []
+    for valor in valores:
+        if valor is None:
+            chave.append("")
+        elif isinstance(valor, (float, Decimal)):
+            chave.append(round(float(valor), 2))
+        elif isinstance(valor, str):
+            chave.append(valor.strip(_ESPACOS_CHAVE))
+        else:
+            chave.append(valor)
+    return tuple(chave)
+
+def _chaves_existentes(cursor, datas, process_name):
+    """Retorna as chaves naturais já gravadas pela conta para as datas informadas."""
+    cursor.execute(
+        sql.SQL("SELECT {} FROM extrato_juridica WHERE datalancamento = ANY(%s) AND process_name = %s").format(
+            sql.SQL(", ").join(map(sql.Identifier, CHAVE_NATURAL))
+        ),
+        (list(datas), process_name)
+    )
+    return {_normalizar_chave(row) for row in cursor.fetchall()}
+
+# Meses (primeiro dia) com partição de extrato_juridica já garantida neste processo
+_meses_particionados = set()
+
+def _garantir_particoes(conn, datas):
+    """
+    Garante a partição mensal de extrato_juridica para as datas do lote
+    (função criada em migrations/0001). Confirmada antes do INSERT, para que
+    o lock da criação não dure toda a inserção.
+    """
+    meses = {data.replace(day=1) for data in datas} - _meses_particionados
+    if not meses:
         return
+    with conn.cursor() as cursor:
+        for mes in sorted(meses):
+            cursor.execute("SELECT extrato_juridica_garantir_particao(%s)", (mes,))
+    conn.commit()
+    _meses_particionados.update(meses)
+    logger.debug(f"Partições garantidas para os meses: {sorted(meses)}")
+
+def atualizar_agregados(cursor, deltas):
+    """
+    Aplica deltas aos agregados diários, na transação do cursor.
+
+    Args:
+        cursor: Cursor da transação que alterou extrato_juridica
+        deltas: Iterável de (data, conta, categoria, sinal, valor, quantidade);
+            o mesmo lançamento entra com valor/quantidade negativos ao sair
+            de uma categoria
+    """
+    somas = {}
+    for data, process_name, categoria, sinal, valor, quantidade in deltas:
+        if data is None:
+            continue
+        chave = (data, process_name, categoria or "", sinal or "")
+        valor_atual, quantidade_atual = somas.get(chave, (Decimal(0), 0))
+        somas[chave] = (valor_atual + Decimal(str(valor or 0)), quantidade_atual + quantidade)
+    linhas = [chave + soma for chave, soma in sorted(somas.items()) if soma[1] or soma[0]]
+    if linhas:
+        # Ordem fixa das chaves: transações concorrentes bloqueiam as linhas na mesma ordem
+        execute_values(cursor, UPSERT_AGREGADOS_QUERY, linhas, page_size=1000)
+
+def atualizar_categorias(cursor, alteracoes, afetadas=None):
+    """
+    Reclassifica lançamentos e atualiza os agregados diários na mesma
+    transação. O commit fica a cargo de quem chama.
+
+    Args:
+        cursor: Cursor da transação
+        alteracoes: Lista de (id, categoria)
+        afetadas: Conjunto que recebe os pares (process_name, data) dos
+            lançamentos alterados (ex: para regravar o Parquet após o commit)
+
+    Returns:
+        int: Lançamentos cuja categoria mudou
+    """
+    if not alteracoes:
+        return 0
+    alteradas = execute_values(
+        cursor, RECLASSIFICAR_QUERY, alteracoes, template="(%s::bigint, %s::text)",
+        page_size=1000, fetch=True
+    )
+    deltas = []
+    for data, process_name, anterior, nova, sinal, valor in alteradas:
+        deltas.append((data, process_name, anterior, sinal, -(valor or 0), -1))
+        deltas.append((data, process_name, nova, sinal, valor, 1))
+        if afetadas is not None:
+            afetadas.add((process_name, data))
+    atualizar_agregados(cursor, deltas)
+    return len(alteradas)
+
+def inserir_no_banco(lote, enfileirar_classificacao=False, process_name=None):
+    """
+    Insere os lançamentos em lote de forma idempotente.
+
+    Duplicatas são removidas em memória (dentro do lote e contra as chaves já
+    gravadas para as datas do lote); o restante é enviado em um único
+    INSERT ... ON CONFLICT (chave natural) DO NOTHING RETURNING. O índice
+    único da chave natural (migrations/0005) garante que escritores
+    concorrentes não gravem o mesmo lançamento duas vezes, e o RETURNING
+    reporta exatamente o que foi inserido. Os agregados diários recebem as
+    linhas inseridas na mesma transação.
+
+    Args:
+        lote: LoteLancamentos (services.transform)
+        enfileirar_classificacao: Enfileira os débitos inseridos sem categoria
+            para o worker de classificação (requer a coluna id, migrations/0003)
+        process_name: Conta dos lançamentos (padrão: PROCESS_NAME)
+
+    Returns:
+        dict: Contagens 'inseridos', 'duplicados' e 'total'
+    """
+    resultado = {"inseridos": 0, "duplicados": 0, "total": len(lote)}
+    if len(lote) == 0:
+        logger.warning("Lote vazio - nenhum registro para inserir")
+        return resultado
+
+    logger.info(f"Iniciando inserção de {len(lote)} registros no banco de dados")
+
+    process_name = process_name or os.getenv('PROCESS_NAME')
+    if not process_name:
+        raise ValueError("Conta (process_name) não informada para a inserção")
+
+    # Tuplas com tipos Python montadas coluna a coluna (nulos já como None),
+    # na ordem de COLUNAS_BANCO
+    registros = list(lote.linhas_sql(COLUNAS_INSERCAO, constantes=(process_name,)))
+
+    # Dedupe dentro do próprio lote
+    vistos = set()
+    candidatos = []
+    for registro in registros:
+        chave = _normalizar_chave(registro[i] for i in _INDICES_CHAVE)
+        if chave not in vistos:
+            vistos.add(chave)
+            candidatos.append((chave, registro))
+    duplicados_lote = len(registros) - len(candidatos)
+
+    datas = {registro[_INDICE_DATA] for _, registro in candidatos if registro[_INDICE_DATA] is not None}
 
-    logger.info(f"Iniciando inserção de {len(df)} registros no banco de dados")
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    insert_query = sql.SQL("""
-        INSERT INTO extrato_juridica (
-            indicadortipolancamento, datalancamento, datamovimento, 
-            codigoagenciaorigem, numerolote, numerodocumento, 
-            codigohistorico, valorlancamento, codigobancocontrapartida, 
-            codigoagenciacontrapartida, textoinformacaocomplementar, 
-            numerocpfcnpjcontrapartida, indicadortipopessoacontrapartida, 
-            numerocontacontrapartida, textodescricaohistorico, 
-            textodvcontacontrapartida, indicadorsinallancamento,
-            finance_category
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """)
-
-    registros_inseridos = 0
-    registros_duplicados = 0
-    registros_com_erro = 0
-
-    with tqdm(total=len(df), desc="Inserindo registros", unit="registro") as pbar:
-        for index, row in df.iterrows():
-            try:
-                cursor.execute(insert_query, (
-                    int(row["indicadorTipoLancamento"]),
-                    row["dataLancamento"],
-                    row["dataMovimento"],
-                    int(row["codigoAgenciaOrigem"]),
-                    int(row["numeroLote"]),
-                    int(row["numeroDocumento"]),
-                    int(row["codigoHistorico"]),
-                    row["valorLancamento"],
-                    int(row["codigoBancoContrapartida"]),
-                    int(row["codigoAgenciaContrapartida"]),
-                    row["textoInformacaoComplementar"],
-                    str(row["numeroCpfCnpjContrapartida"]),
-                    row["indicadorTipoPessoaContrapartida"],
-                    row["numeroContaContrapartida"],
-                    row["textoDescricaoHistorico"],
-                    row["textoDvContaContrapartida"],
-                    row["indicadorSinalLancamento"],
-                    row["finance_category"]
-                ))
-                conn.commit()
-                registros_inseridos += 1
-            except errors.UniqueViolation:
-                logger.debug(f"Registro duplicado encontrado no índice {index}")
-                conn.rollback()
-                registros_duplicados += 1
-            except Exception as e:
-                logger.error(f"Erro ao processar registro {index}: {e}", exc_info=True)
-                conn.rollback()
-                registros_com_erro += 1
+    try:
+        _garantir_particoes(conn, datas)
+        with conn.cursor() as cursor:
+            # Dedupe contra o que a conta já gravou para as datas do lote
+            existentes = _chaves_existentes(cursor, datas, process_name) if datas else set()
+            novos = [registro for chave, registro in candidatos if chave not in existentes]
+            duplicados_banco = len(candidatos) - len(novos)
+
+            inseridos = 0
+            if novos:
+                query = INSERT_LOTE_ENFILEIRAR_QUERY if enfileirar_classificacao else INSERT_LOTE_QUERY
+                retornados = execute_values(cursor, query, novos, page_size=1000, fetch=True)
+                inseridos = len(retornados)
+                if enfileirar_classificacao:
+                    incr("classificacoes_enfileiradas",
+                         sum(1 for _, _, categoria, sinal, _ in retornados if sinal == 'D' and categoria is None))
+                # Apenas as linhas efetivamente inseridas entram nos agregados
+                atualizar_agregados(cursor, (linha + (1,) for linha in retornados))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao inserir lote no banco: {e}", exc_info=True)
+        raise
+    finally:
+        conn.close()
 
-            pbar.update(1)
+    # Conflitos no INSERT (ex: gravados por outro processo entre o SELECT e o INSERT)
+    duplicados_conflito = len(novos) - inseridos
+    resultado["inseridos"] = inseridos
+    resultado["duplicados"] = duplicados_lote + duplicados_banco + duplicados_conflito
+
+    incr("rows_inseridas", resultado["inseridos"])
+    incr("rows_duplicadas", resultado["duplicados"])
 
-    cursor.close()
-    conn.close()
-    
     logger.info(f"Inserção concluída:")
-    logger.info(f"- Registros inseridos com sucesso: {registros_inseridos}")
-    logger.info(f"- Registros duplicados: {registros_duplicados}")
-    logger.info(f"- Registros com erro: {registros_com_erro}")
-    logger.info(f"- Total processado: {len(df)}")
+    logger.info(f"- Registros inseridos com sucesso: {resultado['inseridos']}")
+    logger.info(f"- Registros duplicados: {resultado['duplicados']} "
+                f"(lote: {duplicados_lote}, banco: {duplicados_banco}, conflito: {duplicados_conflito})")
+    logger.info(f"- Total processado: {resultado['total']}")
+    return resultado
 
 def registrar_status(process_name, status, data=None):
     """
@@ -113,7 +430,8 @@ def registrar_status(process_name, status, data=None):
         cursor = conn.cursor()
 
         if data:
-            created_at = datetime.strptime(data, '%d%m%Y')
+            # zfill: '1012025' deve ser 01/01/2025, não 10/01/2025
+            created_at = datetime.strptime(data.zfill(8), '%d%m%Y')
         else:
             created_at = datetime.now()
 
@@ -130,71 +448,3 @@ def registrar_status(process_name, status, data=None):
         logger.info(f"Status '{status}' registrado para o processo '{process_name}' na data {created_at}")
     except Exception as e:
         logger.error(f"Erro ao registrar status: {e}", exc_info=True)
-
-def obter_datas_falhadas(process_name):
-    """
-    Retorna as datas com status 'Erro' do processo.
-    """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT TO_CHAR(created_at, 'DDMMYYYY')
-            FROM process_status
-            WHERE process_name = %s AND status = 'Erro'
-        """, (process_name,))
-        resultados = cursor.fetchall()
-        conn.close()
-        datas_falhadas = [row[0] for row in resultados]
-        logger.info(f"Encontradas {len(datas_falhadas)} datas falhadas para o processo '{process_name}'")
-        return datas_falhadas
-    except Exception as e:
-        logger.error(f"Erro ao consultar datas falhadas: {e}", exc_info=True)
-        return []
-
-def obter_datas_nao_registradas():
-    """
-    Verifica o intervalo de datas do mês atual e retorna todas as datas
-    (incluindo finais de semana) que não possuem registros na tabela extrato_juridica.
-    """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        hoje = datetime.now()
-        primeiro_dia = datetime(hoje.year, hoje.month, 1)
-        ontem = hoje - timedelta(days=1)
-
-        # Garantir que não processamos datas futuras
-        if ontem > hoje:
-            ontem = hoje
-
-        todas_as_datas = []
-        data_atual = primeiro_dia
-        while data_atual <= ontem:
-            todas_as_datas.append(data_atual.strftime('%Y-%m-%d'))
-            data_atual += timedelta(days=1)
-
-        logger.debug(f"Verificando {len(todas_as_datas)} datas no período")
-
-        cursor.execute("""
-            SELECT DISTINCT TO_CHAR(datalancamento, 'YYYY-MM-DD') AS data
-            FROM extrato_juridica
-            WHERE datalancamento IS NOT NULL
-        """)
-        datas_registradas = {row[0] for row in cursor.fetchall()}
-
-        conn.close()
-
-        datas_nao_registradas = [
-            datetime.strptime(data, '%Y-%m-%d').strftime('%d%m%Y')
-            for data in todas_as_datas if data not in datas_registradas
-        ]
-
-        logger.info(f"Encontradas {len(datas_nao_registradas)} datas não registradas")
-        return datas_nao_registradas
-
-    except Exception as e:
-        logger.error(f"Erro ao consultar datas não registradas: {e}", exc_info=True)
-        return []
-
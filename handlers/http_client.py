@@ -0,0 +1,233 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+from utils.metrics import timer, incr
+from utils.deadline import prazo_atual
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "http_client",
+    log_file="logs/http_client.log"
+)
+
+load_dotenv()
+
+# Retentativas por requisição (além da primeira) em 429, 5xx e timeouts
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+# Backoff exponencial com jitter: espera aleatória em [0, min(max, base * 2^tentativa)]
+HTTP_BACKOFF_BASE_S = float(os.getenv("HTTP_BACKOFF_BASE_S", "1"))
+HTTP_BACKOFF_MAX_S = float(os.getenv("HTTP_BACKOFF_MAX_S", "30"))
+# Timeout (s) de cada requisição
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "30"))
+# Falhas consecutivas que abrem o circuito e tempo (s) até a próxima tentativa
+HTTP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", "5"))
+HTTP_CIRCUIT_RESET_S = float(os.getenv("HTTP_CIRCUIT_RESET_S", "60"))
+
+# Conexões mantidas por host na sessão compartilhada (contas em paralelo)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+# Status HTTP que justificam nova tentativa
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+class CircuitoAbertoError(Exception):
+    """A API está indisponível e o circuito está aberto: a requisição não foi feita."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker compartilhado entre threads e invocações do container.
+
+    Fechado: requisições passam. Após `limiar` falhas consecutivas abre e
+    rejeita requisições por `reset_s` segundos; depois fica meio-aberto e
+    libera uma única requisição de teste, que fecha (sucesso) ou reabre
+    (falha) o circuito.
+    """
+
+    def __init__(self, nome, limiar=HTTP_CIRCUIT_FAILURE_THRESHOLD, reset_s=HTTP_CIRCUIT_RESET_S):
+        self.nome = nome
+        self.limiar = limiar
+        self.reset_s = reset_s
+        self.falhas = 0
+        self.aberto_ate = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self.aberto_ate is None:
+                return "fechado"
+            return "aberto" if time.monotonic() < self.aberto_ate else "meio-aberto"
+
+    def permitir(self):
+        """Verifica se uma requisição pode ser feita; levanta CircuitoAbertoError se não."""
+        with self._lock:
+            if self.aberto_ate is None:
+                return
+            if time.monotonic() >= self.aberto_ate and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                logger.info(f"Circuito '{self.nome}' meio-aberto: liberando requisição de teste")
+                return
+        incr("api_circuito_aberto")
+        raise CircuitoAbertoError(f"Circuito '{self.nome}' aberto: API indisponível")
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.aberto_ate is not None:
+                logger.info(f"Circuito '{self.nome}' fechado")
+            self.falhas = 0
+            self.aberto_ate = None
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self._teste_em_andamento or self.falhas >= self.limiar:
+                self.aberto_ate = time.monotonic() + self.reset_s
+                self._teste_em_andamento = False
+                logger.warning(f"Circuito '{self.nome}' aberto por {self.reset_s:.0f}s após {self.falhas} falhas consecutivas")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def obter_breaker(nome):
+    """Retorna o circuit breaker do serviço `nome`, criando-o na primeira vez."""
+    with _breakers_lock:
+        if nome not in _breakers:
+            _breakers[nome] = CircuitBreaker(nome)
+        return _breakers[nome]
+
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao():
+    """
+    Sessão HTTP compartilhada pelo container: reutiliza conexões (TCP/TLS)
+    entre páginas, datas e invocações. Criada na primeira chamada ou no
+    aquecimento da Lambda.
+    """
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+            _sessao = requests.Session()
+            _sessao.mount("https://", adaptador)
+            _sessao.mount("http://", adaptador)
+        return _sessao
+
+
+def _retry_after(response):
+    """Segundos indicados pelo header Retry-After (número ou data HTTP), ou None."""
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(tentativa):
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_S, HTTP_BACKOFF_BASE_S * (2 ** tentativa)))
+
+
+def get_com_retry(url, breaker=None, max_retries=HTTP_MAX_RETRIES, timeout=HTTP_TIMEOUT_S, **kwargs):
+    """
+    GET com retentativas em 429, 5xx, timeouts e erros de conexão, usando
+    backoff exponencial com jitter ou o Retry-After da resposta (limitado a
+    HTTP_BACKOFF_MAX_S), e circuit breaker opcional. Com um prazo em vigor
+    (utils.deadline.prazo_vigente), não espera além do tempo restante: se a
+    espera não couber, desiste e devolve a última resposta ou erro.
+
+    Args:
+        url: URL da requisição
+        breaker: CircuitBreaker do serviço (opcional)
+        max_retries: Retentativas além da primeira tentativa
+        timeout: Timeout de cada tentativa (s)
+        **kwargs: Argumentos repassados ao GET da sessão (headers, params, cert...)
+
+    Returns:
+        requests.Response: Última resposta obtida (pode não ser 200 se o status
+        não for retentável ou as tentativas se esgotarem)
+
+    Raises:
+        CircuitoAbertoError: Se o circuito estiver aberto
+        requests.RequestException: Timeout/erro de conexão após esgotar as tentativas
+            (ou sem prazo para a próxima) e demais erros da requisição, sem retentativa
+    """
+    tentativa = 0
+    while True:
+        if breaker is not None:
+            breaker.permitir()
+
+        espera = None
+        erro = None
+        try:
+            with timer("http_request"):
+                response = obter_sessao().get(url, timeout=timeout, **kwargs)
+            incr("http_requests")
+        except (requests.Timeout, requests.ConnectionError) as e:
+            incr("http_requests")
+            incr("http_timeouts" if isinstance(e, requests.Timeout) else "http_erros_conexao")
+            if breaker is not None:
+                breaker.registrar_falha()
+            if tentativa >= max_retries:
+                raise
+            logger.warning(f"{type(e).__name__} na tentativa {tentativa + 1}: {e}")
+            erro = e
+        except Exception:
+            # Erros não retentáveis (SSL, URL inválida, resposta truncada...) também
+            # contam como falha: liberam a requisição de teste do circuito meio-aberto
+            if breaker is not None:
+                breaker.registrar_falha()
+            raise
+        else:
+            if response.status_code not in STATUS_RETENTAVEIS:
+                if breaker is not None:
+                    breaker.registrar_sucesso()
+                return response
+
+            incr("http_status_429" if response.status_code == 429 else "http_status_5xx")
+            # 429 é limitação de taxa: a API respondeu, então não abre o circuito
+            if breaker is not None:
+                if response.status_code == 429:
+                    breaker.registrar_sucesso()
+                else:
+                    breaker.registrar_falha()
+            if tentativa >= max_retries:
+                return response
+            espera = _retry_after(response)
+            if espera is not None:
+                espera = min(espera, HTTP_BACKOFF_MAX_S)
+            logger.warning(f"Status {response.status_code} na tentativa {tentativa + 1}")
+
+        if espera is None:
+            espera = _backoff(tentativa)
+        prazo = prazo_atual()
+        if prazo is not None and prazo.restante_ms() - prazo.margem_ms < espera * 1000:
+            incr("http_retries_sem_prazo")
+            logger.warning(f"Sem tempo para esperar {espera:.1f}s até a nova tentativa "
+                           f"(restante: {prazo.restante_ms()} ms)")
+            if erro is not None:
+                raise erro
+            return response
+        tentativa += 1
+        incr("http_retries")
+        logger.info(f"Nova tentativa {tentativa}/{max_retries} em {espera:.1f}s")
+        with timer("http_backoff"):
+            time.sleep(espera)
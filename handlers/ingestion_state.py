@@ -0,0 +1,427 @@
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from handlers.database import get_db_connection
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "ingestion_state",
+    log_file="logs/ingestion_state.log"
+)
+
+load_dotenv()
+
+# Dias para trás em que datas com erro ainda são retentadas
+JANELA_RETRY_DIAS = int(os.getenv("INGESTION_RETRY_WINDOW_DAYS", "31"))
+# Tentativas antes de uma data ser marcada como abandonada
+MAX_TENTATIVAS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "5"))
+
+# Lease por (processo, data): duas execuções (Lambda, main.py, workers) nunca
+# processam a mesma data ao mesmo tempo
+INGESTION_LEASE_ENABLED = os.getenv("INGESTION_LEASE_ENABLED", "true").lower() not in ("0", "false", "no")
+# Validade do lease (s), renovado a cada terço enquanto a data é processada:
+# uma execução interrompida libera a data quando o lease vence
+INGESTION_LEASE_SECONDS = int(os.getenv("INGESTION_LEASE_SECONDS", "300"))
+
+# Execuções recentes usadas para estimar o custo de uma data
+AMOSTRAS_DURACAO = 30
+
+# Estados considerados fechados (não voltam a ser processados automaticamente)
+ESTADOS_FECHADOS = ("processada", "abandonada")
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS ingestion_state (
+        process_name TEXT NOT NULL,
+        data DATE NOT NULL,
+        status TEXT NOT NULL,
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        ultimo_erro TEXT,
+        atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (process_name, data)
+    );
+    ALTER TABLE ingestion_state ADD COLUMN IF NOT EXISTS duracao_ms INTEGER;
+    CREATE INDEX IF NOT EXISTS ix_ingestion_state_abertas
+        ON ingestion_state (process_name, data)
+        WHERE status NOT IN ('processada', 'abandonada');
+    CREATE TABLE IF NOT EXISTS ingestion_watermark (
+        process_name TEXT PRIMARY KEY,
+        low_watermark DATE NOT NULL,
+        atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE TABLE IF NOT EXISTS ingestion_lease (
+        process_name TEXT NOT NULL,
+        data DATE NOT NULL,
+        dono TEXT NOT NULL,
+        adquirido_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        expira_em TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (process_name, data)
+    );
+"""
+
+
+class DataEmProcessamento(Exception):
+    """A data já está sendo processada por outra execução (lease vigente)."""
+
+_schema_verificado = False
+
+
+def parse_data(data):
+    """Converte 'DDMMYYYY' (com ou sem zero à esquerda) em date."""
+    return datetime.strptime(data.zfill(8), '%d%m%Y').date()
+
+
+def formatar_data(data):
+    """Converte date em 'DDMMYYYY'."""
+    return data.strftime('%d%m%Y')
+
+
+def garantir_schema(conn):
+    """Cria as tabelas de estado, se necessário (uma vez por processo)."""
+    global _schema_verificado
+    if _schema_verificado:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+    conn.commit()
+    _schema_verificado = True
+
+
+def _obter_watermark(cursor, process_name, ontem):
+    """
+    Retorna a low watermark do processo. Na primeira execução, ela é criada
+    no último dia do mês anterior e o estado do mês corrente é semeado a
+    partir das datas em que a conta já possui lançamentos em extrato_juridica
+    (datas de outras contas continuam pendentes para ela).
+    """
+    cursor.execute(
+        "SELECT low_watermark FROM ingestion_watermark WHERE process_name = %s",
+        (process_name,)
+    )
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+
+    watermark = ontem.replace(day=1) - timedelta(days=1)
+    logger.info(f"Inicializando watermark de '{process_name}' em {watermark}")
+    cursor.execute("""
+        INSERT INTO ingestion_watermark (process_name, low_watermark)
+        VALUES (%s, %s)
+        ON CONFLICT (process_name) DO NOTHING
+    """, (process_name, watermark))
+    cursor.execute("""
+        INSERT INTO ingestion_state (process_name, data, status)
+        SELECT DISTINCT %s, datalancamento, 'processada'
+        FROM extrato_juridica
+        WHERE process_name = %s AND datalancamento > %s AND datalancamento <= %s
+        ON CONFLICT (process_name, data) DO NOTHING
+    """, (process_name, process_name, watermark, ontem))
+    return watermark
+
+
+def _classificar_intervalo(watermark, ontem, limite_retry, estados):
+    """
+    Percorre o intervalo (watermark, ontem].
+
+    Args:
+        watermark: Low watermark do processo
+        ontem: Última data considerada
+        limite_retry: Primeira data dentro da janela de retry
+        estados: dict data -> status das datas com estado registrado
+
+    Returns:
+        tuple: (pendentes, perdidas) - datas abertas dentro da janela de retry
+            e datas sem estado anteriores à janela (nunca processadas)
+    """
+    pendentes, perdidas = [], []
+    data_atual = watermark + timedelta(days=1)
+    while data_atual <= ontem:
+        if data_atual not in estados:
+            (pendentes if data_atual >= limite_retry else perdidas).append(data_atual)
+        elif estados[data_atual] not in ESTADOS_FECHADOS and data_atual >= limite_retry:
+            pendentes.append(data_atual)
+        data_atual += timedelta(days=1)
+    return pendentes, perdidas
+
+
+def obter_datas_pendentes(process_name, hoje=None):
+    """
+    Retorna as datas ainda abertas do processo, no formato 'DDMMYYYY'.
+
+    Apenas o intervalo (watermark, ontem] é considerado, limitado à janela de
+    retry: datas mais antigas que a janela (inclusive as que nunca foram
+    processadas), ou que excederam MAX_TENTATIVAS, são marcadas como
+    abandonadas, com aviso no log. Em seguida a watermark avança até a
+    primeira data ainda aberta, mantendo a consulta proporcional ao número de
+    datas abertas e não ao histórico.
+
+    Args:
+        process_name: Nome do processo
+        hoje: Data de referência (padrão: hoje)
+
+    Returns:
+        list: Datas pendentes ordenadas
+    """
+    hoje = hoje or datetime.now().date()
+    ontem = hoje - timedelta(days=1)
+    limite_retry = hoje - timedelta(days=JANELA_RETRY_DIAS)
+
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            watermark = _obter_watermark(cursor, process_name, ontem)
+
+            # Fechar datas que saíram da janela de retry ou esgotaram tentativas
+            cursor.execute("""
+                UPDATE ingestion_state
+                SET status = 'abandonada', atualizado_em = now()
+                WHERE process_name = %s
+                  AND data > %s
+                  AND status NOT IN ('processada', 'abandonada')
+                  AND (data < %s OR tentativas >= %s)
+                RETURNING data
+            """, (process_name, watermark, limite_retry, MAX_TENTATIVAS))
+            abandonadas = [row[0] for row in cursor.fetchall()]
+            if abandonadas:
+                logger.warning(f"Datas abandonadas após esgotar retries: {sorted(abandonadas)}")
+
+            # Estado conhecido acima da watermark
+            cursor.execute("""
+                SELECT data, status FROM ingestion_state
+                WHERE process_name = %s AND data > %s AND data <= %s
+            """, (process_name, watermark, ontem))
+            estados = dict(cursor.fetchall())
+
+            pendentes, perdidas = _classificar_intervalo(watermark, ontem, limite_retry, estados)
+
+            # Datas que saíram da janela sem nunca terem sido processadas: ficam
+            # registradas (e visíveis) antes de a watermark passar por elas
+            if perdidas:
+                cursor.execute("""
+                    INSERT INTO ingestion_state (process_name, data, status, ultimo_erro)
+                    SELECT %s, dia, 'abandonada', %s
+                    FROM unnest(%s::date[]) AS dia
+                    ON CONFLICT (process_name, data) DO NOTHING
+                """, (process_name, "fora da janela de retry sem processamento", perdidas))
+                logger.warning(
+                    f"{len(perdidas)} datas de '{process_name}' saíram da janela de retry "
+                    f"({JANELA_RETRY_DIAS} dias) sem serem processadas e foram marcadas como "
+                    f"abandonadas: {perdidas[0]} a {perdidas[-1]}"
+                )
+
+            # Avançar a watermark até o dia anterior à primeira data aberta
+            nova_watermark = (pendentes[0] if pendentes else hoje) - timedelta(days=1)
+            if nova_watermark > watermark:
+                cursor.execute("""
+                    UPDATE ingestion_watermark
+                    SET low_watermark = %s, atualizado_em = now()
+                    WHERE process_name = %s
+                """, (nova_watermark, process_name))
+                logger.info(f"Watermark de '{process_name}' avançada para {nova_watermark}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao consultar estado de ingestão: {e}", exc_info=True)
+        raise
+    finally:
+        conn.close()
+
+    datas = [formatar_data(d) for d in pendentes]
+    logger.info(f"Encontradas {len(datas)} datas pendentes para o processo '{process_name}'")
+    return datas
+
+
+def estimar_duracao_ms(process_name):
+    """
+    Estima o custo de processar uma data pelo percentil 90 das últimas
+    AMOSTRAS_DURACAO datas processadas com sucesso.
+
+    Returns:
+        int: Duração estimada em ms, ou None se não houver histórico
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT percentile_cont(0.9) WITHIN GROUP (ORDER BY duracao_ms)
+                FROM (
+                    SELECT duracao_ms FROM ingestion_state
+                    WHERE process_name = %s AND status = 'processada' AND duracao_ms IS NOT NULL
+                    ORDER BY atualizado_em DESC
+                    LIMIT %s
+                ) recentes
+            """, (process_name, AMOSTRAS_DURACAO))
+            row = cursor.fetchone()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao estimar duração de '{process_name}': {e}", exc_info=True)
+        return None
+    finally:
+        conn.close()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def _registrar(process_name, data, status, erro=None, incrementar=False, duracao_ms=None):
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO ingestion_state (process_name, data, status, tentativas, ultimo_erro, duracao_ms)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (process_name, data) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    tentativas = ingestion_state.tentativas + EXCLUDED.tentativas,
+                    ultimo_erro = COALESCE(EXCLUDED.ultimo_erro, ingestion_state.ultimo_erro),
+                    duracao_ms = COALESCE(EXCLUDED.duracao_ms, ingestion_state.duracao_ms),
+                    atualizado_em = now()
+            """, (process_name, parse_data(data), status, 1 if incrementar else 0, erro, duracao_ms))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao registrar estado '{status}' para {data}: {e}", exc_info=True)
+    finally:
+        conn.close()
+
+
+def marcar_inicio(process_name, data):
+    """Marca a data como em processamento e conta uma tentativa."""
+    _registrar(process_name, data, "iniciada", incrementar=True)
+
+
+def marcar_sucesso(process_name, data, duracao_ms=None):
+    """Marca a data como processada (fechada), guardando a duração para estimativas."""
+    _registrar(process_name, data, "processada", duracao_ms=duracao_ms)
+
+
+def marcar_erro(process_name, data, erro):
+    """Marca a data com erro; ela será retentada dentro da janela de retry."""
+    _registrar(process_name, data, "erro", erro=str(erro)[:1000])
+
+
+def adquirir_lease(process_name, data, dono, duracao_s=INGESTION_LEASE_SECONDS):
+    """
+    Adquire o lease da data se ele estiver livre, vencido ou já for de `dono`.
+
+    Returns:
+        tuple: (adquirido, dono atual, expiração atual)
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO ingestion_lease (process_name, data, dono, expira_em)
+                VALUES (%s, %s, %s, now() + make_interval(secs => %s))
+                ON CONFLICT (process_name, data) DO UPDATE SET
+                    dono = EXCLUDED.dono,
+                    adquirido_em = now(),
+                    expira_em = EXCLUDED.expira_em
+                WHERE ingestion_lease.expira_em < now() OR ingestion_lease.dono = EXCLUDED.dono
+                RETURNING dono
+            """, (process_name, parse_data(data), dono, duracao_s))
+            adquirido = cursor.fetchone() is not None
+            cursor.execute("""
+                SELECT dono, expira_em FROM ingestion_lease
+                WHERE process_name = %s AND data = %s
+            """, (process_name, parse_data(data)))
+            atual, expira_em = cursor.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return adquirido, atual, expira_em
+
+
+def renovar_lease(process_name, data, dono, duracao_s=INGESTION_LEASE_SECONDS):
+    """
+    Estende o lease de `dono`.
+
+    Returns:
+        bool: False se o lease venceu e foi adquirido por outra execução
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE ingestion_lease
+                SET expira_em = now() + make_interval(secs => %s)
+                WHERE process_name = %s AND data = %s AND dono = %s
+            """, (duracao_s, process_name, parse_data(data), dono))
+            renovado = cursor.rowcount == 1
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        # Falha transitória: o lease segue válido até expira_em e a próxima renovação tenta de novo
+        logger.error(f"Erro ao renovar o lease de {data} ({process_name}): {e}", exc_info=True)
+        return True
+    finally:
+        conn.close()
+    return renovado
+
+
+def liberar_lease(process_name, data, dono):
+    """Libera o lease de `dono` (sem efeito se ele já foi adquirido por outra execução)."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM ingestion_lease WHERE process_name = %s AND data = %s AND dono = %s",
+                (process_name, parse_data(data), dono)
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        # O lease apenas vence no prazo
+        logger.error(f"Erro ao liberar o lease de {data} ({process_name}): {e}", exc_info=True)
+    finally:
+        conn.close()
+
+
+@contextmanager
+def lease(process_name, data, duracao_s=INGESTION_LEASE_SECONDS):
+    """
+    Mantém o lease da data durante o bloco, renovando-o em segundo plano a
+    cada terço da validade, e o libera ao final.
+
+    Raises:
+        DataEmProcessamento: Outra execução detém um lease vigente da data
+    """
+    if not INGESTION_LEASE_ENABLED:
+        yield
+        return
+
+    dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    adquirido, atual, expira_em = adquirir_lease(process_name, data, dono, duracao_s)
+    if not adquirido:
+        raise DataEmProcessamento(
+            f"Data {data} ({process_name}) em processamento por {atual} (lease até {expira_em:%H:%M:%S})"
+        )
+    logger.debug(f"Lease de {data} ({process_name}) adquirido por {dono}")
+
+    parar = threading.Event()
+
+    def renovar():
+        while not parar.wait(duracao_s / 3):
+            if not renovar_lease(process_name, data, dono, duracao_s):
+                # As inserções são idempotentes: a execução segue, mas a outra também pode processar
+                logger.warning(f"Lease de {data} ({process_name}) perdido para outra execução")
+                return
+
+    renovacao = threading.Thread(target=renovar, name=f"lease-{data}", daemon=True)
+    renovacao.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        renovacao.join(timeout=5)
+        liberar_lease(process_name, data, dono)
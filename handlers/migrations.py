@@ -0,0 +1,154 @@
+"""
+Migrações versionadas do schema do banco.
+
+Cada arquivo `migrations/NNNN_descricao.sql` é aplicado uma única vez, em
+ordem, dentro da própria transação, e registrado em `schema_migrations`.
+Execuções concorrentes são serializadas por advisory lock.
+
+Uso:
+    python -m handlers.migrations [--status]
+"""
+import argparse
+import hashlib
+import os
+import re
+from handlers.database import get_db_connection
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "migrations",
+    log_file="logs/migrations.log"
+)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+# Chave do advisory lock que serializa a aplicação de migrações
+_LOCK_MIGRACOES = 7_420_001
+
+_ARQUIVO_MIGRACAO = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+# Conta dos lançamentos anteriores à coluna process_name (ver 0005),
+# disponível às migrações em current_setting('extrato.conta_padrao')
+CONTA_PADRAO = os.getenv("PROCESS_NAME", "")
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        versao TEXT PRIMARY KEY,
+        nome TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+"""
+
+
+def listar_migracoes(diretorio=MIGRATIONS_DIR):
+    """
+    Returns:
+        list: (versao, nome, caminho) das migrações disponíveis, em ordem
+    """
+    migracoes = []
+    for arquivo in sorted(os.listdir(diretorio)):
+        encontrado = _ARQUIVO_MIGRACAO.match(arquivo)
+        if encontrado:
+            migracoes.append((encontrado.group(1), encontrado.group(2), os.path.join(diretorio, arquivo)))
+    return migracoes
+
+
+def _ler(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        conteudo = f.read()
+    return conteudo, hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def _aplicadas(cursor):
+    cursor.execute("SELECT versao, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def aplicar_migracoes(diretorio=MIGRATIONS_DIR):
+    """
+    Aplica as migrações pendentes, uma transação por migração.
+
+    Returns:
+        list: Versões aplicadas nesta chamada
+    """
+    aplicadas_agora = []
+    conn = get_db_connection(conferir_schema=False)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+        conn.commit()
+
+        for versao, nome, caminho in listar_migracoes(diretorio):
+            conteudo, checksum = _ler(caminho)
+            with conn.cursor() as cursor:
+                # Lock até o fim da transação; a verificação é refeita com o lock obtido
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_MIGRACOES,))
+                aplicadas = _aplicadas(cursor)
+                if versao in aplicadas:
+                    if aplicadas[versao] != checksum:
+                        logger.warning(f"Migração {versao}_{nome} foi alterada após ser aplicada (checksum diferente)")
+                    conn.commit()
+                    continue
+
+                logger.info(f"Aplicando migração {versao}_{nome}")
+                cursor.execute("SELECT set_config('extrato.conta_padrao', %s, true)", (CONTA_PADRAO,))
+                cursor.execute(conteudo)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, nome, checksum) VALUES (%s, %s, %s)",
+                    (versao, nome, checksum)
+                )
+            conn.commit()
+            aplicadas_agora.append(versao)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao aplicar migrações: {e}", exc_info=True)
+        raise
+    finally:
+        conn.close()
+
+    if aplicadas_agora:
+        logger.info(f"Migrações aplicadas: {', '.join(aplicadas_agora)}")
+    else:
+        logger.info("Schema atualizado - nenhuma migração pendente")
+    return aplicadas_agora
+
+
+def status(diretorio=MIGRATIONS_DIR):
+    """
+    Returns:
+        list: (versao, nome, situação) com situação 'aplicada', 'pendente' ou 'alterada'
+    """
+    conn = get_db_connection(conferir_schema=False)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            aplicadas = _aplicadas(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+    situacoes = []
+    for versao, nome, caminho in listar_migracoes(diretorio):
+        _, checksum = _ler(caminho)
+        if versao not in aplicadas:
+            situacao = "pendente"
+        elif aplicadas[versao] != checksum:
+            situacao = "alterada"
+        else:
+            situacao = "aplicada"
+        situacoes.append((versao, nome, situacao))
+    return situacoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações do schema do banco")
+    parser.add_argument("--status", action="store_true", help="Lista as migrações e sua situação sem aplicar")
+    args = parser.parse_args()
+
+    if args.status:
+        for versao, nome, situacao in status():
+            print(f"{versao}_{nome}: {situacao}")
+    else:
+        aplicar_migracoes()
@@ -0,0 +1,188 @@
+import json
+import os
+import queue
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "queue_handler",
+    log_file="logs/queue_handler.log"
+)
+
+load_dotenv()
+
+# URL da fila SQS de itens de trabalho; sem ela o processamento é feito na própria invocação
+WORK_QUEUE_URL = os.getenv("WORK_QUEUE_URL")
+# Quantidade de datas por item de trabalho
+WORK_ITEM_DATES = int(os.getenv("WORK_ITEM_DATES", "1"))
+
+
+@dataclass
+class Mensagem:
+    """Item de trabalho recebido da fila."""
+
+    id: str
+    corpo: dict
+    recibo: Optional[str] = None
+
+
+def montar_itens(process_name, datas, replay=False, datas_por_item=WORK_ITEM_DATES):
+    """
+    Divide as datas de uma conta em itens de trabalho.
+
+    Returns:
+        list: Itens {'process_name', 'datas', 'replay'}
+    """
+    return [
+        {"process_name": process_name, "datas": datas[i:i + datas_por_item], "replay": replay}
+        for i in range(0, len(datas), datas_por_item)
+    ]
+
+
+class WorkQueue(ABC):
+    """Fila de itens de trabalho (datas a processar) entre dispatcher e workers."""
+
+    @abstractmethod
+    def enviar(self, itens: List[dict]) -> int:
+        """Enfileira os itens e retorna a quantidade enviada."""
+
+    @abstractmethod
+    def receber(self, max_mensagens: int = 1, espera: float = 0) -> List[Mensagem]:
+        """Retira até max_mensagens da fila, aguardando até `espera` segundos."""
+
+    @abstractmethod
+    def confirmar(self, mensagem: Mensagem):
+        """Remove definitivamente uma mensagem processada."""
+
+
+class SQSWorkQueue(WorkQueue):
+    """Fila SQS (produção). Workers normalmente recebem as mensagens via trigger da Lambda."""
+
+    # Limite do SendMessageBatch
+    TAMANHO_LOTE = 10
+
+    def __init__(self, queue_url, region_name=None):
+        import boto3
+
+        self.queue_url = queue_url
+        self.sqs = boto3.client('sqs', region_name=region_name or os.getenv('AWS_REGION', 'us-east-1'))
+
+    def enviar(self, itens):
+        enviados = 0
+        for i in range(0, len(itens), self.TAMANHO_LOTE):
+            lote = itens[i:i + self.TAMANHO_LOTE]
+            response = self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {"Id": str(n), "MessageBody": json.dumps(item, ensure_ascii=False)}
+                    for n, item in enumerate(lote)
+                ]
+            )
+            falhas = response.get('Failed', [])
+            if falhas:
+                logger.error(f"Falha ao enfileirar {len(falhas)} itens: {falhas}")
+                raise Exception(f"Falha ao enfileirar {len(falhas)} itens no SQS")
+            enviados += len(lote)
+        logger.info(f"{enviados} itens enfileirados em {self.queue_url}")
+        return enviados
+
+    def receber(self, max_mensagens=1, espera=0):
+        response = self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_mensagens, 10),
+            WaitTimeSeconds=int(espera)
+        )
+        return [
+            Mensagem(id=m['MessageId'], corpo=json.loads(m['Body']), recibo=m['ReceiptHandle'])
+            for m in response.get('Messages', [])
+        ]
+
+    def confirmar(self, mensagem):
+        self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=mensagem.recibo)
+
+
+class LocalWorkQueue(WorkQueue):
+    """Fila em memória, para execução local e testes."""
+
+    def __init__(self):
+        self._fila = queue.Queue()
+
+    def enviar(self, itens):
+        for item in itens:
+            self._fila.put(Mensagem(id=str(uuid.uuid4()), corpo=item))
+        return len(itens)
+
+    def receber(self, max_mensagens=1, espera=0):
+        mensagens = []
+        try:
+            mensagens.append(self._fila.get(timeout=espera) if espera else self._fila.get_nowait())
+            while len(mensagens) < max_mensagens:
+                mensagens.append(self._fila.get_nowait())
+        except queue.Empty:
+            pass
+        return mensagens
+
+    def confirmar(self, mensagem):
+        self._fila.task_done()
+
+
+def mensagens_de_evento_sqs(event):
+    """Converte os Records de um evento SQS da Lambda em mensagens."""
+    return [
+        Mensagem(id=record['messageId'], corpo=json.loads(record['body']), recibo=record.get('receiptHandle'))
+        for record in event.get('Records', [])
+        if record.get('eventSource') == 'aws:sqs'
+    ]
+
+
+def drenar(fila: WorkQueue, processar: Callable[[dict], bool], workers: int = 4):
+    """
+    Consome a fila com `workers` threads até esvaziá-la. Itens cujo
+    processamento retorna False ou levanta exceção não são confirmados.
+
+    Args:
+        fila: Fila a consumir
+        processar: Função que recebe o corpo do item e retorna sucesso
+        workers: Quantidade de threads consumidoras
+
+    Returns:
+        tuple: (itens com sucesso, itens com falha)
+    """
+    contagem = {"sucesso": 0, "falha": 0}
+    lock = threading.Lock()
+
+    def consumir():
+        while True:
+            mensagens = fila.receber(max_mensagens=1)
+            if not mensagens:
+                return
+            mensagem = mensagens[0]
+            try:
+                ok = processar(mensagem.corpo)
+            except Exception as e:
+                logger.error(f"Erro ao processar item {mensagem.id}: {e}", exc_info=True)
+                ok = False
+            if ok:
+                fila.confirmar(mensagem)
+            with lock:
+                contagem["sucesso" if ok else "falha"] += 1
+
+    threads = [threading.Thread(target=consumir, name=f"worker-{n}") for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return contagem["sucesso"], contagem["falha"]
+
+
+def queue_from_env():
+    """Retorna a fila SQS configurada, ou None para processamento na própria invocação."""
+    if WORK_QUEUE_URL:
+        return SQSWorkQueue(WORK_QUEUE_URL)
+    return None
@@ -1,15 +1,16 @@
 import json
 import os
-import sentry_sdk
-from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
-from sentry_sdk.integrations.logging import LoggingIntegration
 import logging
 from datetime import datetime
-from utils.logger import setup_logger
+from utils.logger import setup_logger, flush_logs
 
-# Configurar Sentry
+# Configurar Sentry (importado apenas quando configurado)
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
+    from sentry_sdk.integrations.logging import LoggingIntegration
+
     sentry_logging = LoggingIntegration(
         level=logging.INFO,        # Captura INFO e acima como breadcrumbs
         event_level=logging.ERROR  # Envia ERROR e acima como eventos (issues)
@@ -20,55 +21,123 @@ if SENTRY_DSN:
         integrations=[AwsLambdaIntegration(), sentry_logging],
     )
 
-from main import obter_datas_pendentes, processar_data
+# main é leve: boto3, pandas, numpy e OpenAI só são importados ao processar uma data
+from main import processar_contas, despachar, processar_item, reenfileirar_adiadas, aquecer
+from utils.accounts import carregar_contas
+from handlers.queue_handler import queue_from_env, mensagens_de_evento_sqs
+from utils.deadline import Prazo
+from utils import profiling
+from services import run_metrics
 
 logger = setup_logger(
     "extrato_bb_lambda",
     log_file="logs/extrato_bb_lambda.log"
 )
 
+# Aquecimento na fase de init: 'auto' apenas com provisioned concurrency
+# (init fora do caminho das invocações), 'true' sempre, 'false' nunca
+WARMUP_ON_INIT = os.getenv("WARMUP_ON_INIT", "auto").lower()
+
+def _aquecer_no_init():
+    if WARMUP_ON_INIT == "auto":
+        return os.getenv("AWS_LAMBDA_INITIALIZATION_TYPE") == "provisioned-concurrency"
+    return WARMUP_ON_INIT in ("1", "true", "yes")
+
+# Resultado do último aquecimento deste container (None se não houve)
+prontidao = None
+if _aquecer_no_init():
+    try:
+        prontidao = aquecer()
+    except Exception as e:
+        # O init não deve falhar: o que não foi carregado é feito sob demanda
+        logger.error(f"Erro no aquecimento durante o init: {str(e)}", exc_info=True)
+    finally:
+        flush_logs()
+
+def _resposta_aquecimento(resultado):
+    return {
+        'statusCode': 200 if resultado['pronto'] else 503,
+        'body': json.dumps({
+            'message': 'Pronto' if resultado['pronto'] else 'Aquecimento com falhas',
+            **resultado,
+            'timestamp': datetime.now().isoformat()
+        }, ensure_ascii=False, indent=2)
+    }
+
+def _registrar_resultados(resultados):
+    for resultado in resultados:
+        if resultado['status'] == 'sucesso':
+            logger.info(f"✅ Data {resultado['data']} processada com sucesso ({resultado['process_name']})")
+        elif resultado['status'] == 'adiada':
+            logger.warning(f"⏳ Data {resultado['data']} adiada por falta de tempo ({resultado['process_name']})")
+        elif resultado['status'] == 'em_andamento':
+            logger.info(f"🔒 Data {resultado['data']} já em processamento em outra execução ({resultado['process_name']})")
+        else:
+            logger.error(f"❌ Erro ao processar a data {resultado['data']} ({resultado['process_name']}): {resultado['mensagem']}")
+
 def lambda_handler(event, context):
+    global prontidao
+    # Execuções desta invocação ficam agrupadas no histórico de métricas
+    run_metrics.definir_invocacao(getattr(context, 'aws_request_id', None))
     try:
         logger.info(f"Event: {json.dumps(event)}")
         logger.info(f"Context: {context}")
         
-        # Obter datas pendentes (reutiliza função do main.py)
-        datas_pendentes = obter_datas_pendentes()
-        logger.info(f"Quantidade de datas pendentes: {len(datas_pendentes)}")
-        logger.info(f"Datas pendentes para processamento: {datas_pendentes}")
+        # Replay: reprocessa a partir do arquivo de páginas brutas, sem chamar a API
+        replay = bool(isinstance(event, dict) and event.get('replay'))
 
-        resultados = []
-        
-        # Processar cada data (reutiliza lógica do main.py)
-        for data in datas_pendentes:
-            resultado_data = {
-                'data': data,
-                'status': 'erro',
-                'mensagem': '',
-                'timestamp': datetime.now().isoformat()
+        # Contas do arquivo de configuração (ou a conta do ambiente), opcionalmente filtradas pelo evento
+        contas = carregar_contas()
+        if isinstance(event, dict) and event.get('contas'):
+            contas = [conta for conta in contas if conta.process_name in event['contas']]
+        logger.info(f"Contas para processamento: {[conta.process_name for conta in contas]}")
+
+        # Evento de aquecimento: apenas pré-carrega e informa a prontidão
+        if isinstance(event, dict) and event.get('warmup'):
+            prontidao = aquecer(contas)
+            return _resposta_aquecimento(prontidao)
+
+        # Datas explícitas no evento ou pendentes de cada conta (reutiliza lógica do main.py)
+        datas = (isinstance(event, dict) and event.get('datas')) or None
+
+        # Com fila configurada, esta invocação é apenas o dispatcher: os workers
+        # (worker_handler) consomem os itens em paralelo. 'inline' força o
+        # processamento na própria invocação.
+        fila = queue_from_env()
+        if fila is not None and not (isinstance(event, dict) and event.get('inline')):
+            enfileirados = despachar(fila, contas, datas, replay=replay)
+            logger.info(f"Itens enfileirados: {enfileirados}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Datas enfileiradas',
+                    'enfileirados': enfileirados,
+                    'timestamp': datetime.now().isoformat()
+                }, ensure_ascii=False, indent=2)
             }
-            
-            try:
-                # Reutilizar a lógica de processamento do main.py
-                processar_data(data)
-                
-                resultado_data['status'] = 'sucesso'
-                resultado_data['mensagem'] = f'Processamento concluído para {data}'
-                logger.info(f"✅ Data {data} processada com sucesso")
 
-            except Exception as e:
-                logger.error(f"❌ Erro ao processar a data {data}: {str(e)}", exc_info=True)
-                resultado_data['status'] = 'erro'
-                resultado_data['mensagem'] = str(e)
-            
-            resultados.append(resultado_data)
+        # Perfil de uma data: 'profile' no evento ('DDMMYYYY' ou true para a
+        # primeira data) ou PROFILE_DATE
+        profiling.solicitar(event.get('profile') if isinstance(event, dict) and 'profile' in event else None)
+
+        # Datas só são iniciadas se couberem no tempo restante da invocação
+        resultados = processar_contas(contas, datas, replay=replay, prazo=Prazo.de_contexto(context))
+        _registrar_resultados(resultados)
+
+        # Datas adiadas vão para a fila, se houver; senão continuam pendentes
+        # no estado de ingestão e entram na próxima execução
+        reenfileiradas = reenfileirar_adiadas(fila, resultados, replay=replay) if fila is not None else 0
 
         # Resumo final
         sucessos = len([r for r in resultados if r['status'] == 'sucesso'])
         erros = len([r for r in resultados if r['status'] == 'erro'])
+        adiadas = len([r for r in resultados if r['status'] == 'adiada'])
+        em_andamento = len([r for r in resultados if r['status'] == 'em_andamento'])
         
         logger.info(f"Sucessos: {sucessos}")
         logger.info(f"Erros: {erros}")
+        logger.info(f"Adiadas: {adiadas} (reenfileiradas: {reenfileiradas})")
+        logger.info(f"Em processamento em outra execução: {em_andamento}")
         
         return {
             'statusCode': 200,
@@ -76,6 +145,10 @@ def lambda_handler(event, context):
                 'message': 'Processamento concluído',
                 'sucessos': sucessos,
                 'erros': erros,
+                'adiadas': adiadas,
+                'reenfileiradas': reenfileiradas,
+                'em_andamento': em_andamento,
+                'perfis': [r['perfil'] for r in resultados if r.get('perfil')],
                 'resultados': resultados,
                 'timestamp': datetime.now().isoformat()
             }, ensure_ascii=False, indent=2)
@@ -90,3 +163,77 @@ def lambda_handler(event, context):
                 'timestamp': datetime.now().isoformat()
             }, ensure_ascii=False)
         }
+
+    finally:
+        # Um perfil não consumido não passa para a próxima invocação
+        profiling.solicitar(False)
+        # A Lambda congela o container após o retorno: escrever logs pendentes
+        flush_logs()
+
+def classification_handler(event, context):
+    """
+    Worker de classificação assíncrona (CLASSIFICATION_ASYNC=true), acionado
+    por agendamento: classifica os lançamentos da fila em lotes enquanto
+    houver itens e tempo restante na invocação.
+    """
+    try:
+        # Importado apenas aqui: carrega o classificador (numpy, OpenAI)
+        from services.classification_worker import executar
+
+        totais = executar(prazo=Prazo.de_contexto(context))
+        return {
+            'statusCode': 200 if totais['erro'] is None else 500,
+            'body': json.dumps({
+                'message': 'Classificação concluída' if totais['erro'] is None else 'Classificação interrompida',
+                **totais,
+                'timestamp': datetime.now().isoformat()
+            }, ensure_ascii=False, indent=2)
+        }
+    except Exception as e:
+        logger.error(f"Erro geral no worker de classificação: {str(e)}", exc_info=True)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            }, ensure_ascii=False)
+        }
+    finally:
+        flush_logs()
+
+def worker_handler(event, context):
+    """
+    Worker acionado pela fila SQS: processa os itens de trabalho recebidos.
+    Itens com falha são devolvidos em batchItemFailures (ReportBatchItemFailures)
+    e voltam para a fila; os demais são removidos. Datas que não cabem no tempo
+    restante da invocação são reenfileiradas.
+    """
+    falhas = []
+    run_metrics.definir_invocacao(getattr(context, 'aws_request_id', None))
+    try:
+        contas = carregar_contas()
+        prazo = Prazo.de_contexto(context)
+        for mensagem in mensagens_de_evento_sqs(event):
+            logger.info(f"Item de trabalho {mensagem.id}: {mensagem.corpo}")
+            # Perfil pedido no próprio item ('profile') ou via PROFILE_DATE
+            profiling.solicitar(mensagem.corpo.get('profile'))
+            try:
+                resultados = processar_item(mensagem.corpo, contas, prazo=prazo)
+                _registrar_resultados(resultados)
+                # Datas adiadas voltam para a fila como um novo item
+                if any(r['status'] == 'adiada' for r in resultados):
+                    reenfileirar_adiadas(queue_from_env(), resultados, replay=mensagem.corpo.get('replay', False))
+                if any(r['status'] == 'erro' for r in resultados):
+                    falhas.append(mensagem.id)
+            except Exception as e:
+                logger.error(f"Erro no item de trabalho {mensagem.id}: {str(e)}", exc_info=True)
+                falhas.append(mensagem.id)
+    except Exception as e:
+        # Falha antes de processar os itens (ex.: configuração): todo o lote volta para a fila
+        logger.error(f"Erro geral no worker: {str(e)}", exc_info=True)
+        falhas = [record['messageId'] for record in event.get('Records', [])]
+    finally:
+        profiling.solicitar(False)
+        flush_logs()
+
+    return {'batchItemFailures': [{'itemIdentifier': id_mensagem} for id_mensagem in falhas]}
@@ -1,14 +1,27 @@
-import logging
+import argparse
+import functools
 import os
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dotenv import load_dotenv
-from handlers.auth import get_token
-from services.etl_process import executar_etl, get_extrato_data
-from handlers.database import inserir_no_banco, registrar_status, obter_datas_falhadas, obter_datas_nao_registradas
-from datetime import datetime, timedelta
-import calendar
+from handlers.database import registrar_status
+from handlers import ingestion_state, checkpoint, classification_queue
 from utils.logger import setup_logger
-from handlers.aws_handler import S3Handler
+from utils.metrics import coletar_metricas, timer, incr
+from utils import profiling
+from utils.accounts import carregar_contas, conta_padrao
+from utils.deadline import DEFAULT_DATE_COST_MS, priorizar_datas, prazo_vigente
+from handlers.queue_handler import LocalWorkQueue, montar_itens, drenar
+from services.parquet_export import exporter_from_env
+from services.extrato_archive import identificar_conta
+from services import run_metrics
+
+# Módulos pesados (boto3, requests, pandas, numpy, OpenAI) são importados
+# apenas quando uma data é processada, para reduzir o cold start da Lambda
+# quando não há datas pendentes. Ver benchmarks/import_time.py.
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -19,120 +32,476 @@ logger = setup_logger(
     log_file="logs/extrato_bb.log"
 )
 
-# Configurações gerais
-token_url = os.getenv('TOKEN_URL')
-scope = os.getenv('SCOPE')
-# Tratar senha do certificado: remover espaços, quebras de linha e caracteres de controle
-pfx_password_str = os.getenv('PFX_PASSWORD', '').strip().replace('\n', '').replace('\r', '')
-if not pfx_password_str:
-    logger.warning("PFX_PASSWORD não encontrada ou vazia")
-pfx_password = pfx_password_str.encode('utf-8')
-extrato_url = os.getenv('EXTRATO_URL')
-process_name = os.getenv('PROCESS_NAME')
-basic = os.getenv('BASIC_AUTH')
-
 # Configurações AWS
 aws_region = os.getenv('AWS_REGION', 'us-east-1')
-s3_bucket = os.getenv('S3_BUCKET')
-s3_certificate_key = os.getenv('S3_CERTIFICATE_KEY')
 
-# Inicializar handler AWS - sempre usa IAM role na Lambda
-s3_handler = S3Handler(region_name=aws_region)
+# Contas processadas em paralelo (limitado também pelo pool do banco)
+ACCOUNTS_MAX_WORKERS = int(os.getenv('ACCOUNTS_MAX_WORKERS', '4'))
+
+# Obtenção, classificação e inserção sobrepostas por página (services/pipeline.py)
+ETL_PIPELINE_ENABLED = os.getenv('ETL_PIPELINE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# Handler AWS criado sob demanda - sempre usa IAM role na Lambda
+_s3_handler = None
+_s3_lock = threading.Lock()
+
+def get_s3_handler():
+    global _s3_handler
+    with _s3_lock:
+        if _s3_handler is None:
+            from handlers.aws_handler import S3Handler
+            _s3_handler = S3Handler(region_name=aws_region)
+    return _s3_handler
+
+# Exportação Parquet para analytics (None quando não configurada)
+parquet_exporter = exporter_from_env()
+
+# Certificados baixados por conta: (bucket, chave) -> caminho local.
+# Mantidos durante a vida do container para não baixar a cada data.
+_certificados = {}
+_certificados_lock = threading.Lock()
+
+def obter_certificado(conta):
+    """Baixa o certificado da conta do S3 na primeira vez e reutiliza o arquivo local."""
+    chave = (conta.s3_bucket, conta.s3_certificate_key)
+    with _certificados_lock:
+        local_cert_path = _certificados.get(chave)
+        if local_cert_path and os.path.exists(local_cert_path):
+            incr("cache_hits_certificado")
+            return local_cert_path
+
+        # Diretório por conta: certificados com o mesmo nome não colidem
+        temp_dir = os.path.join(tempfile.gettempdir(), "certificados", conta.process_name)
+        os.makedirs(temp_dir, exist_ok=True)
+        logger.info(f"Fazendo download do certificado do S3 para a conta '{conta.process_name}'")
+        with timer("download_certificate"):
+            local_cert_path = get_s3_handler().download_certificate(
+                conta.s3_bucket,
+                conta.s3_certificate_key,
+                temp_dir=temp_dir
+            )
+        _certificados[chave] = local_cert_path
+        return local_cert_path
 
-def obter_datas_pendentes():
-    # Data de ontem
-    data_ontem = (datetime.now() - timedelta(days=1)).strftime('%d%m%Y')
+def limpar_certificados():
+    """Remove os certificados baixados (fim da execução local)."""
+    with _certificados_lock:
+        for local_cert_path in _certificados.values():
+            if os.path.exists(local_cert_path):
+                try:
+                    get_s3_handler().cleanup_certificate(local_cert_path)
+                except Exception as cleanup_error:
+                    logger.warning(f"Erro ao remover certificado temporário: {cleanup_error}")
+        _certificados.clear()
 
-    # Obter datas falhadas do banco
-    datas_falhadas = obter_datas_falhadas(process_name)
+def _aquecer_banco():
+    from handlers.database import get_db_connection
 
-    # Obter datas sem registros em `datalancamento`
-    datas_nao_registradas = obter_datas_nao_registradas()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        # Tabelas de controle criadas/verificadas uma vez por processo
+        ingestion_state.garantir_schema(conn)
+        checkpoint.garantir_schema(conn)
+        if classification_queue.CLASSIFICATION_ASYNC:
+            classification_queue.garantir_schema(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def _aquecer_classificador():
+    from services.etl_process import get_classifier, get_classification_cache
+
+    classificador = get_classifier()
+    # Cascata: o cliente do LLM também é criado (normalmente só no primeiro escalonamento)
+    if hasattr(classificador, "llm"):
+        classificador.llm
+    get_classification_cache()
+
+def _aquecer_token(conta):
+    from handlers.auth import get_cached_token
 
-    # Combinar todas as datas
-    datas_pendentes = set(datas_falhadas + datas_nao_registradas)
-    
-    # Garantir que a data de ontem esteja na lista
-    if data_ontem not in datas_pendentes:
-        datas_pendentes.add(data_ontem)
+    get_cached_token(conta.basic_auth, conta.token_url, conta.scope)
+
+def aquecer(contas=None):
+    """
+    Pré-carrega o que o processamento de uma data usaria: pool do banco,
+    sessão HTTP, classificador (embeddings) e cache de classificação e, por
+    conta, certificado e token OAuth. As etapas rodam em paralelo e uma
+    falha não impede as demais; o que falhar volta a ser feito sob demanda.
+
+    Args:
+        contas: Contas a aquecer (padrão: carregar_contas())
+
+    Returns:
+        dict: 'pronto' (todas as etapas ok), 'ms' e 'componentes', com
+            status ('ok' ou 'erro'), ms e erro de cada etapa
+    """
+    from handlers.http_client import obter_sessao
 
-    # Filtrar datas futuras
-    datas_pendentes = [
-        data for data in datas_pendentes 
-        if datetime.strptime(data, '%d%m%Y').date() <= datetime.now().date()
+    contas = contas or carregar_contas()
+    etapas = [
+        ("banco", _aquecer_banco),
+        ("sessao_http", obter_sessao),
     ]
+    # Com classificação assíncrona, a ingestão não usa o classificador
+    if not classification_queue.CLASSIFICATION_ASYNC:
+        etapas.append(("classificador", _aquecer_classificador))
+    for conta in contas:
+        etapas.append((f"certificado:{conta.process_name}", lambda conta=conta: obter_certificado(conta)))
+        etapas.append((f"token:{conta.process_name}", lambda conta=conta: _aquecer_token(conta)))
 
-    logger.info(f"Datas pendentes após filtro de datas futuras: {sorted(datas_pendentes)}")
-    return sorted(datas_pendentes)
+    def executar(etapa):
+        nome, funcao = etapa
+        inicio = time.monotonic()
+        try:
+            funcao()
+            return nome, {"status": "ok", "ms": round((time.monotonic() - inicio) * 1000)}
+        except Exception as e:
+            logger.error(f"Erro no aquecimento de '{nome}': {e}", exc_info=True)
+            return nome, {"status": "erro", "ms": round((time.monotonic() - inicio) * 1000), "erro": str(e)}
 
-def processar_data(data):
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(len(etapas), ACCOUNTS_MAX_WORKERS + 2),
+                            thread_name_prefix="aquecimento") as executor:
+        componentes = dict(executor.map(executar, etapas))
+
+    prontidao = {
+        "pronto": all(c["status"] == "ok" for c in componentes.values()),
+        "ms": round((time.monotonic() - inicio) * 1000),
+        "componentes": componentes,
+    }
+    logger.info(f"Aquecimento concluído em {prontidao['ms']} ms "
+                f"({'pronto' if prontidao['pronto'] else 'com falhas'}): "
+                + ", ".join(f"{nome}={c['status']} ({c['ms']} ms)" for nome, c in componentes.items()))
+    return prontidao
+
+def obter_datas_pendentes(conta=None):
+    conta = conta or conta_padrao()
+    # Datas abertas acima da watermark (inclui ontem enquanto não processada)
+    datas_pendentes = ingestion_state.obter_datas_pendentes(conta.process_name)
+    logger.info(f"Datas pendentes ({conta.process_name}): {datas_pendentes}")
+    return datas_pendentes
+
+def processar_data(data, replay=False, conta=None):
     """
     Processa uma data específica: baixa certificado, executa ETL e insere no banco.
     Pode ser chamada pela Lambda ou pelo script local.
+    Com replay=True, os lançamentos vêm do arquivo de páginas brutas e não há
+    download de certificado nem obtenção de token.
+    Sem conta, usa a conta configurada pelas variáveis de ambiente.
+
+    Returns:
+        dict: Arquivos do perfil (utils.profiling) se a data foi perfilada, ou None
+
+    Raises:
+        ingestion_state.DataEmProcessamento: A conta/data já está em
+            processamento em outra execução (lease vigente)
     """
-    # Variável para armazenar o caminho do certificado baixado
+    conta = conta or conta_padrao()
+
+    # Remover zero inicial das datas, se necessário
+    if data.startswith("0"):
+        data = data[1:]
+
+    # Lease da conta/data: execuções simultâneas (Lambda, main.py, workers)
+    # não processam a mesma data; a que chega depois desiste
+    with ingestion_state.lease(conta.process_name, data):
+        # Métricas por estágio emitidas em EMF (CloudWatch) e gravadas no histórico
+        # (process_run_metrics) ao final da data
+        with coletar_metricas(conta.process_name, data, ao_finalizar=run_metrics.registrar, Replay=replay) as coletor:
+            if not profiling.reservar(data):
+                _processar_data(data, replay, conta)
+                return None
+
+            logger.info(f"Perfilando a data {data} ({conta.process_name})")
+            sessao = None
+            try:
+                with profiling.perfilar(f"{conta.process_name}_{data}") as sessao:
+                    _processar_data(data, replay, conta)
+            finally:
+                if sessao is not None and sessao.arquivos:
+                    coletor.set_property("Perfil", sessao.arquivos)
+            return sessao.arquivos
+
+def _processar_data(data, replay, conta):
+    from handlers.auth import get_cached_token
+    from handlers.database import inserir_no_banco
+    from services.etl_process import executar_etl, executar_etl_pipeline
+
+    process_name = conta.process_name
     local_cert_path = None
-    
-    try:
-        # Remover zero inicial das datas, se necessário
-        if data.startswith("0"):
-            data = data[1:]
+    inicio = time.monotonic()
 
+    try:
         # Registrar início do processo para a data
-        logger.info(f"Iniciando processamento para a data {data}")
+        logger.info(f"Iniciando processamento para a data {data} ({process_name})")
         registrar_status(process_name, 'Iniciado', data)
+        ingestion_state.marcar_inicio(process_name, data)
 
-        # Download do certificado do S3
-        logger.info("Fazendo download do certificado do S3")
-        local_cert_path = s3_handler.download_certificate(
-            s3_bucket, 
-            s3_certificate_key
-        )
-        logger.info(f"Certificado baixado com sucesso: {local_cert_path}")
-
-        # Obter token e preparar cabeçalhos
-        logger.debug("Obtendo token de autenticação")
-        token = get_token(basic, token_url, scope)
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        headers = {}
+        if not replay:
+            # Certificado e token em cache por conta
+            if not conta.pfx_password:
+                logger.warning(f"PFX_PASSWORD não encontrada ou vazia para '{process_name}'")
+            local_cert_path = obter_certificado(conta)
+
+            logger.debug("Obtendo token de autenticação")
+            with timer("get_token"):
+                token = get_cached_token(conta.basic_auth, conta.token_url, conta.scope)
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json'
+            }
+
+        # Lançamentos gravados com a conta; com classificação assíncrona, os
+        # débitos entram na fila junto com o INSERT
+        inserir = functools.partial(inserir_no_banco, process_name=process_name)
+        if classification_queue.CLASSIFICATION_ASYNC:
+            classification_queue.preparar()
+            inserir = functools.partial(inserir, enfileirar_classificacao=True)
 
         # Executar ETL para a data específica
         logger.info(f"Executando ETL para a data {data}")
         date_inicio = data
         date_fim = data
-        df_resultante = executar_etl(extrato_url, headers, local_cert_path, pfx_password, date_inicio, date_fim)
+        if ETL_PIPELINE_ENABLED:
+            # Cada página é inserida assim que classificada
+            with timer("executar_etl"):
+                executar_etl_pipeline(
+                    conta.extrato_url, headers, local_cert_path, conta.pfx_password, date_inicio, date_fim,
+                    inserir=inserir, replay=replay, developer_key=conta.developer_application_key
+                )
+        else:
+            with timer("executar_etl"):
+                lote_resultante = executar_etl(
+                    conta.extrato_url, headers, local_cert_path, conta.pfx_password, date_inicio, date_fim,
+                    replay=replay, developer_key=conta.developer_application_key
+                )
+
+            # Inserir no banco de dados
+            logger.info(f"Inserindo dados no banco para a data {data}")
+            with timer("inserir_no_banco"):
+                inserir(lote_resultante)
 
-        # Inserir no banco de dados
-        logger.info(f"Inserindo dados no banco para a data {data}")
-        inserir_no_banco(df_resultante)
+        # Data inserida: checkpoints de página não são mais necessários
+        if not replay:
+            checkpoint.limpar(identificar_conta(conta.extrato_url), data)
+
+        # Atualizar a partição Parquet da data (falha não invalida a ingestão)
+        if parquet_exporter is not None:
+            try:
+                with timer("parquet_export"):
+                    parquet_exporter.exportar_data(data, process_name)
+            except Exception as export_error:
+                incr("parquet_export_erros")
+                logger.error(f"Erro ao exportar Parquet da data {data}: {export_error}", exc_info=True)
 
         # Registrar sucesso para a data
         registrar_status(process_name, 'Processada', data)
+        ingestion_state.marcar_sucesso(process_name, data, duracao_ms=int((time.monotonic() - inicio) * 1000))
         logger.info(f"Processo concluído com sucesso para a data {data}")
 
     except Exception as e:
         registrar_status(process_name, 'Erro', data)
+        ingestion_state.marcar_erro(process_name, data, e)
         logger.error(f"Erro ao processar a data {data}: {str(e)}", exc_info=True)
         logger.error(f"Detalhes do erro: {type(e).__name__}")
         print(f"Erro ao processar a data {data}. Verifique os logs.")
         raise
-    
-    finally:
-        # Limpar certificado baixado localmente
-        if local_cert_path and os.path.exists(local_cert_path):
-            try:
-                s3_handler.cleanup_certificate(local_cert_path)
-                logger.info("Certificado temporário removido com sucesso")
-            except Exception as cleanup_error:
-                logger.warning(f"Erro ao remover certificado temporário: {cleanup_error}")
+
+def processar_datas(conta, datas=None, replay=False, prazo=None):
+    """
+    Processa as datas de uma conta em sequência, sem interromper nas falhas.
+    Com prazo, as datas são priorizadas (ontem, depois as mais antigas) e uma
+    data só é iniciada se o custo estimado couber no tempo restante; as demais
+    são devolvidas com status 'adiada'.
+
+    Args:
+        conta: Conta a processar
+        datas: Datas 'DDMMYYYY' (padrão: datas pendentes da conta)
+        replay: Ler do arquivo de páginas brutas em vez da API
+        prazo: Prazo da invocação (utils.deadline.Prazo), ou None para sem limite
+
+    Returns:
+        list: Um resultado (dict) por data
+    """
+    resultados = []
+    try:
+        datas = datas or obter_datas_pendentes(conta)
+        custo_ms = None
+        if prazo is not None:
+            datas = priorizar_datas(datas)
+            custo_ms = ingestion_state.estimar_duracao_ms(conta.process_name) or DEFAULT_DATE_COST_MS
+            logger.info(f"Custo estimado por data ({conta.process_name}): {custo_ms} ms")
+    except Exception as e:
+        logger.error(f"Erro ao obter datas pendentes de '{conta.process_name}': {e}", exc_info=True)
+        return [{
+            'process_name': conta.process_name,
+            'data': None,
+            'status': 'erro',
+            'mensagem': str(e),
+            'timestamp': datetime.now().isoformat()
+        }]
+
+    for data in datas:
+        resultado_data = {
+            'process_name': conta.process_name,
+            'data': data,
+            'status': 'erro',
+            'mensagem': '',
+            'timestamp': datetime.now().isoformat()
+        }
+        # Só a primeira data da invocação é isenta da verificação (ver Prazo.pode_iniciar)
+        if prazo is not None and not prazo.pode_iniciar(custo_ms):
+            resultado_data['status'] = 'adiada'
+            resultado_data['mensagem'] = f'Tempo restante ({prazo.restante_ms()} ms) insuficiente'
+            resultados.append(resultado_data)
+            continue
+        inicio = time.monotonic()
+        try:
+            # O prazo limita também as esperas entre retentativas HTTP
+            with prazo_vigente(prazo):
+                perfil = processar_data(data, replay=replay, conta=conta)
+            if perfil:
+                resultado_data['perfil'] = perfil
+            resultado_data['status'] = 'sucesso'
+            resultado_data['mensagem'] = f'Processamento concluído para {data}'
+        except ingestion_state.DataEmProcessamento as e:
+            # Não é falha: a outra execução conclui (ou, se interrompida, o lease vence)
+            logger.info(str(e))
+            resultado_data['status'] = 'em_andamento'
+            resultado_data['mensagem'] = str(e)
+        except Exception as e:
+            resultado_data['mensagem'] = str(e)
+        if custo_ms is not None:
+            # Uma data mais lenta que a estimativa eleva o custo das próximas
+            custo_ms = max(custo_ms, int((time.monotonic() - inicio) * 1000))
+        resultados.append(resultado_data)
+
+    adiadas = [r['data'] for r in resultados if r['status'] == 'adiada']
+    if adiadas:
+        logger.warning(f"Datas adiadas por falta de tempo ({conta.process_name}): {adiadas}")
+    return resultados
+
+def processar_contas(contas=None, datas=None, replay=False, prazo=None):
+    """
+    Processa as contas em paralelo (uma thread por conta, até ACCOUNTS_MAX_WORKERS).
+    Cada conta tem certificado e token próprios em cache; o pool do banco e o
+    classificador são compartilhados. O prazo, se informado, vale para todas
+    as contas (ver processar_datas).
+
+    Returns:
+        list: Resultados de todas as contas
+    """
+    contas = contas or carregar_contas()
+    if len(contas) == 1:
+        return processar_datas(contas[0], datas, replay, prazo)
+
+    logger.info(f"Processando {len(contas)} contas em paralelo")
+    resultados = []
+    with ThreadPoolExecutor(max_workers=min(len(contas), ACCOUNTS_MAX_WORKERS),
+                            thread_name_prefix="conta") as executor:
+        futuros = [executor.submit(processar_datas, conta, datas, replay, prazo) for conta in contas]
+        for futuro in futuros:
+            resultados.extend(futuro.result())
+    return resultados
+
+def reenfileirar_adiadas(fila, resultados, replay=False):
+    """
+    Enfileira as datas adiadas por falta de tempo, agrupadas por conta.
+
+    Returns:
+        int: Quantidade de itens enfileirados
+    """
+    por_conta = {}
+    for resultado in resultados:
+        if resultado['status'] == 'adiada':
+            por_conta.setdefault(resultado['process_name'], []).append(resultado['data'])
+    itens = []
+    for process_name, datas in por_conta.items():
+        itens.extend(montar_itens(process_name, datas, replay=replay))
+    return fila.enviar(itens) if itens else 0
+
+def despachar(fila, contas=None, datas=None, replay=False):
+    """
+    Dispatcher: calcula as datas pendentes de cada conta e enfileira um item
+    de trabalho por data (ou grupo de datas, ver WORK_ITEM_DATES).
+
+    Returns:
+        int: Quantidade de itens enfileirados
+    """
+    contas = contas or carregar_contas()
+    itens = []
+    for conta in contas:
+        datas_conta = datas or obter_datas_pendentes(conta)
+        itens.extend(montar_itens(conta.process_name, datas_conta, replay=replay))
+    if not itens:
+        logger.info("Nenhuma data pendente para enfileirar")
+        return 0
+    return fila.enviar(itens)
+
+def processar_item(item, contas=None, prazo=None):
+    """
+    Worker: processa um item de trabalho {'process_name', 'datas', 'replay'}.
+
+    Returns:
+        list: Um resultado (dict) por data do item
+    """
+    contas = contas or carregar_contas()
+    conta = next((c for c in contas if c.process_name == item['process_name']), None)
+    if conta is None:
+        raise ValueError(f"Conta '{item['process_name']}' não configurada neste worker")
+    return processar_datas(conta, item['datas'], replay=item.get('replay', False), prazo=prazo)
+
+def processar_com_workers(contas=None, datas=None, replay=False, workers=ACCOUNTS_MAX_WORKERS):
+    """
+    Dispatcher e workers no mesmo processo, com a fila em memória: as datas
+    pendentes de todas as contas são distribuídas entre `workers` threads.
+
+    Returns:
+        list: Resultados de todas as datas
+    """
+    contas = contas or carregar_contas()
+    fila = LocalWorkQueue()
+    despachar(fila, contas, datas, replay)
+
+    resultados = []
+    resultados_lock = threading.Lock()
+
+    def processar(item):
+        resultados_item = processar_item(item, contas)
+        with resultados_lock:
+            resultados.extend(resultados_item)
+        return all(r['status'] in ('sucesso', 'em_andamento') for r in resultados_item)
+
+    drenar(fila, processar, workers=workers)
+    return resultados
 
 # Execução local (quando rodado como script)
 if __name__ == "__main__":
-    datas_pendentes = obter_datas_pendentes()
-    logger.info(f"Quantidade de datas pendentes: {len(datas_pendentes)}")
-    logger.info(f"Datas pendentes para processamento: {datas_pendentes}")
+    parser = argparse.ArgumentParser(description="Processa extratos do Banco do Brasil")
+    parser.add_argument("datas", nargs="*", help="Datas (DDMMYYYY) a processar; padrão: datas pendentes")
+    parser.add_argument("--replay", action="store_true", help="Lê as páginas do arquivo bruto em vez da API")
+    parser.add_argument("--conta", action="append", help="process_name da conta (padrão: todas as contas configuradas)")
+    parser.add_argument("--workers", type=int, help="Distribui as datas entre N workers locais (fila em memória)")
+    parser.add_argument("--profile", nargs="?", const="primeira", metavar="DATA",
+                        help="Perfila uma data (padrão: a primeira processada); ver PROFILE_DIR")
+    args = parser.parse_args()
+    profiling.solicitar(args.profile)
+
+    contas = carregar_contas()
+    if args.conta:
+        contas = [conta for conta in contas if conta.process_name in args.conta]
+
+    try:
+        if args.workers:
+            resultados = processar_com_workers(contas, args.datas, replay=args.replay, workers=args.workers)
+        else:
+            resultados = processar_contas(contas, args.datas, replay=args.replay)
+    finally:
+        limpar_certificados()
 
-    for data in datas_pendentes:
-        processar_data(data)
+    for resultado in resultados:
+        logger.info(f"{resultado['process_name']} {resultado['data']}: {resultado['status']} {resultado['mensagem']}")
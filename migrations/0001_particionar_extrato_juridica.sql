@@ -0,0 +1,130 @@
+-- Particionamento mensal (RANGE) de extrato_juridica por datalancamento.
+--
+-- Uma tabela existente é renomeada para extrato_juridica_legado e seus dados
+-- são copiados para a nova tabela particionada; a tabela legada é mantida
+-- para conferência e pode ser removida manualmente depois.
+-- Linhas sem datalancamento vão para a partição DEFAULT.
+
+CREATE OR REPLACE FUNCTION extrato_juridica_garantir_particao(dia DATE) RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', dia)::date;
+    fim DATE := (date_trunc('month', dia) + INTERVAL '1 month')::date;
+    nome TEXT := format('extrato_juridica_%s', to_char(dia, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(nome) IS NOT NULL THEN
+        RETURN nome;
+    END IF;
+
+    -- Linhas do mês que caíram na partição DEFAULT impedem a criação: mover
+    CREATE TEMP TABLE IF NOT EXISTS _extrato_juridica_movidas (LIKE extrato_juridica) ON COMMIT DROP;
+    WITH movidas AS (
+        DELETE FROM extrato_juridica_default
+        WHERE datalancamento >= inicio AND datalancamento < fim
+        RETURNING *
+    )
+    INSERT INTO _extrato_juridica_movidas SELECT * FROM movidas;
+
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF extrato_juridica FOR VALUES FROM (%L) TO (%L)',
+            nome, inicio, fim
+        );
+    EXCEPTION WHEN duplicate_table THEN
+        NULL;  -- criada por outra sessão
+    END;
+
+    -- Mantém os valores originais: uma coluna identity GENERATED ALWAYS rejeitaria o INSERT
+    INSERT INTO extrato_juridica OVERRIDING SYSTEM VALUE SELECT * FROM _extrato_juridica_movidas;
+    TRUNCATE _extrato_juridica_movidas;
+    RETURN nome;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION extrato_juridica_criar_particoes_futuras(meses INTEGER DEFAULT 3) RETURNS VOID AS $$
+BEGIN
+    FOR i IN 0..meses LOOP
+        PERFORM extrato_juridica_garantir_particao(
+            (date_trunc('month', current_date) + make_interval(months => i))::date
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    primeiro DATE;
+    ultimo DATE;
+    mes DATE;
+    coluna RECORD;
+BEGIN
+    IF to_regclass('extrato_juridica') IS NOT NULL THEN
+        IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'extrato_juridica'::regclass) THEN
+            RETURN;  -- já particionada
+        END IF;
+
+        ALTER TABLE extrato_juridica RENAME TO extrato_juridica_legado;
+        -- Índices e chave primária não são copiados: em tabela particionada
+        -- eles precisam incluir datalancamento (ver 0002)
+        CREATE TABLE extrato_juridica (
+            LIKE extrato_juridica_legado INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY
+        ) PARTITION BY RANGE (datalancamento);
+
+        -- Sequências de colunas serial passam a pertencer à nova tabela
+        FOR coluna IN
+            SELECT s.relname AS sequencia, a.attname AS nome
+            FROM pg_depend d
+            JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            WHERE d.refobjid = 'extrato_juridica_legado'::regclass AND d.deptype = 'a'
+        LOOP
+            EXECUTE format('ALTER SEQUENCE %I OWNED BY extrato_juridica.%I', coluna.sequencia, coluna.nome);
+        END LOOP;
+    ELSE
+        CREATE TABLE extrato_juridica (
+            indicadortipolancamento INTEGER,
+            datalancamento DATE,
+            datamovimento DATE,
+            codigoagenciaorigem INTEGER,
+            numerolote BIGINT,
+            numerodocumento BIGINT,
+            codigohistorico INTEGER,
+            valorlancamento NUMERIC(15, 2),
+            codigobancocontrapartida INTEGER,
+            codigoagenciacontrapartida INTEGER,
+            textoinformacaocomplementar TEXT,
+            numerocpfcnpjcontrapartida TEXT,
+            indicadortipopessoacontrapartida TEXT,
+            numerocontacontrapartida TEXT,
+            textodescricaohistorico TEXT,
+            textodvcontacontrapartida TEXT,
+            indicadorsinallancamento TEXT,
+            finance_category TEXT
+        ) PARTITION BY RANGE (datalancamento);
+    END IF;
+
+    CREATE TABLE extrato_juridica_default PARTITION OF extrato_juridica DEFAULT;
+
+    IF to_regclass('extrato_juridica_legado') IS NOT NULL THEN
+        SELECT min(datalancamento), max(datalancamento) INTO primeiro, ultimo FROM extrato_juridica_legado;
+        mes := date_trunc('month', primeiro)::date;
+        WHILE mes <= ultimo LOOP
+            PERFORM extrato_juridica_garantir_particao(mes);
+            mes := (mes + INTERVAL '1 month')::date;
+        END LOOP;
+
+        INSERT INTO extrato_juridica OVERRIDING SYSTEM VALUE SELECT * FROM extrato_juridica_legado;
+
+        -- Colunas identity continuam a partir do maior valor copiado
+        FOR coluna IN
+            SELECT attname AS nome FROM pg_attribute
+            WHERE attrelid = 'extrato_juridica'::regclass AND attidentity <> ''
+        LOOP
+            EXECUTE format(
+                'SELECT setval(pg_get_serial_sequence(%L, %L), COALESCE(max(%I), 0) + 1, false) FROM extrato_juridica',
+                'extrato_juridica', coluna.nome, coluna.nome
+            );
+        END LOOP;
+    END IF;
+
+    PERFORM extrato_juridica_criar_particoes_futuras(3);
+END $$;
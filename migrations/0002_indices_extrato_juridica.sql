@@ -0,0 +1,10 @@
+-- Índices de extrato_juridica (criados em cada partição, inclusive nas futuras).
+
+-- Busca das chaves já gravadas por data (inserção idempotente) e filtros por sinal
+CREATE INDEX IF NOT EXISTS ix_extrato_juridica_data_sinal
+    ON extrato_juridica (datalancamento, indicadorsinallancamento);
+
+-- Débitos ainda sem categoria (reclassificação e classificação assíncrona)
+CREATE INDEX IF NOT EXISTS ix_extrato_juridica_debitos_sem_categoria
+    ON extrato_juridica (datalancamento)
+    WHERE indicadorsinallancamento = 'D' AND finance_category IS NULL;
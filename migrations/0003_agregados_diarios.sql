@@ -0,0 +1,43 @@
+-- Agregados diários de extrato_juridica por categoria e sinal.
+--
+-- Mantidos na mesma transação de cada inserção e reclassificação
+-- (handlers/database.py); a carga inicial é feita aqui a partir da tabela.
+-- Lançamentos sem categoria ficam com categoria = '' e sem sinal com sinal = ''.
+-- Lançamentos sem datalancamento não entram nos agregados.
+
+CREATE TABLE IF NOT EXISTS extrato_agregado_diario (
+    data DATE NOT NULL,
+    categoria TEXT NOT NULL,
+    sinal TEXT NOT NULL,
+    valor_total NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    quantidade BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (data, categoria, sinal)
+);
+
+-- Reclassificações atualizam lançamentos por id: garante a coluna (tabela
+-- criada em 0001 sem tabela anterior) e um índice (a chave primária da
+-- tabela anterior não sobrevive ao particionamento)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'extrato_juridica'::regclass AND attname = 'id' AND NOT attisdropped
+    ) THEN
+        ALTER TABLE extrato_juridica ADD COLUMN id BIGSERIAL;
+    END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS ix_extrato_juridica_id ON extrato_juridica (id);
+
+INSERT INTO extrato_agregado_diario (data, categoria, sinal, valor_total, quantidade)
+SELECT
+    datalancamento,
+    COALESCE(finance_category, ''),
+    COALESCE(indicadorsinallancamento, ''),
+    COALESCE(sum(valorlancamento), 0),
+    count(*)
+FROM extrato_juridica
+WHERE datalancamento IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT (data, categoria, sinal) DO UPDATE SET
+    valor_total = EXCLUDED.valor_total,
+    quantidade = EXCLUDED.quantidade;
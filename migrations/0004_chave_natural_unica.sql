@@ -0,0 +1,68 @@
+-- Índice único da chave natural de extrato_juridica.
+--
+-- O particionamento (0001) não preserva a chave primária nem os índices
+-- únicos da tabela anterior: sem um índice único, o ON CONFLICT da inserção
+-- (handlers/database.py) nunca dispara e escritores concorrentes gravam
+-- duplicatas. As duplicatas já gravadas são movidas para
+-- extrato_juridica_duplicadas (fica a de menor id; a tabela é mantida para
+-- conferência e pode ser removida manualmente depois), os agregados das
+-- datas afetadas são recalculados e o índice é criado sobre as colunas de
+-- CHAVE_NATURAL; por incluir datalancamento (chave da partição), ele é
+-- permitido na tabela particionada.
+--
+-- A chave é comparada como em handlers/database._normalizar_chave: nas
+-- colunas de texto, nulo e vazio são iguais e os espaços das pontas são
+-- ignorados (COALESCE(btrim(...), '')); valorlancamento já é NUMERIC(15, 2).
+-- NULLS NOT DISTINCT (PostgreSQL 15+): nulos nas demais colunas também
+-- colidem, como na deduplicação em memória.
+
+CREATE TABLE IF NOT EXISTS extrato_juridica_duplicadas (LIKE extrato_juridica);
+
+CREATE TEMP TABLE _extrato_juridica_duplicadas ON COMMIT DROP AS
+SELECT tableoid, ctid, datalancamento
+FROM (
+    SELECT
+        tableoid, ctid, datalancamento,
+        row_number() OVER (
+            PARTITION BY
+                datalancamento, codigoagenciaorigem, numerolote, numerodocumento,
+                codigohistorico, valorlancamento,
+                COALESCE(btrim(indicadorsinallancamento, E' \t\n\r\x0b\f'), ''),
+                COALESCE(btrim(numerocpfcnpjcontrapartida, E' \t\n\r\x0b\f'), ''),
+                COALESCE(btrim(textoinformacaocomplementar, E' \t\n\r\x0b\f'), '')
+            ORDER BY id
+        ) AS ordem
+    FROM extrato_juridica
+) numeradas
+WHERE ordem > 1;
+
+WITH removidas AS (
+    DELETE FROM extrato_juridica e
+    USING _extrato_juridica_duplicadas d
+    WHERE e.tableoid = d.tableoid AND e.ctid = d.ctid
+    RETURNING e.*
+)
+INSERT INTO extrato_juridica_duplicadas SELECT * FROM removidas;
+
+DELETE FROM extrato_agregado_diario
+WHERE data IN (SELECT datalancamento FROM _extrato_juridica_duplicadas);
+
+INSERT INTO extrato_agregado_diario (data, categoria, sinal, valor_total, quantidade)
+SELECT
+    datalancamento,
+    COALESCE(finance_category, ''),
+    COALESCE(indicadorsinallancamento, ''),
+    COALESCE(sum(valorlancamento), 0),
+    count(*)
+FROM extrato_juridica
+WHERE datalancamento IN (SELECT datalancamento FROM _extrato_juridica_duplicadas)
+GROUP BY 1, 2, 3;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_extrato_juridica_chave_natural
+    ON extrato_juridica (
+        datalancamento, codigoagenciaorigem, numerolote, numerodocumento,
+        codigohistorico, valorlancamento,
+        (COALESCE(btrim(indicadorsinallancamento, E' \t\n\r\x0b\f'), '')),
+        (COALESCE(btrim(numerocpfcnpjcontrapartida, E' \t\n\r\x0b\f'), '')),
+        (COALESCE(btrim(textoinformacaocomplementar, E' \t\n\r\x0b\f'), ''))
+    ) NULLS NOT DISTINCT;
@@ -0,0 +1,59 @@
+-- Conta (process_name) de cada lançamento de extrato_juridica.
+--
+-- Com várias contas (utils/accounts.py) gravando na mesma tabela, a chave
+-- natural, os agregados diários e as consultas por conta precisam
+-- distinguir as contas: lançamentos idênticos de contas diferentes não são
+-- duplicatas. As linhas existentes são atribuídas à conta padrão
+-- (PROCESS_NAME, repassada por handlers/migrations.py em
+-- extrato.conta_padrao).
+
+ALTER TABLE extrato_juridica ADD COLUMN IF NOT EXISTS process_name TEXT;
+ALTER TABLE extrato_juridica_duplicadas ADD COLUMN IF NOT EXISTS process_name TEXT;
+
+DO $$
+DECLARE
+    conta TEXT := NULLIF(current_setting('extrato.conta_padrao', true), '');
+BEGIN
+    IF EXISTS (SELECT 1 FROM extrato_juridica WHERE process_name IS NULL) THEN
+        IF conta IS NULL THEN
+            RAISE EXCEPTION 'extrato_juridica possui lançamentos sem conta: defina PROCESS_NAME '
+                            '(conta dos lançamentos existentes) e aplique as migrações novamente';
+        END IF;
+        UPDATE extrato_juridica SET process_name = conta WHERE process_name IS NULL;
+    END IF;
+    UPDATE extrato_juridica_duplicadas SET process_name = conta WHERE process_name IS NULL;
+END $$;
+
+ALTER TABLE extrato_juridica ALTER COLUMN process_name SET NOT NULL;
+
+-- Chave natural por conta (substitui o índice de 0004, com a mesma
+-- normalização das colunas de texto)
+DROP INDEX IF EXISTS ux_extrato_juridica_chave_natural;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_extrato_juridica_conta_chave_natural
+    ON extrato_juridica (
+        datalancamento, process_name, codigoagenciaorigem, numerolote, numerodocumento,
+        codigohistorico, valorlancamento,
+        (COALESCE(btrim(indicadorsinallancamento, E' \t\n\r\x0b\f'), '')),
+        (COALESCE(btrim(numerocpfcnpjcontrapartida, E' \t\n\r\x0b\f'), '')),
+        (COALESCE(btrim(textoinformacaocomplementar, E' \t\n\r\x0b\f'), ''))
+    ) NULLS NOT DISTINCT;
+
+-- Agregados diários por conta, recarregados a partir de extrato_juridica
+ALTER TABLE extrato_agregado_diario ADD COLUMN IF NOT EXISTS process_name TEXT NOT NULL DEFAULT '';
+ALTER TABLE extrato_agregado_diario DROP CONSTRAINT IF EXISTS extrato_agregado_diario_pkey;
+TRUNCATE extrato_agregado_diario;
+
+INSERT INTO extrato_agregado_diario (data, process_name, categoria, sinal, valor_total, quantidade)
+SELECT
+    datalancamento,
+    process_name,
+    COALESCE(finance_category, ''),
+    COALESCE(indicadorsinallancamento, ''),
+    COALESCE(sum(valorlancamento), 0),
+    count(*)
+FROM extrato_juridica
+WHERE datalancamento IS NOT NULL
+GROUP BY 1, 2, 3, 4;
+
+ALTER TABLE extrato_agregado_diario ALTER COLUMN process_name DROP DEFAULT;
+ALTER TABLE extrato_agregado_diario ADD PRIMARY KEY (data, process_name, categoria, sinal);
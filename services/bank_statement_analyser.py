@@ -4,9 +4,10 @@ sys.path.append(r'D:\OneDrive\Documentos\VS Code\Mercado\bb_integration')
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
+from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
-from typing import Literal
-from handlers.logger import setup_logger
+from typing import Dict, List, Literal, Optional, Tuple
+from utils.logger import setup_logger
 import json
 from dotenv import load_dotenv
 import os
@@ -30,12 +31,15 @@ class TransactionCategory(BaseModel):
         "Outros"
     ] = Field(description="The category of the financial transaction")
 
+# Modelo padrão do analisador
+LLM_MODEL = "gpt-4.1-nano"
+
 class BankStatementAnalyzer:
-    def __init__(self):
+    def __init__(self, model: str = LLM_MODEL, categories_path: str = "data/categories_definition.json"):
         try:
             # Configure OpenAI with GPT-4
             self.llm = ChatOpenAI(
-                model="gpt-4.1-nano",
+                model=model,
                 temperature=0.1,  # Lower temperature for more consistent results
                 api_key=os.getenv('OPENAI_API_KEY')
             )
@@ -105,6 +109,9 @@ class BankStatementAnalyzer:
                 
                 {format_instructions}""")
             ])
+            # Categorias do classificador de embeddings: usadas na classificação em lote
+            with open(categories_path, 'r', encoding='utf-8') as f:
+                self.categories = json.load(f)
             logger.info("BankStatementAnalyzer initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing BankStatementAnalyzer: {e}", exc_info=True)
@@ -152,4 +159,65 @@ class BankStatementAnalyzer:
             
         except Exception as e:
             logger.error(f"Error categorizing transaction: {e}", exc_info=True)
-            return "Outros"
\ No newline at end of file
+            return "Outros"
+
+    def _batch_system_prompt(self) -> str:
+        linhas = []
+        for nome, info in self.categories.items():
+            exemplos = ", ".join(f'"{exemplo}"' for exemplo in info.get('examples', [])[:8])
+            linhas.append(f"- {nome}: {info.get('description', '')} Exemplos: {exemplos}")
+        return (
+            "Você é um classificador de transações financeiras especializado em supermercados. "
+            "Classifique cada transação bancária (débitos de uma conta jurídica de supermercado) "
+            "em exatamente uma das categorias abaixo.\n\n"
+            "Categorias:\n" + "\n".join(linhas) + "\n\n"
+            "Responda APENAS com um objeto JSON no formato "
+            '{"categorias": ["categoria da transação 1", "categoria da transação 2", ...]}, '
+            "com uma categoria por transação, na mesma ordem e usando os nomes exatos das categorias."
+        )
+
+    def categorize_batch(self, transactions: List[Tuple[str, str]]) -> Tuple[List[Optional[str]], Dict[str, int]]:
+        """
+        Classifica várias transações em uma única chamada ao LLM, usando as
+        categorias de data/categories_definition.json.
+
+        Args:
+            transactions: Lista de (descrição, informação adicional)
+
+        Returns:
+            tuple: (categorias na ordem das transações, None onde a resposta não
+                trouxe uma categoria válida; tokens usados 'input_tokens'/'output_tokens')
+        """
+        itens = "\n".join(
+            f"{i}. Descrição: {description or ''} | Informação Adicional: {additional_info or ''}"
+            for i, (description, additional_info) in enumerate(transactions, start=1)
+        )
+        response = self.llm.invoke([
+            SystemMessage(content=self._batch_system_prompt()),
+            HumanMessage(content=f"Classifique estas {len(transactions)} transações:\n{itens}"),
+        ])
+        logger.debug(f"LLM Response: {response.content}")
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        tokens = {
+            "input_tokens": int(usage.get("input_tokens", 0)),
+            "output_tokens": int(usage.get("output_tokens", 0)),
+        }
+
+        categorias = [None] * len(transactions)
+        try:
+            conteudo = response.content
+            payload = json.loads(conteudo[conteudo.find("{"):conteudo.rfind("}") + 1])
+            respostas = payload.get("categorias", [])
+        except Exception as e:
+            logger.error(f"Failed to parse batch response: {e}")
+            return categorias, tokens
+
+        if len(respostas) != len(transactions):
+            logger.warning(f"Batch response has {len(respostas)} categories for {len(transactions)} transactions")
+        for i, categoria in enumerate(respostas[:len(transactions)]):
+            if categoria in self.categories:
+                categorias[i] = categoria
+            else:
+                logger.warning(f"Unknown category in batch response: {categoria}")
+        return categorias, tokens
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+from utils.metrics import timer, incr
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "cascade_classifier",
+    log_file="logs/cascade_classifier.log"
+)
+
+# Cascata kNN -> LLM (chamadas pagas; ligar por ambiente); desligada, o ETL
+# usa apenas o classificador de embeddings
+CLASSIFIER_CASCADE_ENABLED = os.getenv("CLASSIFIER_CASCADE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Escalonamento para o LLM quando o score do kNN ou a margem para a segunda
+# categoria ficam abaixo dos limiares
+CASCADE_MIN_SCORE = float(os.getenv("CASCADE_MIN_SCORE", "0.45"))
+CASCADE_MIN_MARGIN = float(os.getenv("CASCADE_MIN_MARGIN", "0.05"))
+# Transações por chamada ao LLM
+CASCADE_LLM_BATCH_SIZE = int(os.getenv("CASCADE_LLM_BATCH_SIZE", "25"))
+CASCADE_LLM_MODEL = os.getenv("CASCADE_LLM_MODEL", "gpt-4.1-nano")
+# Preço (US$) por milhão de tokens, para o custo reportado
+LLM_PRICE_INPUT_PER_1M = float(os.getenv("LLM_PRICE_INPUT_PER_1M", "0.10"))
+LLM_PRICE_OUTPUT_PER_1M = float(os.getenv("LLM_PRICE_OUTPUT_PER_1M", "0.40"))
+
+CASCADE_CLASSIFIER_NAME = "cascata_knn_llm"
+
+
+def margem(classification):
+    """Diferença entre o score da categoria escolhida e o da segunda melhor."""
+    scores = sorted((classification.get("all_scores") or {}).values(), reverse=True)
+    if not scores:
+        return 0.0
+    return float(scores[0] - (scores[1] if len(scores) > 1 else 0.0))
+
+
+def custo_llm(input_tokens, output_tokens):
+    """Custo estimado (US$) de uma chamada ao LLM."""
+    return (input_tokens * LLM_PRICE_INPUT_PER_1M + output_tokens * LLM_PRICE_OUTPUT_PER_1M) / 1_000_000
+
+
+class CascadeClassifier:
+    """
+    Classificação em cascata: o kNN de embeddings resolve os casos
+    confiantes e apenas os de score ou margem baixos são enviados ao LLM
+    (BankStatementAnalyzer), em lotes. Se o LLM falhar ou não responder uma
+    transação, vale a categoria do kNN.
+    """
+
+    def __init__(self, knn, min_score=CASCADE_MIN_SCORE, min_margem=CASCADE_MIN_MARGIN,
+                 tamanho_lote=CASCADE_LLM_BATCH_SIZE, modelo_llm=CASCADE_LLM_MODEL):
+        """
+        Args:
+            knn: EmbeddingClassifier (ou objeto com classify_transaction)
+            min_score: Score mínimo do kNN para não escalar
+            min_margem: Margem mínima entre as duas melhores categorias para não escalar
+            tamanho_lote: Transações por chamada ao LLM
+            modelo_llm: Modelo do BankStatementAnalyzer
+        """
+        self.knn = knn
+        self.min_score = min_score
+        self.min_margem = min_margem
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.modelo_llm = modelo_llm
+        self._llm = None
+        self._llm_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        # Criado apenas se alguma transação for escalada
+        with self._llm_lock:
+            if self._llm is None:
+                from services.bank_statement_analyser import BankStatementAnalyzer
+                self._llm = BankStatementAnalyzer(model=self.modelo_llm)
+        return self._llm
+
+    def precisa_escalar(self, classification):
+        return classification["score"] < self.min_score or margem(classification) < self.min_margem
+
+    def classify_transaction(self, description, additional_info):
+        return self.classify_batch([(description, additional_info)])[0]
+
+    def classify_batch(self, transacoes):
+        """
+        Args:
+            transacoes: Lista de (descrição, informação adicional)
+
+        Returns:
+            list: Resultado por transação, no formato do EmbeddingClassifier,
+                com 'origem' ('knn' ou 'llm'). 'pendente_llm' indica uma
+                transação escalada que ficou com a categoria do kNN por
+                falha do LLM (não deve ir para o cache de classificação).
+        """
+        resultados = []
+        for description, additional_info in transacoes:
+            classification = self.knn.classify_transaction(description, additional_info)
+            resultados.append(dict(classification, origem="knn"))
+
+        escalar = [i for i, classification in enumerate(resultados) if self.precisa_escalar(classification)]
+        incr("classificacoes_cascata", len(resultados))
+        incr("classificacoes_escaladas", len(escalar))
+        if not escalar:
+            return resultados
+
+        chamadas = 0
+        tokens_entrada = tokens_saida = 0
+        inicio = time.perf_counter()
+        for posicao in range(0, len(escalar), self.tamanho_lote):
+            bloco = escalar[posicao:posicao + self.tamanho_lote]
+            try:
+                with timer("classificacao_llm"):
+                    categorias, uso = self.llm.categorize_batch([transacoes[i] for i in bloco])
+            except Exception as e:
+                incr("llm_erros")
+                logger.error(f"Erro na classificação de {len(bloco)} transações pelo LLM: {e}", exc_info=True)
+                categorias, uso = [None] * len(bloco), {}
+            else:
+                chamadas += 1
+            tokens_entrada += uso.get("input_tokens", 0)
+            tokens_saida += uso.get("output_tokens", 0)
+
+            for i, categoria in zip(bloco, categorias):
+                if categoria is None:
+                    resultados[i]["pendente_llm"] = True
+                    continue
+                resultados[i]["categoria_knn"] = resultados[i]["category"]
+                resultados[i]["category"] = categoria
+                resultados[i]["origem"] = "llm"
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        custo = custo_llm(tokens_entrada, tokens_saida)
+        incr("llm_chamadas", chamadas)
+        incr("llm_tokens_entrada", tokens_entrada)
+        incr("llm_tokens_saida", tokens_saida)
+        incr("llm_custo_usd", custo)
+        alteradas = sum(1 for i in escalar if resultados[i].get("categoria_knn", resultados[i]["category"]) != resultados[i]["category"])
+        logger.info(
+            "Cascata: %s de %s transações escaladas (%.1f%%), %s alteradas pelo LLM; "
+            "%s chamadas em %.0f ms, %s/%s tokens, US$ %.6f",
+            len(escalar), len(resultados), 100.0 * len(escalar) / len(resultados), alteradas,
+            chamadas, duracao_ms, tokens_entrada, tokens_saida, custo
+        )
+        return resultados
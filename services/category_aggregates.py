@@ -0,0 +1,229 @@
+"""
+Consultas sobre os agregados diários de gastos por categoria
+(`extrato_agregado_diario`, migrations/0003) e reconstrução para
+verificação de consistência.
+
+Uso:
+    python -m services.category_aggregates --resumo 2025-03 [--conta NOME]
+    python -m services.category_aggregates --verificar [--inicio 2025-01-01 --fim 2025-03-31]
+    python -m services.category_aggregates --reconstruir [--inicio ... --fim ...]
+"""
+import argparse
+import calendar
+from datetime import date
+from decimal import Decimal
+from handlers.database import get_db_connection
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "category_aggregates",
+    log_file="logs/category_aggregates.log"
+)
+
+# Agregação de extrato_juridica no formato de extrato_agregado_diario
+_AGREGAR_EXTRATO = """
+    SELECT
+        datalancamento AS data,
+        process_name,
+        COALESCE(finance_category, '') AS categoria,
+        COALESCE(indicadorsinallancamento, '') AS sinal,
+        COALESCE(sum(valorlancamento), 0) AS valor_total,
+        count(*) AS quantidade
+    FROM extrato_juridica
+    WHERE datalancamento IS NOT NULL
+      AND datalancamento >= %(inicio)s AND datalancamento <= %(fim)s
+      AND (%(conta)s::text IS NULL OR process_name = %(conta)s)
+    GROUP BY 1, 2, 3, 4
+"""
+
+# Intervalo usado quando nenhum limite é informado
+_DATA_MINIMA = date(1900, 1, 1)
+_DATA_MAXIMA = date(9999, 12, 31)
+
+
+def _mes(ano, mes):
+    return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+
+def _consultar(query, params):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            colunas = [descricao[0] for descricao in cursor.description]
+            linhas = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+        conn.commit()
+        return linhas
+    finally:
+        conn.close()
+
+
+def _categoria(linhas):
+    # '' representa "sem categoria" na tabela
+    for linha in linhas:
+        if "categoria" in linha:
+            linha["categoria"] = linha["categoria"] or None
+    return linhas
+
+
+def resumo_mensal(ano, mes, sinal="D", conta=None):
+    """
+    Total e quantidade por categoria em um mês, lidos dos agregados
+    (uma linha por dia x conta x categoria, sem varrer extrato_juridica).
+
+    Args:
+        ano: Ano
+        mes: Mês (1-12)
+        sinal: 'D' (débitos), 'C' (créditos) ou None para ambos
+        conta: process_name da conta, ou None para todas as contas somadas
+
+    Returns:
+        list: dicts com categoria (None = sem categoria), sinal, valor_total e quantidade,
+            do maior para o menor valor
+    """
+    inicio, fim = _mes(ano, mes)
+    return _categoria(_consultar("""
+        SELECT categoria, sinal, sum(valor_total) AS valor_total, sum(quantidade) AS quantidade
+        FROM extrato_agregado_diario
+        WHERE data >= %(inicio)s AND data <= %(fim)s
+          AND (%(sinal)s::text IS NULL OR sinal = %(sinal)s)
+          AND (%(conta)s::text IS NULL OR process_name = %(conta)s)
+        GROUP BY categoria, sinal
+        HAVING sum(quantidade) > 0
+        ORDER BY valor_total DESC, categoria
+    """, {"inicio": inicio, "fim": fim, "sinal": sinal, "conta": conta}))
+
+
+def serie_diaria(inicio, fim, categoria=None, sinal="D", conta=None):
+    """
+    Totais diários entre duas datas (inclusive).
+
+    Args:
+        inicio: date inicial
+        fim: date final
+        categoria: Filtra uma categoria ('' para sem categoria; None para todas, somadas)
+        sinal: 'D', 'C' ou None para ambos
+        conta: process_name da conta, ou None para todas as contas somadas
+
+    Returns:
+        list: dicts com data, valor_total e quantidade, em ordem de data
+    """
+    return _consultar("""
+        SELECT data, sum(valor_total) AS valor_total, sum(quantidade) AS quantidade
+        FROM extrato_agregado_diario
+        WHERE data >= %(inicio)s AND data <= %(fim)s
+          AND (%(categoria)s::text IS NULL OR categoria = %(categoria)s)
+          AND (%(sinal)s::text IS NULL OR sinal = %(sinal)s)
+          AND (%(conta)s::text IS NULL OR process_name = %(conta)s)
+        GROUP BY data
+        HAVING sum(quantidade) > 0
+        ORDER BY data
+    """, {"inicio": inicio, "fim": fim, "categoria": categoria, "sinal": sinal, "conta": conta})
+
+
+def verificar(inicio=None, fim=None, conta=None):
+    """
+    Compara os agregados com a agregação feita diretamente em extrato_juridica.
+
+    Returns:
+        list: Divergências (data, conta, categoria, sinal, agregado, recalculado),
+            onde agregado e recalculado são (valor_total, quantidade)
+    """
+    params = {"inicio": inicio or _DATA_MINIMA, "fim": fim or _DATA_MAXIMA, "conta": conta}
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            # Mesmo snapshot para as duas leituras
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute(_AGREGAR_EXTRATO, params)
+            recalculados = {linha[:4]: (linha[4], linha[5]) for linha in cursor.fetchall()}
+            cursor.execute("""
+                SELECT data, process_name, categoria, sinal, valor_total, quantidade
+                FROM extrato_agregado_diario
+                WHERE data >= %(inicio)s AND data <= %(fim)s
+                  AND (%(conta)s::text IS NULL OR process_name = %(conta)s)
+            """, params)
+            agregados = {linha[:4]: (linha[4], linha[5]) for linha in cursor.fetchall()}
+        conn.commit()
+    finally:
+        conn.close()
+
+    vazio = (Decimal(0), 0)
+    divergencias = []
+    for chave in sorted(set(recalculados) | set(agregados)):
+        agregado = agregados.get(chave, vazio)
+        recalculado = recalculados.get(chave, vazio)
+        if agregado != recalculado:
+            divergencias.append(chave + (agregado, recalculado))
+    if divergencias:
+        logger.warning(f"{len(divergencias)} divergências entre os agregados e extrato_juridica")
+    else:
+        logger.info("Agregados diários consistentes com extrato_juridica")
+    return divergencias
+
+
+def reconstruir(inicio=None, fim=None, conta=None):
+    """
+    Recalcula os agregados do intervalo (de uma conta ou de todas) a partir
+    de extrato_juridica. Inserções e reclassificações concorrentes esperam o
+    fim da reconstrução (lock da tabela de agregados) e aplicam seus deltas
+    depois dela.
+
+    Returns:
+        int: Linhas de agregados gravadas
+    """
+    params = {"inicio": inicio or _DATA_MINIMA, "fim": fim or _DATA_MAXIMA, "conta": conta}
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("LOCK TABLE extrato_agregado_diario IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute("""
+                DELETE FROM extrato_agregado_diario
+                WHERE data >= %(inicio)s AND data <= %(fim)s
+                  AND (%(conta)s::text IS NULL OR process_name = %(conta)s)
+            """, params)
+            removidas = cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO extrato_agregado_diario (data, process_name, categoria, sinal, valor_total, quantidade)
+                {_AGREGAR_EXTRATO}
+            """, params)
+            gravadas = cursor.rowcount
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erro ao reconstruir agregados: {e}", exc_info=True)
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Agregados reconstruídos: {removidas} linhas removidas, {gravadas} gravadas")
+    return gravadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregados diários de gastos por categoria")
+    acao = parser.add_mutually_exclusive_group(required=True)
+    acao.add_argument("--resumo", metavar="AAAA-MM", help="Resumo por categoria de um mês")
+    acao.add_argument("--verificar", action="store_true", help="Compara os agregados com extrato_juridica")
+    acao.add_argument("--reconstruir", action="store_true", help="Recalcula os agregados a partir de extrato_juridica")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Data final (AAAA-MM-DD)")
+    parser.add_argument("--sinal", default="D", help="D, C ou 'todos' (apenas com --resumo)")
+    parser.add_argument("--conta", help="process_name da conta (padrão: todas)")
+    args = parser.parse_args()
+
+    if args.resumo:
+        ano, mes = map(int, args.resumo.split("-"))
+        sinal = None if args.sinal == "todos" else args.sinal
+        for linha in resumo_mensal(ano, mes, sinal=sinal, conta=args.conta):
+            print(f"{linha['categoria'] or '(sem categoria)':<40}{linha['sinal']:>3}"
+                  f"{linha['valor_total']:>18,.2f}{linha['quantidade']:>10}")
+    elif args.verificar:
+        divergencias = verificar(args.inicio, args.fim, args.conta)
+        for data, conta, categoria, sinal, agregado, recalculado in divergencias:
+            print(f"{data} {conta} {categoria or '(sem categoria)'} {sinal}: "
+                  f"agregado={agregado} recalculado={recalculado}")
+        print(f"{len(divergencias)} divergências")
+    else:
+        print(f"{reconstruir(args.inicio, args.fim, args.conta)} linhas de agregados gravadas")
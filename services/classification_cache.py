@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from dotenv import load_dotenv
+from handlers.database import get_db_connection
+from utils.logger import setup_logger
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "classification_cache",
+    log_file="logs/classification_cache.log"
+)
+
+# Permite desligar o cache (ex: avaliação de um novo classificador)
+CLASSIFICATION_CACHE_ENABLED = os.getenv("CLASSIFICATION_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+# Idade (dias) a partir da qual entradas de outras versões do classificador
+# são removidas; até lá continuam disponíveis para containers ainda na
+# versão anterior (deploy gradual) e para um rollback
+CLASSIFICATION_CACHE_TTL_DAYS = int(os.getenv("CLASSIFICATION_CACHE_TTL_DAYS", "30"))
+
+CATEGORIES_PATH = "data/categories_definition.json"
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS classification_cache (
+        texto_hash TEXT NOT NULL,
+        classificador TEXT NOT NULL,
+        versao TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        score DOUBLE PRECISION NOT NULL,
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (classificador, versao, texto_hash)
+    );
+"""
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_texto(descricao, info):
+    """Texto da transação normalizado (Unicode NFKC, minúsculas, espaços simples)."""
+    texto = unicodedata.normalize("NFKC", f"{descricao or ''} {info or ''}")
+    return _ESPACOS.sub(" ", texto).strip().casefold()
+
+
+def hash_texto(descricao, info):
+    return hashlib.sha256(normalizar_texto(descricao, info).encode("utf-8")).hexdigest()
+
+
+def versao_classificador(modelo, k, caminho_categorias=CATEGORIES_PATH):
+    """
+    Versão do classificador: hash das definições de categorias, do modelo de
+    embedding e de k. Qualquer mudança gera uma nova versão: as entradas das
+    versões anteriores deixam de ser lidas e expiram por idade.
+    """
+    with open(caminho_categorias, "r", encoding="utf-8") as f:
+        categorias = json.load(f)
+    conteudo = json.dumps({"categorias": categorias, "modelo": modelo, "k": k}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    Cache compartilhado (Postgres) de classificações por texto normalizado,
+    classificador e versão. Lido em lote antes de classificar e gravado em
+    lote depois; falhas do banco degradam para cache vazio.
+    """
+
+    def __init__(self, classificador, versao):
+        self.classificador = classificador
+        self.versao = versao
+        self._schema_verificado = False
+
+    def _garantir_schema(self, conn):
+        if self._schema_verificado:
+            return
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+            # Outras versões podem estar em uso (deploy gradual, rollback):
+            # só as entradas antigas são removidas
+            cursor.execute(
+                "DELETE FROM classification_cache WHERE classificador = %s AND versao <> %s "
+                "AND criado_em < now() - make_interval(days => %s)",
+                (self.classificador, self.versao, CLASSIFICATION_CACHE_TTL_DAYS)
+            )
+            if cursor.rowcount:
+                logger.info(f"Removidas {cursor.rowcount} entradas expiradas de outras versões de '{self.classificador}'")
+        conn.commit()
+        self._schema_verificado = True
+
+    def buscar(self, hashes):
+        """
+        Args:
+            hashes: Hashes de texto (ver hash_texto)
+
+        Returns:
+            dict: hash -> (categoria, score) para os hashes encontrados
+        """
+        if not hashes:
+            return {}
+        conn = get_db_connection()
+        try:
+            self._garantir_schema(conn)
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT texto_hash, categoria, score FROM classification_cache
+                    WHERE classificador = %s AND versao = %s AND texto_hash = ANY(%s)
+                """, (self.classificador, self.versao, list(hashes)))
+                encontrados = {h: (categoria, score) for h, categoria, score in cursor.fetchall()}
+            conn.commit()
+            return encontrados
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao ler o cache de classificação: {e}", exc_info=True)
+            return {}
+        finally:
+            conn.close()
+
+    def gravar(self, entradas):
+        """
+        Args:
+            entradas: dict hash -> (categoria, score)
+        """
+        if not entradas:
+            return
+        from psycopg2.extras import execute_values
+
+        conn = get_db_connection()
+        try:
+            self._garantir_schema(conn)
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO classification_cache (texto_hash, classificador, versao, categoria, score)
+                    VALUES %s
+                    ON CONFLICT (classificador, versao, texto_hash) DO NOTHING
+                """, [
+                    (h, self.classificador, self.versao, categoria, float(score))
+                    for h, (categoria, score) in entradas.items()
+                ])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao gravar o cache de classificação: {e}", exc_info=True)
+        finally:
+            conn.close()
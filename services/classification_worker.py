@@ -0,0 +1,150 @@
+"""
+Worker de classificação assíncrona (CLASSIFICATION_ASYNC=true): consome a
+fila `classificacao_pendente` em lotes, classifica os débitos inseridos sem
+categoria e grava as categorias com os agregados diários.
+
+Uso:
+    python -m services.classification_worker [--lotes N] [--tamanho 500]
+    python -m services.classification_worker --status
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from handlers import classification_queue
+from services import parquet_export
+from utils.logger import setup_logger
+from utils.metrics import coletar_metricas, timer, incr
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "classification_worker",
+    log_file="logs/classification_worker.log"
+)
+
+# Lançamentos reservados e classificados por lote
+CLASSIFICATION_BATCH_SIZE = int(os.getenv("CLASSIFICATION_BATCH_SIZE", "500"))
+
+# A ingestão exporta o Parquet antes da classificação: o worker regrava as
+# datas que classificou (None se a exportação não estiver configurada)
+parquet_exporter = parquet_export.exporter_from_env()
+
+
+def classificar_lote(limite=CLASSIFICATION_BATCH_SIZE):
+    """
+    Reserva, classifica e grava um lote da fila e regrava o Parquet das
+    datas alteradas. Em caso de falha do classificador ou do banco, o lote
+    volta à fila com espera exponencial.
+
+    Returns:
+        dict: 'reservados', 'classificados' e 'alterados' (0 reservados: fila vazia)
+
+    Raises:
+        Exception: Falha ao classificar ou gravar o lote (já devolvido à fila)
+    """
+    # Importado apenas no worker: carrega numpy e o classificador
+    from services.etl_process import classificar_textos
+
+    with timer("reserva_fila"):
+        itens = classification_queue.reservar(limite)
+    resultado = {"reservados": len(itens), "classificados": 0, "alterados": 0}
+    if not itens:
+        return resultado
+
+    ids_itens = [id_item for id_item, _, _, _ in itens]
+    afetadas = set()
+    try:
+        pares = [(descricao or '', info or '') for _, _, descricao, info in itens]
+        categorias = classificar_textos(pares)
+
+        concluidos, alteracoes, sem_categoria = [], [], []
+        for (id_item, id_lancamento, _, _), par in zip(itens, pares):
+            if categorias.get(par) is None:
+                sem_categoria.append(id_item)
+            else:
+                concluidos.append(id_item)
+                alteracoes.append((id_lancamento, categorias[par]))
+
+        if concluidos:
+            with timer("gravacao_categorias"):
+                resultado["alterados"], afetadas = classification_queue.concluir(concluidos, alteracoes)
+        resultado["classificados"] = len(concluidos)
+    except Exception as e:
+        incr("classificacao_lotes_erros")
+        classification_queue.adiar(ids_itens, e)
+        raise
+
+    if afetadas and parquet_exporter is not None:
+        # Após o commit: falhas ficam registradas sem devolver o lote à fila
+        with timer("parquet_export"):
+            parquet_export.reexportar(afetadas, parquet_exporter)
+
+    if sem_categoria:
+        # Sem categoria (ex: nenhum vizinho): tenta de novo mais tarde
+        classification_queue.adiar(sem_categoria, "classificador não retornou categoria")
+    incr("classificacoes_assincronas", resultado["classificados"])
+    return resultado
+
+
+def executar(prazo=None, max_lotes=None, limite=CLASSIFICATION_BATCH_SIZE):
+    """
+    Processa lotes até a fila esvaziar, `max_lotes` ou o fim do prazo. Um
+    lote só é iniciado se a duração do mais lento até aqui couber no tempo
+    restante; o primeiro sempre é iniciado.
+
+    Args:
+        prazo: utils.deadline.Prazo da invocação, ou None para sem limite
+        max_lotes: Máximo de lotes (None: até esvaziar a fila)
+        limite: Lançamentos por lote
+
+    Returns:
+        dict: Totais de 'lotes', 'classificados' e 'alterados', 'erro' (ou
+            None) e 'fila' (classification_queue.status())
+    """
+    totais = {"lotes": 0, "classificados": 0, "alterados": 0, "erro": None}
+    custo_ms = 0
+    with coletar_metricas("classificacao_assincrona", datetime.now().strftime('%d%m%Y')):
+        while max_lotes is None or totais["lotes"] < max_lotes:
+            if prazo is not None and totais["lotes"] and not prazo.cabe(custo_ms):
+                logger.info(f"Tempo restante ({prazo.restante_ms()} ms) insuficiente para outro lote")
+                break
+            inicio = time.monotonic()
+            try:
+                with timer("lote_classificacao"):
+                    resultado = classificar_lote(limite)
+            except Exception as e:
+                # Provável indisponibilidade do classificador: a próxima execução retoma
+                logger.error(f"Erro ao classificar lote da fila: {e}", exc_info=True)
+                totais["erro"] = str(e)
+                break
+            if resultado["reservados"] == 0:
+                break
+            custo_ms = max(custo_ms, int((time.monotonic() - inicio) * 1000))
+            totais["lotes"] += 1
+            totais["classificados"] += resultado["classificados"]
+            totais["alterados"] += resultado["alterados"]
+            logger.info(f"Lote {totais['lotes']}: {resultado['classificados']} de {resultado['reservados']} "
+                        f"lançamentos classificados ({resultado['alterados']} alterados)")
+
+    totais["fila"] = classification_queue.status()
+    logger.info(f"Classificação assíncrona: {totais['lotes']} lotes, {totais['classificados']} "
+                f"lançamentos; fila: {totais['fila']}")
+    return totais
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de classificação assíncrona")
+    parser.add_argument("--lotes", type=int, help="Máximo de lotes (padrão: até esvaziar a fila)")
+    parser.add_argument("--tamanho", type=int, default=CLASSIFICATION_BATCH_SIZE, help="Lançamentos por lote")
+    parser.add_argument("--status", action="store_true", help="Apenas exibe a situação da fila")
+    args = parser.parse_args()
+
+    if args.status:
+        print(json.dumps(classification_queue.status(), indent=2))
+    else:
+        print(json.dumps(executar(max_lotes=args.lotes, limite=args.tamanho), indent=2, ensure_ascii=False))
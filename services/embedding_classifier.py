@@ -2,7 +2,6 @@ import sys
 sys.path.append(r'D:\OneDrive\Documentos\VS Code\Mercado\bb_integration')
 
 import numpy as np
-from openai import OpenAI
 from utils.logger import setup_logger
 from typing import List, Dict, Tuple
 import json
@@ -19,8 +18,14 @@ logger = setup_logger(
     log_file="logs/embedding_classifier.log"
 )
 
+# Identificação do classificador e do modelo (compõem a versão do cache de classificação)
+CLASSIFIER_NAME = "embedding_knn"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
 class EmbeddingClassifier:
     def __init__(self, k_neighbors=3):
+        # Importado aqui: o módulo é lido para obter a versão mesmo quando o cache evita classificar
+        from openai import OpenAI
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.k = k_neighbors
         self.categories = json.load(open('data/categories_definition.json'))
@@ -30,7 +35,7 @@ class EmbeddingClassifier:
     def _get_embedding(self, text: str) -> List[float]:
         try:
             response = self.client.embeddings.create(
-                model="text-embedding-3-small",
+                model=EMBEDDING_MODEL,
                 input=text
             )
             return response.data[0].embedding
@@ -132,6 +137,10 @@ class EmbeddingClassifier:
             "neighbors": [(sim, cat) for sim, cat in k_neighbors]
         }
 
+    def classify_batch(self, transactions: List[Tuple[str, str]]) -> List[Dict[str, any]]:
+        """Classifica uma lista de (descrição, informação adicional), na ordem recebida."""
+        return [self.classify_transaction(description, additional_info) for description, additional_info in transactions]
+
     def classify_transaction(self, description: str, additional_info: str) -> Dict[str, any]:
         try:
             # Combina descrição e informação adicional
@@ -147,9 +156,7 @@ class EmbeddingClassifier:
             result = self._knn_classify(transaction_embedding)
             
             # Adiciona informações de debug
-            logger.debug(f"K vizinhos mais próximos para: {transaction_text}")
-            for sim, cat in result["neighbors"]:
-                logger.debug(f"  {cat}: {sim:.3f}")
+            logger.debug("K vizinhos mais próximos para: %s -> %s", transaction_text, result["neighbors"])
             
             return result
             
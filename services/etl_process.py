@@ -1,11 +1,23 @@
-import requests
-import pandas as pd
-import datetime as dt
+import logging
 import os
+import threading
 from dotenv import load_dotenv
 from handlers.cert_handler import load_certificates, clean_temp_files
+from handlers.http_client import get_com_retry, obter_breaker
+from handlers import checkpoint
+from handlers.classification_queue import CLASSIFICATION_ASYNC
 from utils.logger import setup_logger
-from services.embedding_classifier import EmbeddingClassifier
+from utils.metrics import timer, incr
+from services.transform import transformar_lancamentos
+from services.extrato_decoder import EXTRATO_TYPED_DECODER, decodificar_pagina
+from services.extrato_archive import archive_from_env, identificar_conta
+from services.pipeline import executar_pipeline
+from services.classification_cache import (
+    CLASSIFICATION_CACHE_ENABLED, ClassificationCache, hash_texto, versao_classificador
+)
+from services.cascade_classifier import (
+    CASCADE_CLASSIFIER_NAME, CASCADE_LLM_MODEL, CLASSIFIER_CASCADE_ENABLED, CascadeClassifier
+)
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -16,41 +28,164 @@ logger = setup_logger(
     log_file="logs/etl_process.log"
 )
 
-classifier = EmbeddingClassifier(k_neighbors=3)
+# Detalhes de classificação (caminho crítico): amostrados e com limite de taxa
+classificacao_logger = setup_logger(
+    "etl_process.classificacao",
+    sample_rate=float(os.getenv("CLASSIFICATION_LOG_SAMPLE_RATE", "0.1")),
+    rate_limit=float(os.getenv("CLASSIFICATION_LOG_RATE_LIMIT", "20"))
+)
+
+# Vizinhos do KNN do classificador
+CLASSIFIER_K = 3
+
+# Classificador criado no primeiro uso: a inicialização calcula embeddings via API
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    global _classifier
+    # Compartilhado entre contas processadas em paralelo
+    with _classifier_lock:
+        if _classifier is None:
+            from services.embedding_classifier import EmbeddingClassifier
+            _classifier = EmbeddingClassifier(k_neighbors=CLASSIFIER_K)
+            if CLASSIFIER_CASCADE_ENABLED:
+                # Casos de baixa confiança do kNN são escalados para o LLM
+                _classifier = CascadeClassifier(_classifier)
+    return _classifier
 
-def get_extrato_data(extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path):
+# Cache de classificações no Postgres, versionado pelas categorias e pelo modelo
+_classification_cache = None
+
+def get_classification_cache():
+    global _classification_cache
+    with _classifier_lock:
+        if _classification_cache is None and CLASSIFICATION_CACHE_ENABLED:
+            from services.embedding_classifier import CLASSIFIER_NAME, EMBEDDING_MODEL
+            if CLASSIFIER_CASCADE_ENABLED:
+                # Modelo do LLM e limiares de escalonamento também definem a versão
+                from services.cascade_classifier import CASCADE_MIN_MARGIN, CASCADE_MIN_SCORE
+                nome = CASCADE_CLASSIFIER_NAME
+                versao = versao_classificador(
+                    f"{EMBEDDING_MODEL}+{CASCADE_LLM_MODEL}",
+                    f"{CLASSIFIER_K}|{CASCADE_MIN_SCORE}|{CASCADE_MIN_MARGIN}"
+                )
+            else:
+                nome = CLASSIFIER_NAME
+                versao = versao_classificador(EMBEDDING_MODEL, CLASSIFIER_K)
+            logger.info(f"Cache de classificação: {nome} versão {versao}")
+            _classification_cache = ClassificationCache(nome, versao)
+    return _classification_cache
+
+# Arquivo das páginas brutas (None quando não configurado)
+archive = archive_from_env()
+
+def iterar_paginas_extrato(extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path, archive=None, developer_key=None):
+    """
+    Obtém o extrato página a página, gerando a lista de lançamentos de cada
+    página assim que ela é obtida (e arquivada/registrada em checkpoint).
+    """
     logger.info(f"Iniciando extração de dados para o período {date_inicio} - {date_fim}")
+    conta = identificar_conta(extrato_url)
+
+    # Checkpoints por página (apenas para uma única data): retomar a partir
+    # da última página concluída em uma execução interrompida
+    usar_checkpoint = date_inicio == date_fim
+    paginas_salvas, total_paginas = [], None
+    if usar_checkpoint:
+        with timer("checkpoint_leitura"):
+            paginas_salvas, total_paginas = checkpoint.carregar_paginas(conta, date_inicio, archive)
+    numero_pagina = len(paginas_salvas) + 1
+    incr("pages_checkpoint", len(paginas_salvas))
+
+    if total_paginas is not None and len(paginas_salvas) >= total_paginas:
+        logger.info(f"Todas as {total_paginas} páginas já obtidas (checkpoint)")
+        for _, pagina in paginas_salvas:
+            yield pagina
+        return
+
     # Carregar certificado e obter caminhos dos arquivos PEM
-    private_key_path, cert_path = load_certificates(pfx_path=pfx_path, pfx_password=pfx_password)
+    with timer("load_certificates"):
+        private_key_path, cert_path = load_certificates(pfx_path=pfx_path, pfx_password=pfx_password)
     logger.debug(f"Usando certificado: {cert_path}, chave: {private_key_path}")
 
-    numero_pagina = 1
-    lista_lancamentos = []
+    # Circuito compartilhado por todas as contas: a indisponibilidade é da API
+    breaker = obter_breaker("extrato")
+    total_lancamentos = 0
 
     try:
         while True:
             params = {
-                'gw-dev-app-key': os.getenv('DEVELOPER_APPLICATION_KEY'),
+                'gw-dev-app-key': developer_key or os.getenv('DEVELOPER_APPLICATION_KEY'),
                 'dataInicioSolicitacao': date_inicio,
                 'dataFimSolicitacao': date_fim,
                 'numeroPaginaSolicitacao': numero_pagina
             }
             
-            logger.debug(f"Obtendo página {numero_pagina} do extrato")
-            response = requests.get(
-                extrato_url,
-                headers=headers,
-                params=params,
-                cert=(cert_path, private_key_path)
-            )
+            logger.debug("Obtendo página %s do extrato", numero_pagina)
+            # Cada página é retentada individualmente (429, 5xx, timeouts)
+            with timer("extrato_page"):
+                response = get_com_retry(
+                    extrato_url,
+                    breaker=breaker,
+                    headers=headers,
+                    params=params,
+                    cert=(cert_path, private_key_path)
+                )
+            incr("api_calls")
             
             if response.status_code == 200:
-                data = response.json()
-                logger.info(f"Página {numero_pagina} obtida com sucesso")
-                lista_lancamentos.extend(data['listaLancamento'])
+                # Decodificação tipada em uma passada (registros Lancamento);
+                # arquivo e checkpoint recebem os registros originais da API (dicts)
+                with timer("decodificacao"):
+                    if EXTRATO_TYPED_DECODER:
+                        pagina_decodificada = decodificar_pagina(response.content, numero_pagina)
+                        quantidade_paginas = pagina_decodificada.total_paginas
+                        lancamentos = pagina_decodificada.lancamentos
+                        registros_brutos = pagina_decodificada.registros_brutos
+                    else:
+                        data = response.json()
+                        quantidade_paginas = data['quantidadeTotalPagina']
+                        lancamentos = data['listaLancamento']
+                        registros_brutos = lambda: lancamentos
+                logger.info("Página %s obtida com sucesso", numero_pagina)
+
+                # Extrato mudou desde o checkpoint: descartar e recomeçar da página 1
+                if total_paginas is not None and quantidade_paginas != total_paginas:
+                    logger.warning(
+                        f"Total de páginas mudou ({total_paginas} -> {quantidade_paginas}); "
+                        "descartando checkpoints"
+                    )
+                    checkpoint.limpar(conta, date_inicio)
+                    paginas_salvas, total_paginas, numero_pagina = [], None, 1
+                    continue
+                total_paginas = quantidade_paginas
+
+                # Páginas do checkpoint só são liberadas depois que o total foi confirmado
+                for _, pagina in paginas_salvas:
+                    total_lancamentos += len(pagina)
+                    yield pagina
+                paginas_salvas = []
+
+                incr("pages")
 
-                if numero_pagina >= data['quantidadeTotalPagina']:
-                    logger.info(f"Todas as {data['quantidadeTotalPagina']} páginas foram obtidas")
+                chave_arquivo = None
+                if archive is not None:
+                    with timer("arquivamento"):
+                        chave_arquivo = archive.salvar_pagina(conta, date_inicio, numero_pagina, registros_brutos())
+
+                if usar_checkpoint:
+                    with timer("checkpoint_escrita"):
+                        checkpoint.salvar_pagina(
+                            conta, date_inicio, numero_pagina, total_paginas,
+                            registros_brutos(), chave_arquivo
+                        )
+
+                total_lancamentos += len(lancamentos)
+                yield lancamentos
+
+                if numero_pagina >= total_paginas:
+                    logger.info(f"Todas as {total_paginas} páginas foram obtidas")
                     break
 
                 numero_pagina += 1
@@ -60,108 +195,198 @@ def get_extrato_data(extrato_url, headers, date_inicio, date_fim, pfx_password,
                 raise Exception(f"Erro ao obter dados da página {numero_pagina}: {response.status_code} - {response.text}")
             
     finally:
-        clean_temp_files()
-        logger.debug(f"Total de {len(lista_lancamentos)} lançamentos obtidos")
+        clean_temp_files((private_key_path, cert_path))
+        logger.debug(f"Total de {total_lancamentos} lançamentos obtidos")
 
+def get_extrato_data(extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path, archive=None, developer_key=None):
+    lista_lancamentos = []
+    for pagina in iterar_paginas_extrato(
+        extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path,
+        archive=archive, developer_key=developer_key
+    ):
+        lista_lancamentos.extend(pagina)
     return lista_lancamentos
 
-def processar_lancamento(lancamento):
-    try:
-        # Verificar se o indicadorTipoLancamento é 'S', 'R', 'D' ou 'A'
-        if lancamento['indicadorTipoLancamento'] in ['S', 'R', 'D', 'A']:
-            logger.debug(f"Registro filtrado - indicadorTipoLancamento = {lancamento['indicadorTipoLancamento']}")
-            return None
-
-        data_movimento = None
-        if lancamento['dataMovimento']:
-            data_movimento_str = str(lancamento['dataMovimento'])
-            if len(data_movimento_str) < 8:
-                data_movimento_str = data_movimento_str.zfill(8)
-            try:
-                data_movimento = dt.datetime.strptime(data_movimento_str, '%d%m%Y').date()
-            except ValueError as e:
-                logger.error(f"Erro ao converter dataMovimento: {data_movimento_str} - Erro: {e}")
-        
-        data_lancamento = None
-        data_lancamento_str = str(lancamento['dataLancamento'])
-        if len(data_lancamento_str) < 8:
-            data_lancamento_str = data_lancamento_str.zfill(8)
-        try:
-            data_lancamento = dt.datetime.strptime(data_lancamento_str, '%d%m%Y').date()
-        except ValueError as e:
-            logger.error(f"Erro ao converter dataLancamento: {data_lancamento_str} - Erro: {e}")
-
-        # Process finance category for debit transactions
-        finance_category = None
-        if lancamento['indicadorSinalLancamento'] == 'D':
-            classification = classifier.classify_transaction(
-                lancamento['textoDescricaoHistorico'],
-                lancamento['textoInformacaoComplementar']
+def classificar_textos(pares):
+    """
+    Classifica pares (descrição, complemento). Pares repetidos são
+    classificados uma única vez, e pares já presentes no cache de
+    classificação não são classificados.
+
+    Args:
+        pares: Lista de (descrição, complemento)
+
+    Returns:
+        dict: (descrição, complemento) -> categoria
+    """
+    unicos = list(dict.fromkeys(pares))
+    logger.info("Classificando %s transações (%s textos distintos)", len(pares), len(unicos))
+
+    # Consulta em lote ao cache compartilhado
+    hashes = {par: hash_texto(*par) for par in unicos}
+    cache = get_classification_cache()
+    em_cache = {}
+    if cache is not None:
+        with timer("cache_classificacao"):
+            em_cache = cache.buscar(set(hashes.values()))
+
+    categorias = {}
+    pendentes = []
+    for par in unicos:
+        if hashes[par] in em_cache:
+            categorias[par] = em_cache[hashes[par]][0]
+        else:
+            pendentes.append(par)
+
+    # Textos fora do cache classificados de uma vez (a cascata agrupa os escalonamentos ao LLM)
+    classificacoes = []
+    if pendentes:
+        with timer("classificacao"):
+            classificacoes = get_classifier().classify_batch(pendentes)
+        incr("classificacoes", len(pendentes))
+
+    novas = {}
+    for (descricao, info), classification in zip(pendentes, classificacoes):
+        chave_hash = hashes[(descricao, info)]
+        categorias[(descricao, info)] = classification["category"]
+        # Falhas (sem vizinhos ou LLM sem resposta) não entram no cache
+        if classification['neighbors'] and not classification.get('pendente_llm'):
+            novas[chave_hash] = (classification["category"], classification['score'])
+
+        # Log classification details (um único registro, formatado apenas se emitido)
+        if classificacao_logger.isEnabledFor(logging.INFO):
+            classificacao_logger.info(
+                "Classificação: %s | %s -> %s (score: %.3f)",
+                descricao,
+                info,
+                classification["category"],
+                classification['score'],
+                extra={
+                    "categoria": classification["category"],
+                    "origem": classification.get("origem", "knn"),
+                    "score": round(float(classification['score']), 3),
+                    "vizinhos": [(cat, round(float(sim), 3)) for sim, cat in classification['neighbors']],
+                }
             )
-            finance_category = classification["category"]
-            
-            # Log classification details
-            logger.info(f"\nClassificação para transação:")
-            logger.info(f"Descrição: {lancamento['textoDescricaoHistorico']}")
-            logger.info(f"Info: {lancamento['textoInformacaoComplementar']}")
-            logger.info(f"Categoria: {finance_category} (score: {classification['score']:.3f})")
-            logger.info("K vizinhos mais próximos:")
-            for sim, cat in classification['neighbors']:
-                logger.info(f"  {cat}: {sim:.3f}")
-            logger.info("Scores por categoria:")
-            for cat, score in sorted(classification['all_scores'].items(), key=lambda x: x[1], reverse=True):
-                logger.info(f"  {cat}: {score:.3f}")
-            logger.info("-" * 50)
-
-        processed = {
-            "indicadorTipoLancamento": int(lancamento['indicadorTipoLancamento']),
-            "dataLancamento": data_lancamento,
-            "dataMovimento": data_movimento,
-            "codigoAgenciaOrigem": int(lancamento['codigoAgenciaOrigem']),
-            "numeroLote": int(lancamento['numeroLote']),
-            "numeroDocumento": int(lancamento['numeroDocumento']),
-            "codigoHistorico": int(lancamento['codigoHistorico']),
-            "valorLancamento": lancamento['valorLancamento'],
-            "codigoBancoContrapartida": int(lancamento['codigoBancoContrapartida']),
-            "codigoAgenciaContrapartida": int(lancamento['codigoAgenciaContrapartida']),
-            "textoInformacaoComplementar": lancamento['textoInformacaoComplementar'],
-            "numeroCpfCnpjContrapartida": str(lancamento['numeroCpfCnpjContrapartida']),
-            "indicadorTipoPessoaContrapartida": lancamento['indicadorTipoPessoaContrapartida'],
-            "numeroContaContrapartida": lancamento['numeroContaContrapartida'],
-            "textoDescricaoHistorico": lancamento['textoDescricaoHistorico'],
-            "textoDvContaContrapartida": lancamento['textoDvContaContrapartida'],
-            "indicadorSinalLancamento": lancamento['indicadorSinalLancamento'],
-            "finance_category": finance_category
-        }
-        return processed
-    except Exception as e:
-        logger.error(f"Erro ao processar lançamento: {lancamento} - Erro: {str(e)}", exc_info=True)
-        raise
-
-def executar_etl(extrato_url, headers, pfx_path, pfx_password, date_inicio, date_fim):
+
+    if cache is not None:
+        acertos = sum(1 for h in hashes.values() if h in em_cache)
+        incr("cache_hits_classificacao", acertos)
+        incr("cache_misses_classificacao", len(unicos) - acertos)
+        logger.info(
+            "Cache de classificação: %s de %s textos (%.1f%%)",
+            acertos, len(unicos), 100.0 * acertos / len(unicos)
+        )
+        with timer("cache_classificacao"):
+            cache.gravar(novas)
+    return categorias
+
+def classificar_debitos(lote):
+    """Preenche finance_category para os lançamentos de débito do lote."""
+    debitos = [i for i, sinal in enumerate(lote['indicadorSinalLancamento']) if sinal == 'D']
+    if not debitos:
+        return lote
+
+    descricoes = lote['textoDescricaoHistorico']
+    complementos = lote['textoInformacaoComplementar']
+    chaves = [(descricoes[i] or '', complementos[i] or '') for i in debitos]
+    categorias = classificar_textos(chaves)
+
+    finance_category = lote['finance_category']
+    for i, chave in zip(debitos, chaves):
+        finance_category[i] = categorias[chave]
+    return lote
+
+def executar_etl(extrato_url, headers, pfx_path, pfx_password, date_inicio, date_fim, replay=False, developer_key=None):
+    """
+    Extrai, transforma e classifica os lançamentos do período.
+    Com replay=True, os lançamentos são lidos do arquivo de páginas brutas em
+    vez da API (não requer certificado nem token).
+    """
     logger.info(f"Iniciando processo ETL para o período {date_inicio} - {date_fim}")
     
-    lista_lancamento = get_extrato_data(extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path)
+    if replay:
+        if archive is None:
+            raise ValueError("Replay requer EXTRATO_ARCHIVE_DIR ou EXTRATO_ARCHIVE_S3_BUCKET configurado")
+        with timer("replay"):
+            lista_lancamento = archive.carregar_lancamentos(identificar_conta(extrato_url), date_inicio)
+    else:
+        lista_lancamento = get_extrato_data(
+            extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path,
+            archive=archive, developer_key=developer_key
+        )
     logger.info(f"Processando {len(lista_lancamento)} lançamentos")
+    incr("rows_extraidas", len(lista_lancamento))
     
-    dados_processados = [processar_lancamento(lancamento) for lancamento in lista_lancamento]
-    # Filtrar registros None (onde indicadorTipoLancamento = 'S', 'R', 'D' ou 'A')
-    dados_processados = [d for d in dados_processados if d is not None]
-    logger.info(f"Após filtrar registros com indicadorTipoLancamento S/R/D/A: {len(dados_processados)} registros")
-    
-    df = pd.DataFrame(dados_processados)
-    
-    # Remover registros de saldo
-    df = df[~df['textoDescricaoHistorico'].isin(['SALDO ANTERIOR', 'S A L D O'])]
-    logger.info(f"Após remover registros de saldo: {len(df)} registros")
+    # Transformação colunar: tipos, datas e filtros S/R/D/A e de saldo
+    with timer("transformacao"):
+        lote = transformar_lancamentos(lista_lancamento)
+    incr("rows", len(lote))
     
-    if len(df) == 0:
+    if len(lote) == 0:
         logger.warning(f"Nenhum registro válido encontrado para o período {date_inicio} - {date_fim}")
     else:
-        logger.info(f"Exemplo de registros a serem inseridos:")
-        logger.info(f"Colunas: {df.columns.tolist()}")
-        logger.info(f"Primeiros registros:\n{df.head().to_string()}")
+        # Com classificação assíncrona, os débitos são inseridos sem categoria
+        if not CLASSIFICATION_ASYNC:
+            lote = classificar_debitos(lote)
+
+        # Amostra dos registros apenas em DEBUG: montar o DataFrame é caro
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Colunas: %s", lote.colunas)
+            logger.debug("Primeiros registros:\n%s", lote.to_dataframe().head().to_string())
     
-    return df
+    return lote
+
+def transformar_e_classificar(lista_lancamento):
+    """Transforma e classifica uma página de lançamentos (estágio do pipeline)."""
+    incr("rows_extraidas", len(lista_lancamento))
+    with timer("transformacao"):
+        lote = transformar_lancamentos(lista_lancamento)
+    incr("rows", len(lote))
+    if len(lote) > 0 and not CLASSIFICATION_ASYNC:
+        lote = classificar_debitos(lote)
+    return lote
+
+def executar_etl_pipeline(extrato_url, headers, pfx_path, pfx_password, date_inicio, date_fim,
+                          inserir, replay=False, developer_key=None):
+    """
+    ETL em pipeline: a página N+1 é obtida enquanto a página N é transformada
+    e classificada e a página N-1 é inserida. Cada página é inserida de forma
+    idempotente assim que fica pronta; uma falha interrompe todos os
+    estágios e a data é retomada pelos checkpoints de página.
 
+    Args:
+        inserir: Função que insere um LoteLancamentos e retorna as contagens
+            (ex: handlers.database.inserir_no_banco)
 
+    Returns:
+        dict: Contagens 'inseridos', 'duplicados' e 'total' somadas e 'paginas'
+    """
+    logger.info(f"Iniciando ETL em pipeline para o período {date_inicio} - {date_fim}")
+
+    if replay:
+        if archive is None:
+            raise ValueError("Replay requer EXTRATO_ARCHIVE_DIR ou EXTRATO_ARCHIVE_S3_BUCKET configurado")
+        paginas = archive.iterar_paginas(identificar_conta(extrato_url), date_inicio)
+    else:
+        paginas = iterar_paginas_extrato(
+            extrato_url, headers, date_inicio, date_fim, pfx_password, pfx_path,
+            archive=archive, developer_key=developer_key
+        )
+
+    resultados = executar_pipeline(paginas, [
+        ("classificacao", transformar_e_classificar),
+        ("insercao", inserir),
+    ])
+
+    totais = {"inseridos": 0, "duplicados": 0, "total": 0, "paginas": len(resultados)}
+    for resultado in resultados:
+        for chave in ("inseridos", "duplicados", "total"):
+            totais[chave] += resultado[chave]
+    logger.info(
+        f"Pipeline concluído: {totais['paginas']} páginas, {totais['total']} registros, "
+        f"{totais['inseridos']} inseridos, {totais['duplicados']} duplicados"
+    )
+    if totais['total'] == 0:
+        logger.warning(f"Nenhum registro válido encontrado para o período {date_inicio} - {date_fim}")
+    return totais
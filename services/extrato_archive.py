@@ -0,0 +1,183 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "extrato_archive",
+    log_file="logs/extrato_archive.log"
+)
+
+# Destino do arquivo bruto: diretório local e/ou bucket S3
+ARCHIVE_DIR = os.getenv("EXTRATO_ARCHIVE_DIR")
+ARCHIVE_S3_BUCKET = os.getenv("EXTRATO_ARCHIVE_S3_BUCKET")
+ARCHIVE_PREFIX = os.getenv("EXTRATO_ARCHIVE_PREFIX", "extratos-raw")
+
+_PADRAO_CONTA = re.compile(r"/agencia/([^/]+)/conta/([^/?]+)")
+
+
+def identificar_conta(extrato_url):
+    """
+    Extrai 'agencia-conta' da URL do extrato; usado como parte da chave do arquivo.
+    """
+    match = _PADRAO_CONTA.search(extrato_url or "")
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    return "conta-desconhecida"
+
+
+class ExtratoArchive:
+    """
+    Arquivo das páginas brutas do extrato em NDJSON comprimido (gzip), uma
+    linha por lançamento, com chave conta/AAAA/MM/DD/pagina-NNNN.ndjson.gz.
+    Grava em um diretório local ou em um bucket S3. Uma nova busca da data
+    (página 1) substitui as páginas anteriores: o replay nunca mistura
+    páginas de buscas diferentes.
+    """
+
+    def __init__(self, base_dir=None, s3_bucket=None, prefix=ARCHIVE_PREFIX, s3_handler=None):
+        """
+        Args:
+            base_dir: Diretório local do arquivo (usado se s3_bucket não for informado)
+            s3_bucket: Bucket S3 do arquivo
+            prefix: Prefixo das chaves
+            s3_handler: S3Handler a reutilizar (criado sob demanda se omitido)
+        """
+        if not base_dir and not s3_bucket:
+            raise ValueError("Informe base_dir ou s3_bucket para o arquivo de extratos")
+        self.base_dir = base_dir
+        self.s3_bucket = s3_bucket
+        self.prefix = prefix.strip("/")
+        self._s3_handler = s3_handler
+
+    @property
+    def s3_handler(self):
+        if self._s3_handler is None:
+            from handlers.aws_handler import S3Handler
+            self._s3_handler = S3Handler(region_name=os.getenv('AWS_REGION', 'us-east-1'))
+        return self._s3_handler
+
+    def prefixo_data(self, conta, data):
+        """Prefixo das páginas de uma conta/data ('DDMMYYYY')."""
+        dia = datetime.strptime(data.zfill(8), '%d%m%Y')
+        return f"{self.prefix}/{conta}/{dia:%Y/%m/%d}/"
+
+    def chave(self, conta, data, pagina):
+        return f"{self.prefixo_data(conta, data)}pagina-{pagina:04d}.ndjson.gz"
+
+    def remover_data(self, conta, data):
+        """
+        Remove as páginas arquivadas de uma conta/data.
+
+        Returns:
+            int: Páginas removidas
+        """
+        chaves = self._listar(conta, data)
+        if self.s3_bucket:
+            if chaves:
+                self.s3_handler.delete_keys(self.s3_bucket, chaves)
+        else:
+            for chave in chaves:
+                os.remove(os.path.join(self.base_dir, chave))
+        return len(chaves)
+
+    def salvar_pagina(self, conta, data, pagina, lancamentos):
+        """
+        Grava uma página do extrato. A página 1 inicia uma nova busca da data:
+        as páginas de buscas anteriores são removidas antes (uma busca retomada
+        de checkpoint continua a partir de uma página posterior e as mantém).
+
+        Args:
+            conta: Identificador da conta (ver identificar_conta)
+            data: Data do extrato ('DDMMYYYY')
+            pagina: Número da página (1..N)
+            lancamentos: Registros de `listaLancamento` da página
+
+        Returns:
+            str: Chave (ou caminho) gravado
+        """
+        linhas = "".join(json.dumps(l, ensure_ascii=False, separators=(",", ":")) + "\n" for l in lancamentos)
+        conteudo = gzip.compress(linhas.encode("utf-8"))
+        chave = self.chave(conta, data, pagina)
+
+        if pagina == 1:
+            removidas = self.remover_data(conta, data)
+            if removidas:
+                logger.info(f"{removidas} páginas de uma busca anterior removidas ({conta}, {data})")
+
+        if self.s3_bucket:
+            self.s3_handler.upload_bytes(self.s3_bucket, chave, conteudo, content_type="application/gzip")
+        else:
+            caminho = os.path.join(self.base_dir, chave)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, "wb") as f:
+                f.write(conteudo)
+
+        logger.debug("Página %s arquivada em %s (%s bytes)", pagina, chave, len(conteudo))
+        return chave
+
+    def _listar(self, conta, data):
+        prefixo = self.prefixo_data(conta, data)
+        if self.s3_bucket:
+            return self.s3_handler.list_keys(self.s3_bucket, prefixo)
+        diretorio = os.path.join(self.base_dir, prefixo)
+        if not os.path.isdir(diretorio):
+            return []
+        return sorted(prefixo + nome for nome in os.listdir(diretorio) if nome.endswith(".ndjson.gz"))
+
+    def ler_chave(self, chave):
+        """Lê e descomprime uma página arquivada."""
+        if self.s3_bucket:
+            conteudo = self.s3_handler.download_bytes(self.s3_bucket, chave)
+        else:
+            with open(os.path.join(self.base_dir, chave), "rb") as f:
+                conteudo = f.read()
+        texto = gzip.decompress(conteudo).decode("utf-8")
+        return [json.loads(linha) for linha in texto.splitlines() if linha]
+
+    def iterar_paginas(self, conta, data):
+        """
+        Gera os lançamentos de cada página arquivada de uma conta/data, em
+        ordem de página.
+
+        Raises:
+            FileNotFoundError: Se não houver páginas arquivadas para a data
+        """
+        chaves = self._listar(conta, data)
+        if not chaves:
+            raise FileNotFoundError(f"Nenhuma página arquivada para {conta} em {data}")
+        logger.info(f"Replay: {len(chaves)} páginas arquivadas ({conta}, {data})")
+        for chave in chaves:
+            yield self.ler_chave(chave)
+
+    def carregar_lancamentos(self, conta, data):
+        """
+        Lê todas as páginas arquivadas de uma conta/data, em ordem de página.
+
+        Returns:
+            list: Registros de `listaLancamento` concatenados
+
+        Raises:
+            FileNotFoundError: Se não houver páginas arquivadas para a data
+        """
+        lancamentos = []
+        for pagina in self.iterar_paginas(conta, data):
+            lancamentos.extend(pagina)
+        logger.info(f"Replay: {len(lancamentos)} lançamentos lidos ({conta}, {data})")
+        return lancamentos
+
+
+def archive_from_env():
+    """Retorna o arquivo configurado pelas variáveis de ambiente, ou None."""
+    if ARCHIVE_S3_BUCKET:
+        return ExtratoArchive(s3_bucket=ARCHIVE_S3_BUCKET)
+    if ARCHIVE_DIR:
+        return ExtratoArchive(base_dir=ARCHIVE_DIR)
+    return None
@@ -0,0 +1,158 @@
+import os
+from typing import List, Optional, Union
+import msgspec
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+from utils.metrics import incr
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "extrato_decoder",
+    log_file="logs/extrato_decoder.log"
+)
+
+# Decodificação tipada das páginas (msgspec); desligada, volta ao response.json()
+EXTRATO_TYPED_DECODER = os.getenv("EXTRATO_TYPED_DECODER", "true").lower() not in ("0", "false", "no")
+
+# Campos numéricos em que a API pode enviar "" no lugar de null
+CAMPOS_NUMERICOS = {
+    "codigoAgenciaOrigem", "numeroLote", "numeroDocumento", "codigoHistorico",
+    "valorLancamento", "codigoBancoContrapartida", "codigoAgenciaContrapartida",
+}
+
+
+class Lancamento(msgspec.Struct, omit_defaults=True):
+    """
+    Registro de `listaLancamento` com os campos de RAW_COLUMNS. Datas
+    (DDMMYYYY) e identificadores que a API envia ora como número, ora como
+    texto aceitam os dois tipos; campos desconhecidos são ignorados.
+    """
+
+    indicadorTipoLancamento: Union[str, int, None] = None
+    dataLancamento: Union[int, str, None] = None
+    dataMovimento: Union[int, str, None] = None
+    codigoAgenciaOrigem: Optional[int] = None
+    numeroLote: Optional[int] = None
+    numeroDocumento: Optional[int] = None
+    codigoHistorico: Optional[int] = None
+    valorLancamento: Optional[float] = None
+    codigoBancoContrapartida: Optional[int] = None
+    codigoAgenciaContrapartida: Optional[int] = None
+    textoInformacaoComplementar: Optional[str] = None
+    numeroCpfCnpjContrapartida: Union[int, str, None] = None
+    indicadorTipoPessoaContrapartida: Optional[str] = None
+    numeroContaContrapartida: Union[str, int, None] = None
+    textoDescricaoHistorico: Optional[str] = None
+    textoDvContaContrapartida: Optional[str] = None
+    indicadorSinalLancamento: Optional[str] = None
+
+    def get(self, campo, padrao=None):
+        # Compatível com o acesso dos registros em dict (r.get(campo))
+        return getattr(self, campo, padrao)
+
+
+class _PaginaTipada(msgspec.Struct):
+    quantidadeTotalPagina: int
+    listaLancamento: List[Lancamento] = []
+
+
+class _PaginaBruta(msgspec.Struct):
+    quantidadeTotalPagina: int
+    listaLancamento: List[msgspec.Raw] = []
+
+
+# strict=False: números enviados como texto ("123") são convertidos
+_decoder_pagina = msgspec.json.Decoder(_PaginaTipada, strict=False)
+_decoder_bruta = msgspec.json.Decoder(_PaginaBruta)
+_decoder_lancamento = msgspec.json.Decoder(Lancamento, strict=False)
+
+
+class PaginaExtrato:
+    """Página decodificada: total de páginas, lançamentos tipados e rejeitados."""
+
+    __slots__ = ("total_paginas", "lancamentos", "rejeitados", "_conteudo", "_brutos")
+
+    def __init__(self, total_paginas, lancamentos, rejeitados=0, conteudo=None):
+        self.total_paginas = total_paginas
+        self.lancamentos = lancamentos
+        self.rejeitados = rejeitados
+        self._conteudo = conteudo
+        self._brutos = None
+
+    def registros_brutos(self) -> list:
+        """
+        Registros exatamente como a API os enviou (dicts, com todos os campos,
+        inclusive nulos e desconhecidos), para o arquivo de páginas e o
+        checkpoint. Incluem os rejeitados, na posição original. Decodificados
+        do corpo original sob demanda: sem arquivo nem checkpoint, não custam nada.
+        """
+        if self._brutos is None:
+            self._brutos = msgspec.json.decode(self._conteudo).get("listaLancamento") or []
+        return self._brutos
+
+
+def _decodificar_tolerante(bruto, indice, pagina):
+    """
+    Decodifica um lançamento que falhou no caminho rápido, aceitando "" em
+    campos numéricos (como o caminho anterior). Retorna None se o registro
+    continuar inválido.
+    """
+    try:
+        return _decoder_lancamento.decode(bruto)
+    except msgspec.ValidationError as erro_original:
+        erro = erro_original
+    try:
+        registro = msgspec.json.decode(bruto)
+        if isinstance(registro, dict):
+            registro = {
+                campo: None if valor == "" and campo in CAMPOS_NUMERICOS else valor
+                for campo, valor in registro.items()
+            }
+        return msgspec.convert(registro, Lancamento, strict=False)
+    except msgspec.ValidationError:
+        # O erro reportado é o do registro original (campo e caminho exatos)
+        logger.error(
+            "Lançamento %s da página %s rejeitado: %s | registro: %.300s",
+            indice, pagina, erro, bytes(bruto).decode("utf-8", errors="replace")
+        )
+        return None
+
+
+def decodificar_pagina(conteudo: bytes, pagina=None) -> PaginaExtrato:
+    """
+    Decodifica o corpo de uma página do extrato em uma única passada para
+    registros Lancamento tipados. Se algum registro não corresponder ao
+    schema, a página é decodificada registro a registro: os inválidos são
+    rejeitados com o erro exato (campo e posição) e os demais seguem.
+
+    Args:
+        conteudo: Corpo da resposta (bytes ou str)
+        pagina: Número da página (apenas para os logs)
+
+    Returns:
+        PaginaExtrato
+
+    Raises:
+        msgspec.DecodeError: JSON inválido
+        msgspec.ValidationError: Envelope inválido (ex: sem quantidadeTotalPagina)
+    """
+    try:
+        tipada = _decoder_pagina.decode(conteudo)
+        return PaginaExtrato(tipada.quantidadeTotalPagina, tipada.listaLancamento, conteudo=conteudo)
+    except msgspec.ValidationError as e:
+        logger.warning("Página %s fora do schema (%s); decodificando registro a registro", pagina, e)
+
+    bruta = _decoder_bruta.decode(conteudo)
+    lancamentos = []
+    for indice, bruto in enumerate(bruta.listaLancamento):
+        registro = _decodificar_tolerante(bruto, indice, pagina)
+        if registro is not None:
+            lancamentos.append(registro)
+
+    rejeitados = len(bruta.listaLancamento) - len(lancamentos)
+    if rejeitados:
+        incr("lancamentos_rejeitados", rejeitados)
+    return PaginaExtrato(bruta.quantidadeTotalPagina, lancamentos, rejeitados, conteudo)
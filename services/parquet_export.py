@@ -0,0 +1,217 @@
+import argparse
+import io
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from dotenv import load_dotenv
+from handlers.database import get_db_connection
+from utils.logger import setup_logger
+from utils.metrics import incr
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "parquet_export",
+    log_file="logs/parquet_export.log"
+)
+
+# Destino dos arquivos Parquet: diretório local ou bucket S3
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR")
+PARQUET_EXPORT_S3_BUCKET = os.getenv("PARQUET_EXPORT_S3_BUCKET")
+PARQUET_EXPORT_PREFIX = os.getenv("PARQUET_EXPORT_PREFIX", "extrato_juridica")
+
+# Colunas exportadas, na ordem da tabela
+COLUNAS = [
+    "indicadortipolancamento", "datalancamento", "datamovimento",
+    "codigoagenciaorigem", "numerolote", "numerodocumento",
+    "codigohistorico", "valorlancamento", "codigobancocontrapartida",
+    "codigoagenciacontrapartida", "textoinformacaocomplementar",
+    "numerocpfcnpjcontrapartida", "indicadortipopessoacontrapartida",
+    "numerocontacontrapartida", "textodescricaohistorico",
+    "textodvcontacontrapartida", "indicadorsinallancamento",
+    "finance_category"
+]
+
+# Colunas exportadas como texto
+COLUNAS_TEXTO = [
+    "textoinformacaocomplementar", "numerocpfcnpjcontrapartida",
+    "indicadortipopessoacontrapartida", "numerocontacontrapartida",
+    "textodescricaohistorico", "textodvcontacontrapartida",
+    "indicadorsinallancamento", "finance_category"
+]
+
+# Colunas de texto com baixa cardinalidade: dictionary encoding
+COLUNAS_DICIONARIO = [
+    "textodescricaohistorico", "textoinformacaocomplementar",
+    "indicadortipopessoacontrapartida", "indicadorsinallancamento",
+    "finance_category"
+]
+
+
+class ParquetExporter:
+    """
+    Mantém cópias Parquet de extrato_juridica particionadas por conta e
+    ano/mês (`<prefixo>/conta=<process_name>/ano=AAAA/mes=MM/dia=DD.parquet`).
+    Cada conta/data é um arquivo próprio, regravado a cada processamento da
+    data: o custo de atualização é proporcional ao dia, não ao histórico.
+    """
+
+    def __init__(self, base_dir=None, s3_bucket=None, prefix=PARQUET_EXPORT_PREFIX, s3_handler=None):
+        """
+        Args:
+            base_dir: Diretório local de destino (usado se s3_bucket não for informado)
+            s3_bucket: Bucket S3 de destino
+            prefix: Prefixo das chaves
+            s3_handler: S3Handler a reutilizar (criado sob demanda se omitido)
+        """
+        if not base_dir and not s3_bucket:
+            raise ValueError("Informe base_dir ou s3_bucket para a exportação Parquet")
+        self.base_dir = base_dir
+        self.s3_bucket = s3_bucket
+        self.prefix = prefix.strip("/")
+        self._s3_handler = s3_handler
+
+    @property
+    def s3_handler(self):
+        if self._s3_handler is None:
+            from handlers.aws_handler import S3Handler
+            self._s3_handler = S3Handler(region_name=os.getenv('AWS_REGION', 'us-east-1'))
+        return self._s3_handler
+
+    def chave(self, dia, process_name):
+        return f"{self.prefix}/conta={process_name}/ano={dia:%Y}/mes={dia:%m}/dia={dia:%d}.parquet"
+
+    def _ler_dia(self, dia, process_name):
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {', '.join(COLUNAS)} FROM extrato_juridica "
+                    "WHERE datalancamento = %s AND process_name = %s",
+                    (dia, process_name)
+                )
+                return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def _serializar(self, linhas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Schema fixo: arquivos de dias diferentes precisam ter tipos idênticos,
+        # mesmo quando uma coluna vem toda nula ou com outra precisão decimal
+        tipos = {
+            "datalancamento": pa.date32(),
+            "datamovimento": pa.date32(),
+            "valorlancamento": pa.decimal128(15, 2),
+        }
+        schema = pa.schema([
+            (col, tipos.get(col, pa.string() if col in COLUNAS_TEXTO else pa.int64()))
+            for col in COLUNAS
+        ])
+
+        colunas = {}
+        for i, col in enumerate(COLUNAS):
+            valores = [linha[i] for linha in linhas]
+            if col in COLUNAS_TEXTO:
+                valores = [None if v is None else str(v) for v in valores]
+            elif col == "valorlancamento":
+                valores = [None if v is None else Decimal(v).quantize(Decimal("0.01")) for v in valores]
+            colunas[col] = pa.array(valores, type=schema.field(col).type)
+
+        buffer = io.BytesIO()
+        pq.write_table(
+            pa.table(colunas, schema=schema),
+            buffer,
+            compression="zstd",
+            use_dictionary=COLUNAS_DICIONARIO,
+        )
+        return buffer.getvalue()
+
+    def exportar_data(self, data, process_name=None):
+        """
+        Regrava o arquivo Parquet de uma data de uma conta a partir do banco.
+
+        Args:
+            data: Data no formato 'DDMMYYYY' (com ou sem zero à esquerda) ou date
+            process_name: Conta (padrão: PROCESS_NAME)
+
+        Returns:
+            str: Chave (ou caminho) gravado, ou None se a data não tiver lançamentos
+        """
+        process_name = process_name or os.getenv('PROCESS_NAME')
+        dia = data if isinstance(data, date) else datetime.strptime(data.zfill(8), '%d%m%Y').date()
+        linhas = self._ler_dia(dia, process_name)
+        chave = self.chave(dia, process_name)
+
+        if not linhas:
+            logger.info(f"Nenhum lançamento em {dia} ({process_name}) para exportar")
+            return None
+
+        conteudo = self._serializar(linhas)
+        if self.s3_bucket:
+            self.s3_handler.upload_bytes(self.s3_bucket, chave, conteudo)
+        else:
+            caminho = os.path.join(self.base_dir, chave)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Escrita atômica: leitores nunca veem um arquivo parcial
+            temporario = caminho + ".tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+
+        logger.info(f"Exportados {len(linhas)} lançamentos de {dia} para {chave} ({len(conteudo)} bytes)")
+        return chave
+
+
+def exporter_from_env():
+    """Retorna o exportador configurado pelas variáveis de ambiente, ou None."""
+    if PARQUET_EXPORT_S3_BUCKET:
+        return ParquetExporter(s3_bucket=PARQUET_EXPORT_S3_BUCKET)
+    if PARQUET_EXPORT_DIR:
+        return ParquetExporter(base_dir=PARQUET_EXPORT_DIR)
+    return None
+
+
+def reexportar(afetadas, exporter=None):
+    """
+    Regrava os arquivos de datas já exportadas cujos lançamentos mudaram após
+    a inserção (ex: reclassificação). Falhas são registradas sem interromper
+    as demais datas.
+
+    Args:
+        afetadas: Pares (process_name, data)
+        exporter: ParquetExporter (padrão: exporter_from_env())
+
+    Returns:
+        int: Arquivos regravados
+    """
+    exporter = exporter or exporter_from_env()
+    if exporter is None:
+        return 0
+    regravados = 0
+    for process_name, dia in sorted(afetadas):
+        try:
+            exporter.exportar_data(dia, process_name)
+            regravados += 1
+        except Exception as e:
+            incr("parquet_export_erros")
+            logger.error(f"Erro ao regravar Parquet de {dia} ({process_name}): {e}", exc_info=True)
+    return regravados
+
+
+# Backfill manual: python -m services.parquet_export [--conta NOME] 01032025 02032025 ...
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta datas de extrato_juridica para Parquet")
+    parser.add_argument("datas", nargs="+", help="Datas (DDMMYYYY)")
+    parser.add_argument("--conta", help="process_name da conta (padrão: PROCESS_NAME)")
+    args = parser.parse_args()
+
+    exporter = exporter_from_env()
+    if exporter is None:
+        sys.exit("Configure PARQUET_EXPORT_DIR ou PARQUET_EXPORT_S3_BUCKET")
+    for data in args.datas:
+        exporter.exportar_data(data, args.conta)
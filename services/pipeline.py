@@ -0,0 +1,124 @@
+import contextvars
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+from utils.metrics import timer
+from utils.profiling import perfilar_thread
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "pipeline",
+    log_file="logs/pipeline.log"
+)
+
+# Itens em espera entre dois estágios: limita a memória e aplica backpressure
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+
+# Intervalo (s) em que threads bloqueadas verificam o sinal de parada
+_INTERVALO_PARADA = 0.1
+
+# Marca de fim do fluxo
+_FIM = object()
+
+
+def executar_pipeline(fonte, estagios, tamanho_fila=PIPELINE_QUEUE_SIZE):
+    """
+    Executa os estágios em threads próprias ligadas por filas limitadas: o
+    item N+1 é produzido enquanto o item N passa pelos estágios seguintes.
+    Um estágio mais lento faz as filas anteriores encherem e bloqueia os
+    produtores (backpressure). Uma exceção em qualquer estágio interrompe
+    todos os demais e é relançada aqui após o encerramento das threads.
+
+    Args:
+        fonte: Iterável (normalmente um gerador) consumido na thread produtora
+        estagios: Lista de (nome, função) aplicada a cada item, em ordem
+        tamanho_fila: Capacidade de cada fila entre estágios
+
+    Returns:
+        list: Resultados do último estágio, na ordem da fonte
+    """
+    parar = threading.Event()
+    erros = []
+    filas = [queue.Queue(maxsize=tamanho_fila) for _ in estagios]
+    resultados = []
+
+    def falhar(erro):
+        if not erros:
+            erros.append(erro)
+        parar.set()
+
+    def colocar(fila, item):
+        # put com timeout: uma fila cheia não bloqueia o encerramento
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=_INTERVALO_PARADA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            for item in fonte:
+                if not colocar(filas[0], item):
+                    break
+        except BaseException as e:
+            logger.error(f"Erro no estágio de origem do pipeline: {e}", exc_info=True)
+            falhar(e)
+        finally:
+            # Encerra o gerador (executa seus blocos finally, ex: limpeza de certificados)
+            if hasattr(fonte, "close"):
+                fonte.close()
+            colocar(filas[0], _FIM)
+
+    def consumidor(indice, nome, funcao):
+        entrada = filas[indice]
+        saida = filas[indice + 1] if indice + 1 < len(filas) else None
+        try:
+            while True:
+                try:
+                    item = entrada.get(timeout=_INTERVALO_PARADA)
+                except queue.Empty:
+                    if parar.is_set():
+                        return
+                    continue
+                if item is _FIM or parar.is_set():
+                    break
+                with timer(f"pipeline_{nome}"):
+                    resultado = funcao(item)
+                if saida is None:
+                    resultados.append(resultado)
+                elif not colocar(saida, resultado):
+                    return
+        except BaseException as e:
+            logger.error(f"Erro no estágio '{nome}' do pipeline: {e}", exc_info=True)
+            falhar(e)
+        finally:
+            if saida is not None:
+                colocar(saida, _FIM)
+
+    # Cada thread roda em uma cópia do contexto atual (coletor de métricas e
+    # perfil ativos); com perfil, cada thread tem seu próprio cProfile
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(perfilar_thread(produtor),),
+                                name="pipeline-origem")]
+    threads += [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(perfilar_thread(consumidor), indice, nome, funcao),
+            name=f"pipeline-{nome}"
+        )
+        for indice, (nome, funcao) in enumerate(estagios)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if erros:
+        raise erros[0]
+    return resultados
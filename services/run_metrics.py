@@ -0,0 +1,302 @@
+"""
+Histórico das métricas de cada execução de data (`process_run_metrics`) e
+relatório de regressões de throughput contra uma baseline móvel.
+
+Uso:
+    python -m services.run_metrics [--dias 7] [--baseline 20] [--limiar 0.3] [--conta NOME] [--todas] [--json]
+
+Sai com código 1 se alguma execução do período estiver abaixo da baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import uuid
+from dotenv import load_dotenv
+from psycopg2.extras import Json
+from handlers.database import get_db_connection
+from handlers.ingestion_state import parse_data
+from utils.logger import setup_logger
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "run_metrics",
+    log_file="logs/run_metrics.log"
+)
+
+# Permite desligar a gravação do histórico (a emissão EMF continua)
+RUN_METRICS_ENABLED = os.getenv("RUN_METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Execuções anteriores na baseline e mínimo para haver veredito
+RUN_METRICS_BASELINE_RUNS = int(os.getenv("RUN_METRICS_BASELINE_RUNS", "20"))
+RUN_METRICS_MIN_BASELINE = int(os.getenv("RUN_METRICS_MIN_BASELINE", "5"))
+# Queda de throughput (fração da baseline) que caracteriza uma regressão
+RUN_METRICS_THRESHOLD = float(os.getenv("RUN_METRICS_THRESHOLD", "0.3"))
+# Execuções com poucos lançamentos (fins de semana, feriados) não entram na comparação
+RUN_METRICS_MIN_ROWS = int(os.getenv("RUN_METRICS_MIN_ROWS", "50"))
+
+# Estágios (timers de utils.metrics) agrupados por dependência externa
+ESTAGIOS = {
+    "api_bb": ("extrato_page",),
+    "classificador": ("classificacao", "cache_classificacao"),
+    "banco": ("inserir_no_banco", "pipeline_insercao"),
+}
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS process_run_metrics (
+        id BIGSERIAL PRIMARY KEY,
+        process_name TEXT NOT NULL,
+        data DATE,
+        invocacao TEXT NOT NULL,
+        registrado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        status TEXT NOT NULL,
+        replay BOOLEAN NOT NULL DEFAULT false,
+        duracao_ms DOUBLE PRECISION,
+        paginas INTEGER,
+        linhas INTEGER,
+        inseridos INTEGER,
+        duplicados INTEGER,
+        chamadas_classificador INTEGER,
+        chamadas_llm INTEGER,
+        taxa_acerto_cache DOUBLE PRECISION,
+        duracoes JSONB NOT NULL,
+        contadores JSONB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_process_run_metrics_processo
+        ON process_run_metrics (process_name, registrado_em);
+"""
+
+_schema_verificado = False
+
+# Identificador da invocação atual (request id da Lambda ou um por execução local)
+_invocacao = uuid.uuid4().hex
+
+
+def garantir_schema(conn):
+    """Cria a tabela do histórico, se necessário (uma vez por processo)."""
+    global _schema_verificado
+    if _schema_verificado:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+    conn.commit()
+    _schema_verificado = True
+
+
+def definir_invocacao(invocacao=None):
+    """Define o identificador gravado nas próximas execuções (padrão: um novo uuid)."""
+    global _invocacao
+    _invocacao = invocacao or uuid.uuid4().hex
+
+
+def registrar(coletor):
+    """
+    Grava as métricas de uma data (coletor de utils.metrics.coletar_metricas,
+    com as propriedades Data e Replay). Falhas são apenas registradas no log.
+    """
+    if not RUN_METRICS_ENABLED:
+        return
+    contadores = dict(coletor.counters)
+    duracoes = {estagio: round(ms, 3) for estagio, ms in coletor.durations.items()}
+    data = coletor.properties.get("Data")
+    consultas_cache = contadores.get("cache_hits_classificacao", 0) + contadores.get("cache_misses_classificacao", 0)
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO process_run_metrics (
+                    process_name, data, invocacao, status, replay, duracao_ms, paginas, linhas,
+                    inseridos, duplicados, chamadas_classificador, chamadas_llm, taxa_acerto_cache,
+                    duracoes, contadores
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                coletor.dimensions.get("ProcessName"),
+                parse_data(data) if data else None,
+                _invocacao,
+                coletor.properties.get("Status", "sucesso"),
+                bool(coletor.properties.get("Replay")),
+                duracoes.get("processar_data"),
+                int(contadores.get("pages", 0)),
+                int(contadores.get("rows_extraidas", 0)),
+                int(contadores.get("rows_inseridas", 0)),
+                int(contadores.get("rows_duplicadas", 0)),
+                int(contadores.get("classificacoes", 0)),
+                int(contadores.get("llm_chamadas", 0)),
+                contadores.get("cache_hits_classificacao", 0) / consultas_cache if consultas_cache else None,
+                Json(duracoes),
+                Json(contadores),
+            ))
+        conn.commit()
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logger.error(f"Erro ao gravar as métricas da execução ({data}): {e}", exc_info=True)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _throughput(linhas, duracao_ms):
+    """Lançamentos por segundo."""
+    return linhas * 1000.0 / duracao_ms if duracao_ms else None
+
+
+def _ms_por_mil(duracoes, estagios, linhas):
+    """Milissegundos de um grupo de estágios por mil lançamentos."""
+    total = sum(duracoes.get(estagio, 0.0) for estagio in estagios)
+    return total * 1000.0 / linhas if total else None
+
+
+def detectar_regressoes(execucoes, inicio_periodo, baseline=RUN_METRICS_BASELINE_RUNS,
+                        limiar=RUN_METRICS_THRESHOLD, min_baseline=RUN_METRICS_MIN_BASELINE):
+    """
+    Compara o throughput de cada execução do período (bem-sucedida e com
+    ao menos RUN_METRICS_MIN_ROWS lançamentos) com a mediana das
+    `baseline` execuções anteriores do mesmo processo (e modo replay) e
+    aponta os grupos de estágios (ESTAGIOS) que ficaram mais lentos.
+
+    Args:
+        execucoes: Dicts (ver relatorio) em ordem de registrado_em
+        inicio_periodo: Execuções registradas antes disso servem apenas de baseline
+        baseline: Execuções anteriores consideradas
+        limiar: Queda relativa que caracteriza regressão (0.3 = 30% abaixo)
+        min_baseline: Execuções anteriores necessárias para um veredito
+
+    Returns:
+        list: Uma avaliação (dict) por execução do período
+    """
+    historico = {}
+    avaliacoes = []
+    for execucao in execucoes:
+        chave = (execucao["process_name"], execucao["replay"])
+        anteriores = historico.setdefault(chave, [])
+        throughput = _throughput(execucao["linhas"], execucao["duracao_ms"])
+        # Apenas execuções bem-sucedidas e com volume são comparáveis
+        comparavel = execucao["status"] == "sucesso" and throughput and execucao["linhas"] >= RUN_METRICS_MIN_ROWS
+
+        if comparavel and execucao["registrado_em"] >= inicio_periodo:
+            avaliacao = {
+                "process_name": execucao["process_name"],
+                "data": execucao["data"].isoformat() if execucao["data"] else None,
+                "registrado_em": execucao["registrado_em"].isoformat(),
+                "invocacao": execucao["invocacao"],
+                "replay": execucao["replay"],
+                "linhas": execucao["linhas"],
+                "throughput": round(throughput, 1) if throughput else None,
+                "baseline": None,
+                "variacao": None,
+                "regressao": False,
+                "estagios": {},
+            }
+            janela = anteriores[-baseline:]
+            if len(janela) >= min_baseline and throughput:
+                referencia = statistics.median(a["throughput"] for a in janela)
+                avaliacao["baseline"] = round(referencia, 1)
+                avaliacao["variacao"] = round(throughput / referencia - 1, 3)
+                avaliacao["regressao"] = throughput < referencia * (1 - limiar)
+                for grupo, estagios in ESTAGIOS.items():
+                    atual = _ms_por_mil(execucao["duracoes"], estagios, execucao["linhas"])
+                    historicos = [a["estagios"][grupo] for a in janela if a["estagios"].get(grupo)]
+                    if atual is None or len(historicos) < min_baseline:
+                        continue
+                    mediana = statistics.median(historicos)
+                    avaliacao["estagios"][grupo] = {
+                        "ms_por_mil": round(atual, 1),
+                        "baseline": round(mediana, 1),
+                        "mais_lento": atual > mediana / (1 - limiar),
+                    }
+            avaliacoes.append(avaliacao)
+
+        if comparavel:
+            anteriores.append({
+                "throughput": throughput,
+                "estagios": {
+                    grupo: _ms_por_mil(execucao["duracoes"], estagios, execucao["linhas"])
+                    for grupo, estagios in ESTAGIOS.items()
+                },
+            })
+    return avaliacoes
+
+
+def relatorio(dias=7, process_name=None, baseline=RUN_METRICS_BASELINE_RUNS, limiar=RUN_METRICS_THRESHOLD):
+    """
+    Avalia as execuções dos últimos `dias` contra a baseline.
+
+    Returns:
+        list: Avaliações (ver detectar_regressoes)
+    """
+    conn = get_db_connection()
+    try:
+        garantir_schema(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT now() - make_interval(days => %s)", (dias,))
+            inicio_periodo = cursor.fetchone()[0]
+            # Baseline: até `baseline` execuções com volume antes do período, por processo e modo
+            cursor.execute("""
+                WITH candidatas AS (
+                    SELECT *,
+                        row_number() OVER (
+                            PARTITION BY process_name, replay,
+                                registrado_em >= %(inicio)s
+                            ORDER BY registrado_em DESC
+                        ) AS posicao
+                    FROM process_run_metrics
+                    WHERE (%(processo)s::text IS NULL OR process_name = %(processo)s)
+                      AND status = 'sucesso' AND linhas >= %(min_linhas)s
+                )
+                SELECT process_name, data, invocacao, registrado_em, status, replay,
+                       duracao_ms, linhas, duracoes
+                FROM candidatas
+                WHERE registrado_em >= %(inicio)s OR posicao <= %(baseline)s
+                ORDER BY registrado_em
+            """, {"inicio": inicio_periodo, "processo": process_name,
+                  "min_linhas": RUN_METRICS_MIN_ROWS, "baseline": baseline})
+            colunas = [coluna.name for coluna in cursor.description]
+            execucoes = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+        conn.commit()
+    finally:
+        conn.close()
+
+    return detectar_regressoes(execucoes, inicio_periodo, baseline=baseline, limiar=limiar)
+
+
+def _imprimir(avaliacoes, todas):
+    exibidas = [a for a in avaliacoes if todas or a["regressao"]]
+    for a in exibidas:
+        marca = "REGRESSÃO" if a["regressao"] else "ok"
+        variacao = f"{a['variacao']:+.0%}" if a["variacao"] is not None else "sem baseline"
+        lentos = [
+            f"{grupo} {e['ms_por_mil']} ms/mil (baseline {e['baseline']})"
+            for grupo, e in a["estagios"].items() if e["mais_lento"]
+        ]
+        print(f"{marca:<10} {a['process_name']} {a['data']} ({a['registrado_em'][:16]}"
+              f"{', replay' if a['replay'] else ''}): {a['throughput']} lanç/s, "
+              f"baseline {a['baseline']} ({variacao})"
+              + (f" | mais lentos: {'; '.join(lentos)}" if lentos else ""))
+    regressoes = sum(1 for a in avaliacoes if a["regressao"])
+    print(f"{len(avaliacoes)} execuções avaliadas, {regressoes} regressões")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regressões de throughput por execução de data")
+    parser.add_argument("--dias", type=int, default=7, help="Período avaliado (dias)")
+    parser.add_argument("--baseline", type=int, default=RUN_METRICS_BASELINE_RUNS, help="Execuções anteriores na baseline")
+    parser.add_argument("--limiar", type=float, default=RUN_METRICS_THRESHOLD, help="Queda relativa que caracteriza regressão")
+    parser.add_argument("--conta", help="process_name (padrão: todos)")
+    parser.add_argument("--todas", action="store_true", help="Lista também as execuções sem regressão")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    resultado = relatorio(args.dias, args.conta, baseline=args.baseline, limiar=args.limiar)
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(resultado, args.todas)
+    sys.exit(1 if any(a["regressao"] for a in resultado) else 0)
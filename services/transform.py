@@ -0,0 +1,289 @@
+import sys
+from itertools import compress, repeat
+from operator import attrgetter, methodcaller
+from typing import Iterable, List
+import numpy as np
+from utils.logger import setup_logger
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "transform",
+    log_file="logs/transform.log"
+)
+
+# Schema dos lançamentos transformados: coluna -> dtype garantido
+SCHEMA = {
+    "indicadorTipoLancamento": "Int64",
+    "dataLancamento": "datetime64[ns]",
+    "dataMovimento": "datetime64[ns]",
+    "codigoAgenciaOrigem": "Int64",
+    "numeroLote": "Int64",
+    "numeroDocumento": "Int64",
+    "codigoHistorico": "Int64",
+    "valorLancamento": "float64",
+    "codigoBancoContrapartida": "Int64",
+    "codigoAgenciaContrapartida": "Int64",
+    "textoInformacaoComplementar": "string",
+    "numeroCpfCnpjContrapartida": "string",
+    "indicadorTipoPessoaContrapartida": "string",
+    "numeroContaContrapartida": "string",
+    "textoDescricaoHistorico": "string",
+    "textoDvContaContrapartida": "string",
+    "indicadorSinalLancamento": "string",
+    "finance_category": "string",
+}
+
+# Colunas lidas do payload `listaLancamento` da API (todas, exceto a categoria)
+RAW_COLUMNS = [col for col in SCHEMA if col != "finance_category"]
+
+# Tipos de lançamento descartados (saldos, resumos e afins)
+TIPOS_FILTRADOS = ["S", "R", "D", "A"]
+
+# Descrições de linhas de saldo
+DESCRICOES_SALDO = ["SALDO ANTERIOR", "S A L D O"]
+
+# Colunas de texto com poucos valores distintos: cada valor é guardado uma única vez
+COLUNAS_INTERNADAS = {
+    "textoDescricaoHistorico", "textoInformacaoComplementar",
+    "indicadorTipoPessoaContrapartida", "textoDvContaContrapartida",
+    "indicadorSinalLancamento",
+}
+
+
+class LoteLancamentos:
+    """
+    Lançamentos de uma página (ou data) em colunas compactas: inteiros em
+    arrays int64 com máscara de nulos, valores em float64, datas em
+    datetime64[D] (NaT para nulas) e textos em listas de str. Substitui o
+    dicionário por registro e o DataFrame entre transformação,
+    classificação e inserção.
+    """
+
+    __slots__ = ("_colunas", "_nulos", "_tamanho")
+
+    def __init__(self, colunas, nulos, tamanho):
+        """
+        Args:
+            colunas: Coluna -> np.ndarray (numéricas e datas) ou list (texto)
+            nulos: Coluna inteira -> máscara np.ndarray[bool] de nulos
+            tamanho: Quantidade de lançamentos
+        """
+        self._colunas = colunas
+        self._nulos = nulos
+        self._tamanho = tamanho
+
+    @classmethod
+    def vazio(cls):
+        """Lote sem lançamentos, com todas as colunas de SCHEMA."""
+        return transformar_lancamentos([])
+
+    def __len__(self):
+        return self._tamanho
+
+    def __getitem__(self, coluna):
+        return self._colunas[coluna]
+
+    @property
+    def colunas(self) -> List[str]:
+        return list(self._colunas)
+
+    def valores(self, coluna) -> list:
+        """Valores Python de uma coluna (None para nulos, date para datas)."""
+        valores = self._colunas[coluna]
+        if isinstance(valores, list):
+            return valores
+        if valores.dtype.kind == "M":
+            # datetime64[D].tolist() produz datetime.date e None para NaT
+            return valores.tolist()
+        nulos = self._nulos.get(coluna)
+        if nulos is None:
+            nulos = np.isnan(valores)
+        if not nulos.any():
+            return valores.tolist()
+        objetos = valores.astype(object)
+        objetos[nulos] = None
+        return objetos.tolist()
+
+    def linhas_sql(self, colunas, constantes=()):
+        """
+        Gera uma tupla por lançamento com tipos adaptáveis pelo psycopg2.
+
+        Args:
+            colunas: Colunas na ordem do INSERT
+            constantes: Valores repetidos ao fim de cada tupla (ex: a conta)
+        """
+        return zip(
+            *(self.valores(coluna) for coluna in colunas),
+            *(repeat(valor, self._tamanho) for valor in constantes)
+        )
+
+    def filtrar(self, mascara):
+        """Novo lote apenas com as posições em que `mascara` é verdadeira."""
+        mascara = np.asarray(mascara, dtype=bool)
+        posicoes = np.flatnonzero(mascara).tolist()
+        colunas = {
+            coluna: [valores[i] for i in posicoes] if isinstance(valores, list) else valores[mascara]
+            for coluna, valores in self._colunas.items()
+        }
+        nulos = {coluna: mascara_nulos[mascara] for coluna, mascara_nulos in self._nulos.items()}
+        return LoteLancamentos(colunas, nulos, len(posicoes))
+
+    def to_dataframe(self):
+        """DataFrame com os dtypes de SCHEMA (depuração e análises pontuais)."""
+        import pandas as pd
+
+        dados = {}
+        for coluna, dtype in SCHEMA.items():
+            valores = self._colunas[coluna]
+            if dtype == "Int64":
+                dados[coluna] = pd.arrays.IntegerArray(valores, self._nulos[coluna].copy())
+            elif dtype == "datetime64[ns]":
+                dados[coluna] = valores.astype("datetime64[ns]")
+            elif dtype == "float64":
+                dados[coluna] = valores
+            else:
+                dados[coluna] = pd.array(valores, dtype="string")
+        return pd.DataFrame(dados)
+
+
+def _inteiros(valores):
+    try:
+        # Sem nulos: conversão direta
+        return np.asarray(valores, dtype=np.int64), np.zeros(len(valores), dtype=bool)
+    except (TypeError, ValueError):
+        pass
+    objetos = np.asarray(valores, dtype=object)
+    nulos = np.equal(objetos, None) | (objetos == "")
+    return np.where(nulos, 0, objetos).astype(np.int64), nulos
+
+
+def _decimais(valores):
+    try:
+        # None vira NaN na conversão direta
+        return np.asarray(valores, dtype=np.float64)
+    except (TypeError, ValueError):
+        # "" no lugar de null
+        return np.fromiter(
+            (np.nan if v is None or v == "" else float(v) for v in valores),
+            dtype=np.float64, count=len(valores)
+        )
+
+
+def _parse_datas(valores, nome):
+    """
+    Converte datas no formato DDMMYYYY (inteiro ou texto, com ou sem zero à
+    esquerda) para datetime64[D], de forma vetorizada. Vazias/zero viram NaT,
+    assim como valores não numéricos ou datas inexistentes, que são logados.
+    """
+    try:
+        # Caminho comum: todas numéricas (inteiros ou texto só com dígitos)
+        numeros = np.asarray(valores, dtype=np.int64)
+        texto = None
+        nao_numericas = False
+    except (TypeError, ValueError):
+        # Nulos, vazias ou texto não numérico viram 0 (NaT)
+        objetos = np.asarray(valores, dtype=object)
+        texto = np.char.strip(objetos.astype(str))
+        digitos = np.char.isdigit(texto)
+        numeros = np.where(digitos, texto, "0").astype(np.int64)
+        nao_numericas = ~digitos & ~np.equal(objetos, None) & (texto != "")
+    dia = numeros // 1000000
+    mes = numeros // 10000 % 100
+    ano = numeros % 10000
+
+    validas = (mes >= 1) & (mes <= 12) & (dia >= 1) & (ano >= 1)
+    inicio_mes = np.where(validas, (ano - 1970) * 12 + (mes - 1), 0).astype("datetime64[M]")
+    datas = inicio_mes.astype("datetime64[D]") + np.where(validas, dia - 1, 0).astype("timedelta64[D]")
+    # Dia além do fim do mês (ex: 31/04) cai no mês seguinte: inválida
+    validas &= datas.astype("datetime64[M]") == inicio_mes
+    datas[~validas] = np.datetime64("NaT")
+
+    # Logar apenas valores não vazios que falharam na conversão
+    invalidas = ~validas & ((numeros != 0) | nao_numericas)
+    if invalidas.any():
+        exemplo = texto[invalidas][0] if texto is not None else f"{numeros[invalidas][0]:08d}"
+        logger.error("Erro ao converter %s: %s valores inválidos (ex: %s)",
+                     nome, int(invalidas.sum()), exemplo)
+    return datas
+
+
+def _textos(valores, internar):
+    if internar:
+        return [None if v is None else sys.intern(str(v)) for v in valores]
+    return [None if v is None else str(v) for v in valores]
+
+
+_ler_tipado = attrgetter(*RAW_COLUMNS)
+
+
+def _extrair_colunas(registros):
+    """
+    Valores brutos de cada coluna de RAW_COLUMNS. Registros tipados
+    (services.extrato_decoder.Lancamento) são lidos por atributo, uma tupla
+    por registro transposta em colunas; dicts (checkpoint, replay) por
+    coluna, com get (que os registros tipados também aceitam).
+    """
+    if not registros:
+        return {col: [] for col in RAW_COLUMNS}
+    if not any(isinstance(r, dict) for r in registros):
+        return dict(zip(RAW_COLUMNS, zip(*map(_ler_tipado, registros))))
+    return {col: list(map(methodcaller("get", col), registros)) for col in RAW_COLUMNS}
+
+
+def transformar_lancamentos(lancamentos: Iterable[dict]) -> LoteLancamentos:
+    """
+    Transforma registros brutos de `listaLancamento` em um LoteLancamentos
+    tipado, coluna a coluna.
+
+    Aplica os filtros de indicadorTipoLancamento (S/R/D/A) e de linhas de
+    saldo antes de qualquer conversão. A coluna finance_category é criada
+    vazia.
+
+    Args:
+        lancamentos: Registros da API (dicts ou Lancamento tipados; lista
+            ou páginas concatenadas)
+
+    Returns:
+        LoteLancamentos: Lançamentos com as colunas e tipos de SCHEMA
+    """
+    registros = lancamentos if isinstance(lancamentos, list) else list(lancamentos)
+    total = len(registros)
+    por_coluna = _extrair_colunas(registros)
+
+    tamanho = total
+    if total:
+        # Filtros antes de qualquer conversão, por consulta em hash (em C)
+        # aos valores descartados; as colunas são poucas vezes distintas
+        tipos = por_coluna["indicadorTipoLancamento"]
+        descartados = {v for v in set(tipos) if str(v).strip() in TIPOS_FILTRADOS}
+        manter = ~np.fromiter(map(descartados.__contains__, tipos), dtype=bool, count=total)
+        logger.info("Após filtrar registros com indicadorTipoLancamento S/R/D/A: %s de %s registros",
+                    int(manter.sum()), total)
+
+        saldos = set(DESCRICOES_SALDO)
+        manter &= ~np.fromiter(map(saldos.__contains__, por_coluna["textoDescricaoHistorico"]),
+                               dtype=bool, count=total)
+        tamanho = int(manter.sum())
+        logger.info("Após remover registros de saldo: %s registros", tamanho)
+
+        if tamanho < total:
+            selecao = manter.tolist()
+            por_coluna = {col: list(compress(valores, selecao)) for col, valores in por_coluna.items()}
+
+    colunas = {}
+    nulos = {}
+    for col in RAW_COLUMNS:
+        valores = por_coluna[col]
+        dtype = SCHEMA[col]
+        if dtype == "Int64":
+            colunas[col], nulos[col] = _inteiros(valores)
+        elif dtype == "float64":
+            colunas[col] = _decimais(valores)
+        elif dtype == "datetime64[ns]":
+            colunas[col] = _parse_datas(valores, col)
+        else:
+            # Inteiros vindos da API (ex: CPF/CNPJ) passam a texto, como str()
+            colunas[col] = _textos(valores, internar=col in COLUNAS_INTERNADAS)
+    colunas["finance_category"] = [None] * tamanho
+
+    return LoteLancamentos(colunas, nulos, tamanho)
@@ -2,7 +2,8 @@ import sys
 sys.path.append(r'D:\OneDrive\Documentos\VS Code\Mercado\bb_integration')
 
 import pandas as pd
-from handlers.database import get_db_connection
+from handlers.database import atualizar_categorias, get_db_connection
+from services.parquet_export import reexportar
 from services.bank_statement_analyser import BankStatementAnalyzer
 from services.embedding_classifier import EmbeddingClassifier
 from utils.logger import setup_logger
@@ -42,6 +43,8 @@ def update_categories_in_database(batch_size=100):
         
         processed = 0
         updated = 0
+        # (process_name, data) reclassificadas: o Parquet é regravado no final
+        afetadas = set()
         
         while processed < total_transactions:
             cursor.execute("""
@@ -73,12 +76,8 @@ def update_categories_in_database(batch_size=100):
                         additional_info
                     )
                     
-                    # Atualiza a categoria independente do score
-                    cursor.execute("""
-                        UPDATE extrato_juridica 
-                        SET finance_category = %s
-                        WHERE id = %s
-                    """, (classification["category"], transaction_id))
+                    # Atualiza a categoria independente do score (e os agregados diários)
+                    atualizar_categorias(cursor, [(transaction_id, classification["category"])], afetadas)
                     updated += 1
                     
                     # Log detalhado da classificação
@@ -109,6 +108,8 @@ def update_categories_in_database(batch_size=100):
         cursor.close()
         conn.close()
         
+        reexportar(afetadas)
+        
         logger.info("\nResumo da atualização:")
         logger.info(f"Total processado: {processed}")
         logger.info(f"Atualizadas: {updated}")
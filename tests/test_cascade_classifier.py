@@ -0,0 +1,98 @@
+"""Cascata kNN -> LLM (services/cascade_classifier.py)."""
+import pytest
+
+from services.cascade_classifier import CascadeClassifier, custo_llm, margem
+
+
+class _Knn:
+    """kNN falso: resultado fixo por descrição."""
+
+    def __init__(self, resultados):
+        self.resultados = resultados
+
+    def classify_transaction(self, description, additional_info):
+        category, scores = self.resultados[description]
+        return {"category": category, "score": scores[category], "all_scores": scores}
+
+
+class _Llm:
+    def __init__(self, categorias=None, erro=None):
+        self.categorias = categorias or {}
+        self.erro = erro
+        self.lotes = []
+
+    def categorize_batch(self, transacoes):
+        self.lotes.append(list(transacoes))
+        if self.erro:
+            raise self.erro
+        return ([self.categorias.get(descricao) for descricao, _ in transacoes],
+                {"input_tokens": 100, "output_tokens": 10})
+
+
+KNN = _Knn({
+    "confiante": ("Tarifas", {"Tarifas": 0.9, "Impostos": 0.2}),
+    "score baixo": ("Tarifas", {"Tarifas": 0.3, "Impostos": 0.1}),
+    "margem baixa": ("Tarifas", {"Tarifas": 0.8, "Impostos": 0.78}),
+})
+
+
+@pytest.fixture
+def cascata():
+    def criar(llm, tamanho_lote=25):
+        classificador = CascadeClassifier(KNN, min_score=0.45, min_margem=0.05, tamanho_lote=tamanho_lote)
+        classificador._llm = llm
+        return classificador
+    return criar
+
+
+def test_margem():
+    assert margem({"all_scores": {"a": 0.8, "b": 0.5, "c": 0.1}}) == pytest.approx(0.3)
+    assert margem({"all_scores": {"a": 0.8}}) == pytest.approx(0.8)
+    assert margem({"all_scores": {}}) == 0.0
+
+
+def test_custo_llm():
+    assert custo_llm(1_000_000, 0) == pytest.approx(0.10)
+
+
+def test_casos_confiantes_nao_chamam_o_llm(cascata):
+    llm = _Llm()
+    resultado = cascata(llm).classify_transaction("confiante", "")
+
+    assert (resultado["category"], resultado["origem"]) == ("Tarifas", "knn")
+    assert llm.lotes == []
+
+
+def test_escala_score_ou_margem_baixos_e_aplica_categoria_do_llm(cascata):
+    llm = _Llm(categorias={"score baixo": "Impostos", "margem baixa": "Tarifas"})
+    transacoes = [("confiante", ""), ("score baixo", "x"), ("margem baixa", "")]
+
+    resultados = cascata(llm).classify_batch(transacoes)
+
+    assert llm.lotes == [[("score baixo", "x"), ("margem baixa", "")]]
+    assert [r["origem"] for r in resultados] == ["knn", "llm", "llm"]
+    assert resultados[1]["category"] == "Impostos" and resultados[1]["categoria_knn"] == "Tarifas"
+    assert not any(r.get("pendente_llm") for r in resultados)
+
+
+def test_escalados_enviados_em_lotes(cascata):
+    llm = _Llm(categorias={"score baixo": "Impostos"})
+    cascata(llm, tamanho_lote=2).classify_batch([("score baixo", str(i)) for i in range(5)])
+    assert [len(lote) for lote in llm.lotes] == [2, 2, 1]
+
+
+def test_falha_do_llm_mantem_knn_como_pendente(cascata):
+    llm = _Llm(erro=RuntimeError("timeout"))
+    resultados = cascata(llm).classify_batch([("confiante", ""), ("score baixo", "")])
+
+    assert [r["category"] for r in resultados] == ["Tarifas", "Tarifas"]
+    assert [r["origem"] for r in resultados] == ["knn", "knn"]
+    assert [bool(r.get("pendente_llm")) for r in resultados] == [False, True]
+
+
+def test_transacao_sem_resposta_do_llm_fica_pendente(cascata):
+    llm = _Llm(categorias={"margem baixa": "Impostos"})
+    resultados = cascata(llm).classify_batch([("score baixo", ""), ("margem baixa", "")])
+
+    assert resultados[0]["pendente_llm"] and resultados[0]["origem"] == "knn"
+    assert resultados[1]["category"] == "Impostos"
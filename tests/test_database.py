@@ -0,0 +1,149 @@
+"""Chave natural e inserção idempotente (handlers/database.py)."""
+import os
+import re
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from handlers import database
+from handlers.database import (
+    CHAVE_NATURAL, COLUNAS_BANCO, INSERT_LOTE_QUERY, UPSERT_AGREGADOS_QUERY,
+    _normalizar_chave, inserir_no_banco,
+)
+from services.transform import transformar_lancamentos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_normalizar_chave_nulo_igual_a_texto_vazio():
+    assert _normalizar_chave([None, "a"]) == _normalizar_chave(["", "a"])
+
+
+def test_normalizar_chave_ignora_espacos_das_pontas():
+    assert _normalizar_chave([" PIX\t\n"]) == _normalizar_chave(["PIX"])
+    # Mesmo conjunto do btrim do índice: espaço não separável não é removido
+    assert _normalizar_chave(["PIX\xa0"]) != _normalizar_chave(["PIX"])
+    assert _normalizar_chave(["P IX"]) != _normalizar_chave(["PIX"])
+
+
+def test_normalizar_chave_compara_valores_com_duas_casas():
+    assert _normalizar_chave([Decimal("10.50")]) == _normalizar_chave([10.5])
+    assert _normalizar_chave([10.504]) == _normalizar_chave([Decimal("10.50")])
+    assert _normalizar_chave([10.5]) != _normalizar_chave([10.51])
+
+
+def test_normalizar_chave_preserva_inteiros_e_datas():
+    assert _normalizar_chave([0, date(2025, 3, 1)]) == (0, date(2025, 3, 1))
+    # Inteiro nulo não colide com zero
+    assert _normalizar_chave([None]) != _normalizar_chave([0])
+
+
+def test_conflito_usa_as_expressoes_do_indice_unico():
+    """O alvo do ON CONFLICT precisa ser idêntico ao índice de migrations/0005."""
+    with open(os.path.join(RAIZ, "migrations", "0005_conta_extrato_juridica.sql"), encoding="utf-8") as f:
+        migracao = f.read()
+    indice = re.search(r"ux_extrato_juridica_conta_chave_natural\s+ON extrato_juridica \((.*?)\) NULLS NOT DISTINCT",
+                       migracao, re.S).group(1)
+    alvo = re.search(r"ON CONFLICT \((.*)\) DO NOTHING", INSERT_LOTE_QUERY).group(1)
+
+    assert " ".join(alvo.split()) == " ".join(indice.split())
+    assert all(coluna in alvo for coluna in CHAVE_NATURAL)
+
+
+class _Cursor:
+    def __init__(self, existentes):
+        self.existentes = existentes
+        self.consultas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, consulta, params=None):
+        self.consultas.append(str(consulta))
+
+    def fetchall(self):
+        return self.existentes
+
+
+class _Conexao:
+    def __init__(self, existentes=()):
+        self.cursor_ = _Cursor(list(existentes))
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _lancamento(**campos):
+    registro = {
+        "indicadorTipoLancamento": "1", "dataLancamento": 1032025, "dataMovimento": 1032025,
+        "codigoAgenciaOrigem": 1, "numeroLote": 2, "numeroDocumento": 3, "codigoHistorico": 4,
+        "valorLancamento": 10.5, "textoInformacaoComplementar": "PIX",
+        "numeroCpfCnpjContrapartida": "123", "textoDescricaoHistorico": "Pix",
+        "indicadorSinalLancamento": "D",
+    }
+    registro.update(campos)
+    return registro
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    """Conexão falsa; execute_values devolve as linhas enviadas como RETURNING."""
+    estado = {"conexao": _Conexao(), "inseridas": [], "agregados": []}
+    posicoes = [COLUNAS_BANCO.index(c) for c in
+                ("datalancamento", "process_name", "finance_category", "indicadorsinallancamento", "valorlancamento")]
+
+    def execute_values(cursor, consulta, linhas, **kwargs):
+        linhas = list(linhas)
+        if consulta == UPSERT_AGREGADOS_QUERY:
+            estado["agregados"].extend(linhas)
+            return []
+        estado["inseridas"].extend(linhas)
+        return [tuple(linha[i] for i in posicoes) for linha in linhas]
+
+    monkeypatch.setattr(database, "get_db_connection", lambda: estado["conexao"])
+    monkeypatch.setattr(database, "execute_values", execute_values)
+    monkeypatch.setattr(database, "_meses_particionados", {date(2025, 3, 1)})
+    return estado
+
+
+def test_inserir_no_banco_remove_duplicatas_do_lote_e_do_banco(banco):
+    # Já gravado pela conta: mesmo lançamento com complemento nulo
+    banco["conexao"] = _Conexao(existentes=[
+        (date(2025, 3, 1), "conta", 1, 2, 9, 4, Decimal("10.50"), "D", "123", None),
+    ])
+    lote = transformar_lancamentos([
+        _lancamento(),
+        _lancamento(textoInformacaoComplementar=" PIX "),  # duplicata no lote
+        _lancamento(numeroDocumento=9, textoInformacaoComplementar=""),  # duplicata no banco
+        _lancamento(numeroDocumento=10),
+    ])
+
+    resultado = inserir_no_banco(lote, process_name="conta")
+
+    assert resultado == {"inseridos": 2, "duplicados": 2, "total": 4}
+    documento = COLUNAS_BANCO.index("numerodocumento")
+    assert [linha[documento] for linha in banco["inseridas"]] == [3, 10]
+    assert all(linha[-1] == "conta" for linha in banco["inseridas"])
+    # Agregados recebem apenas as linhas inseridas, somadas por dia/conta/categoria/sinal
+    assert banco["agregados"] == [(date(2025, 3, 1), "conta", "", "D", Decimal("21.0"), 2)]
+    assert "process_name = %s" in banco["conexao"].cursor_.consultas[0]
+
+
+def test_inserir_no_banco_exige_conta(banco, monkeypatch):
+    monkeypatch.delenv("PROCESS_NAME", raising=False)
+    with pytest.raises(ValueError):
+        inserir_no_banco(transformar_lancamentos([_lancamento()]))
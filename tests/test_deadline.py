@@ -0,0 +1,83 @@
+"""Orçamento de tempo da invocação (utils/deadline.py)."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date
+
+from utils.deadline import Prazo, prazo_atual, prazo_vigente, priorizar_datas
+
+
+class _Relogio:
+    """Tempo restante controlado pelo teste."""
+
+    def __init__(self, restante_ms):
+        self.restante_ms = restante_ms
+
+    def __call__(self):
+        return self.restante_ms
+
+
+class _ContextoLambda:
+    def get_remaining_time_in_millis(self):
+        return 90_000
+
+
+def test_cabe_desconta_a_margem():
+    prazo = Prazo(_Relogio(100_000), margem_ms=30_000)
+    assert prazo.cabe(70_000)
+    assert not prazo.cabe(70_001)
+
+
+def test_pode_iniciar_libera_a_primeira_data_mesmo_sem_tempo():
+    relogio = _Relogio(10_000)
+    prazo = Prazo(relogio, margem_ms=30_000)
+
+    assert prazo.pode_iniciar(60_000)
+    assert not prazo.pode_iniciar(60_000)
+    relogio.restante_ms = 200_000
+    assert prazo.pode_iniciar(60_000)
+
+
+def test_pode_iniciar_libera_uma_unica_primeira_data_entre_threads():
+    prazo = Prazo(_Relogio(0), margem_ms=30_000)
+    barreira = threading.Barrier(8)
+
+    def tentar():
+        barreira.wait()
+        return prazo.pode_iniciar(60_000)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        resultados = list(executor.map(lambda _: tentar(), range(8)))
+    assert resultados.count(True) == 1
+
+
+def test_em_ms_conta_a_partir_de_agora():
+    prazo = Prazo.em_ms(60_000, margem_ms=0)
+    assert 59_000 < prazo.restante_ms() <= 60_000
+
+
+def test_de_contexto():
+    assert Prazo.de_contexto(None) is None
+    assert Prazo.de_contexto(object()) is None
+    prazo = Prazo.de_contexto(_ContextoLambda(), margem_ms=30_000)
+    assert prazo.restante_ms() == 90_000 and prazo.cabe(60_000)
+
+
+def test_prazo_vigente_no_contexto_e_em_threads_que_o_copiam():
+    prazo = Prazo(_Relogio(1_000))
+    assert prazo_atual() is None
+
+    with prazo_vigente(prazo):
+        assert prazo_atual() is prazo
+        contexto = copy_context()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(contexto.run, prazo_atual).result() is prazo
+            # Sem copiar o contexto, a thread não herda o prazo
+            assert executor.submit(prazo_atual).result() is None
+
+    assert prazo_atual() is None
+
+
+def test_priorizar_datas_ontem_primeiro_e_demais_da_mais_antiga():
+    datas = ["18032025", "1032025", "19032025", "15022025"]
+    assert priorizar_datas(datas, hoje=date(2025, 3, 20)) == ["19032025", "15022025", "1032025", "18032025"]
@@ -0,0 +1,87 @@
+"""Arquivo das páginas brutas do extrato (services/extrato_archive.py)."""
+import json
+
+import pytest
+
+from services.extrato_archive import ExtratoArchive, identificar_conta
+from services.extrato_decoder import decodificar_pagina
+
+CONTA = "1234-56789"
+DATA = "1032025"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ExtratoArchive(base_dir=str(tmp_path))
+
+
+def test_identificar_conta():
+    url = "https://api.bb.com.br/extratos/v1/conta-corrente/agencia/1234/conta/56789?gw-dev-app-key=x"
+    assert identificar_conta(url) == CONTA
+    assert identificar_conta(None) == "conta-desconhecida"
+
+
+def test_chave_por_conta_data_e_pagina(archive):
+    assert archive.chave(CONTA, DATA, 3) == f"extratos-raw/{CONTA}/2025/03/01/pagina-0003.ndjson.gz"
+
+
+def test_ida_e_volta_preserva_registros_e_ordem_das_paginas(archive):
+    paginas = {
+        1: [{"numeroDocumento": 1, "textoInformacaoComplementar": "Pagamento ção"}],
+        2: [{"numeroDocumento": 2, "valorLancamento": 10.5}, {"numeroDocumento": 3, "campoNovo": [1, 2]}],
+        10: [{"numeroDocumento": 4, "numeroLote": None}],
+    }
+    for pagina, registros in paginas.items():
+        archive.salvar_pagina(CONTA, DATA, pagina, registros)
+
+    assert list(archive.iterar_paginas(CONTA, DATA)) == list(paginas.values())
+    assert archive.carregar_lancamentos(CONTA, DATA) == [r for p in paginas.values() for r in p]
+
+
+def test_nova_busca_substitui_paginas_anteriores(archive):
+    for pagina in (1, 2, 3):
+        archive.salvar_pagina(CONTA, DATA, pagina, [{"busca": 1, "pagina": pagina}])
+
+    # Nova busca com menos páginas: nenhuma página da busca anterior sobra
+    archive.salvar_pagina(CONTA, DATA, 1, [{"busca": 2, "pagina": 1}])
+    archive.salvar_pagina(CONTA, DATA, 2, [{"busca": 2, "pagina": 2}])
+
+    assert archive.carregar_lancamentos(CONTA, DATA) == [{"busca": 2, "pagina": 1}, {"busca": 2, "pagina": 2}]
+
+
+def test_busca_retomada_mantem_paginas_anteriores(archive):
+    archive.salvar_pagina(CONTA, DATA, 1, [{"pagina": 1}])
+    archive.salvar_pagina(CONTA, DATA, 2, [{"pagina": 2}])
+    # Retomada do checkpoint: continua a partir da página 3
+    archive.salvar_pagina(CONTA, DATA, 3, [{"pagina": 3}])
+
+    assert archive.carregar_lancamentos(CONTA, DATA) == [{"pagina": 1}, {"pagina": 2}, {"pagina": 3}]
+    assert archive.remover_data(CONTA, DATA) == 3
+    assert archive.remover_data(CONTA, DATA) == 0
+
+
+def test_data_sem_paginas(archive):
+    archive.salvar_pagina(CONTA, "2032025", 1, [{"pagina": 1}])
+    with pytest.raises(FileNotFoundError):
+        archive.carregar_lancamentos(CONTA, DATA)
+
+
+def test_arquiva_registros_da_api_sem_perda_de_campos(archive):
+    """O replay precisa receber exatamente o que a API enviou, inclusive nulos e campos fora do schema."""
+    registros = [
+        {"indicadorTipoLancamento": "1", "dataLancamento": 1032025, "numeroDocumento": 7,
+         "valorLancamento": 10.5, "codigoBancoContrapartida": None, "numeroLote": "",
+         "textoInformacaoComplementar": "PIX", "campoNovoDaApi": {"a": 1}},
+        {"numeroDocumento": "não numérico", "valorLancamento": 1.0},  # rejeitado pelo decoder
+    ]
+    conteudo = json.dumps({"quantidadeTotalPagina": 1, "listaLancamento": registros}).encode()
+
+    pagina = decodificar_pagina(conteudo, pagina=1)
+    archive.salvar_pagina(CONTA, DATA, 1, pagina.registros_brutos())
+
+    assert archive.carregar_lancamentos(CONTA, DATA) == registros
+
+
+def test_exige_destino():
+    with pytest.raises(ValueError):
+        ExtratoArchive()
@@ -0,0 +1,77 @@
+"""Decodificação tipada das páginas do extrato (services/extrato_decoder.py)."""
+import json
+
+import msgspec
+import pytest
+
+from handlers.database import COLUNAS_INSERCAO
+from services.extrato_decoder import Lancamento, decodificar_pagina
+from services.transform import transformar_lancamentos
+
+REGISTRO = {
+    "indicadorTipoLancamento": "1", "dataLancamento": 1032025, "dataMovimento": "01032025",
+    "codigoAgenciaOrigem": 1, "numeroLote": 2, "numeroDocumento": 3, "codigoHistorico": 4,
+    "valorLancamento": 10.5, "codigoBancoContrapartida": None, "textoInformacaoComplementar": "PIX",
+    "numeroCpfCnpjContrapartida": 12345678000190, "numeroContaContrapartida": "000123",
+    "textoDescricaoHistorico": "Pix", "indicadorSinalLancamento": "D",
+}
+
+
+def _pagina(registros, total=1):
+    return json.dumps({"quantidadeTotalPagina": total, "listaLancamento": registros}).encode()
+
+
+def test_caminho_rapido_decodifica_registros_tipados():
+    pagina = decodificar_pagina(_pagina([REGISTRO, dict(REGISTRO, numeroDocumento="4")], total=3))
+
+    assert pagina.total_paginas == 3
+    assert pagina.rejeitados == 0
+    assert all(isinstance(l, Lancamento) for l in pagina.lancamentos)
+    # Números enviados como texto são convertidos
+    assert [l.numeroDocumento for l in pagina.lancamentos] == [3, 4]
+    assert pagina.lancamentos[0].get("campoInexistente", "padrao") == "padrao"
+
+
+def test_caminho_lento_aceita_texto_vazio_como_nulo_em_campo_numerico():
+    pagina = decodificar_pagina(_pagina([REGISTRO, dict(REGISTRO, numeroLote="", valorLancamento="")]))
+
+    assert pagina.rejeitados == 0
+    assert pagina.lancamentos[1].numeroLote is None
+    assert pagina.lancamentos[1].valorLancamento is None
+
+
+def test_registro_invalido_e_rejeitado_e_os_demais_seguem():
+    invalido = dict(REGISTRO, numeroDocumento="não numérico")
+    pagina = decodificar_pagina(_pagina([REGISTRO, invalido, dict(REGISTRO, numeroDocumento=5)]), pagina=2)
+
+    assert pagina.rejeitados == 1
+    assert [l.numeroDocumento for l in pagina.lancamentos] == [3, 5]
+
+
+def test_pagina_sem_lancamentos():
+    pagina = decodificar_pagina(b'{"quantidadeTotalPagina": 0}')
+    assert (pagina.total_paginas, pagina.lancamentos, pagina.registros_brutos()) == (0, [], [])
+
+
+def test_envelope_invalido():
+    with pytest.raises(msgspec.ValidationError):
+        decodificar_pagina(b'{"listaLancamento": []}')
+    with pytest.raises(msgspec.DecodeError):
+        decodificar_pagina(b'{"quantidadeTotalPagina": 1,')
+
+
+@pytest.mark.parametrize("registros", [
+    [REGISTRO, dict(REGISTRO, campoNovoDaApi={"x": [1, None]})],               # caminho rápido
+    [REGISTRO, dict(REGISTRO, numeroLote=""), dict(REGISTRO, numeroLote="x")],  # caminho lento, com rejeitado
+])
+def test_registros_brutos_iguais_ao_corpo_original(registros):
+    pagina = decodificar_pagina(_pagina(registros))
+    assert pagina.registros_brutos() == registros
+
+
+def test_lote_tipado_igual_ao_lote_de_dicts():
+    registros = [REGISTRO, dict(REGISTRO, numeroDocumento=7, textoInformacaoComplementar=None, valorLancamento=0.1)]
+    tipado = transformar_lancamentos(decodificar_pagina(_pagina(registros)).lancamentos)
+    dicts = transformar_lancamentos(json.loads(_pagina(registros))["listaLancamento"])
+
+    assert list(tipado.linhas_sql(COLUNAS_INSERCAO)) == list(dicts.linhas_sql(COLUNAS_INSERCAO))
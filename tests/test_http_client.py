@@ -0,0 +1,213 @@
+"""Retentativas e circuit breaker das requisições à API (handlers/http_client.py)."""
+import types
+
+import pytest
+import requests
+
+from handlers import http_client
+from handlers.http_client import CircuitBreaker, CircuitoAbertoError, get_com_retry
+from utils.deadline import Prazo, prazo_vigente
+
+
+class _Relogio:
+    """Substitui o módulo time em http_client: monotonic controlado e sleep registrado."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(http_client, "time", types.SimpleNamespace(monotonic=relogio.monotonic, sleep=relogio.sleep))
+    return relogio
+
+
+def _resposta(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+@pytest.fixture
+def sessao(monkeypatch):
+    """Sessão falsa: cada GET consome o próximo item do roteiro (resposta ou exceção)."""
+
+    class _Sessao:
+        def __init__(self):
+            self.roteiro = []
+            self.chamadas = 0
+
+        def get(self, url, timeout=None, **kwargs):
+            self.chamadas += 1
+            item = self.roteiro.pop(0)
+            if isinstance(item, Exception):
+                raise item
+            return item
+
+    sessao = _Sessao()
+    monkeypatch.setattr(http_client, "obter_sessao", lambda: sessao)
+    monkeypatch.setattr(http_client, "_backoff", lambda tentativa: 0.5)
+    return sessao
+
+
+# Circuit breaker
+
+def test_breaker_abre_apos_limiar_de_falhas(relogio):
+    breaker = CircuitBreaker("api", limiar=3, reset_s=60)
+    for _ in range(2):
+        breaker.registrar_falha()
+    assert breaker.estado == "fechado"
+    breaker.permitir()
+
+    breaker.registrar_falha()
+    assert breaker.estado == "aberto"
+    with pytest.raises(CircuitoAbertoError):
+        breaker.permitir()
+
+
+def test_breaker_sucesso_zera_falhas_consecutivas(relogio):
+    breaker = CircuitBreaker("api", limiar=3, reset_s=60)
+    breaker.registrar_falha()
+    breaker.registrar_falha()
+    breaker.registrar_sucesso()
+    breaker.registrar_falha()
+    assert breaker.estado == "fechado"
+
+
+def test_breaker_meio_aberto_libera_uma_unica_requisicao_de_teste(relogio):
+    breaker = CircuitBreaker("api", limiar=1, reset_s=60)
+    breaker.registrar_falha()
+    relogio.agora += 60
+    assert breaker.estado == "meio-aberto"
+
+    breaker.permitir()
+    with pytest.raises(CircuitoAbertoError):
+        breaker.permitir()
+
+
+def test_breaker_teste_com_sucesso_fecha(relogio):
+    breaker = CircuitBreaker("api", limiar=1, reset_s=60)
+    breaker.registrar_falha()
+    relogio.agora += 60
+    breaker.permitir()
+    breaker.registrar_sucesso()
+
+    assert breaker.estado == "fechado"
+    breaker.permitir()
+    breaker.permitir()
+
+
+def test_breaker_teste_com_falha_reabre(relogio):
+    breaker = CircuitBreaker("api", limiar=5, reset_s=60)
+    for _ in range(5):
+        breaker.registrar_falha()
+    relogio.agora += 60
+    breaker.permitir()
+    breaker.registrar_falha()
+
+    assert breaker.estado == "aberto"
+    relogio.agora += 59
+    with pytest.raises(CircuitoAbertoError):
+        breaker.permitir()
+    relogio.agora += 1
+    breaker.permitir()
+
+
+# Retentativas
+
+def test_retenta_5xx_e_devolve_sucesso(relogio, sessao):
+    sessao.roteiro = [_resposta(503), _resposta(502), _resposta(200)]
+    breaker = CircuitBreaker("api", limiar=5, reset_s=60)
+
+    assert get_com_retry("https://api", breaker=breaker).status_code == 200
+    assert sessao.chamadas == 3
+    assert relogio.esperas == [0.5, 0.5]
+    assert breaker.falhas == 0
+
+
+def test_nao_retenta_status_nao_retentavel(relogio, sessao):
+    sessao.roteiro = [_resposta(404)]
+    assert get_com_retry("https://api").status_code == 404
+    assert relogio.esperas == []
+
+
+def test_retry_after_limitado_ao_backoff_maximo(relogio, sessao, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_MAX_S", 30)
+    sessao.roteiro = [_resposta(429, retry_after="3600"), _resposta(429, retry_after="2"), _resposta(200)]
+
+    assert get_com_retry("https://api").status_code == 200
+    assert relogio.esperas == [30, 2.0]
+
+
+def test_429_nao_abre_o_circuito(relogio, sessao):
+    sessao.roteiro = [_resposta(429, retry_after="1")] * 3 + [_resposta(200)]
+    breaker = CircuitBreaker("api", limiar=2, reset_s=60)
+
+    assert get_com_retry("https://api", breaker=breaker).status_code == 200
+    assert breaker.estado == "fechado"
+
+
+def test_esgota_tentativas(relogio, sessao):
+    sessao.roteiro = [_resposta(500)] * 3
+    assert get_com_retry("https://api", max_retries=2).status_code == 500
+    assert sessao.chamadas == 3
+
+    sessao.roteiro = [requests.Timeout("lento")] * 3
+    with pytest.raises(requests.Timeout):
+        get_com_retry("https://api", max_retries=2)
+
+
+def test_erro_de_conexao_retentado(relogio, sessao):
+    sessao.roteiro = [requests.ConnectionError("reset"), _resposta(200)]
+    assert get_com_retry("https://api").status_code == 200
+    assert relogio.esperas == [0.5]
+
+
+def test_desiste_quando_espera_nao_cabe_no_prazo(relogio, sessao):
+    # 5 s além da margem: o backoff (0,5 s) cabe, o Retry-After de 10 s não
+    restante = {"ms": 35_000}
+    sessao.roteiro = [_resposta(503, retry_after="10")]
+
+    with prazo_vigente(Prazo(lambda: restante["ms"], margem_ms=30_000)):
+        assert get_com_retry("https://api").status_code == 503
+        assert relogio.esperas == []
+
+        restante["ms"] = 30_200
+        sessao.roteiro = [requests.Timeout("lento")]
+        with pytest.raises(requests.Timeout):
+            get_com_retry("https://api")
+    assert sessao.chamadas == 2
+    assert relogio.esperas == []
+
+
+def test_erro_nao_retentavel_libera_requisicao_de_teste(relogio, sessao):
+    breaker = CircuitBreaker("api", limiar=1, reset_s=60)
+    breaker.registrar_falha()
+    relogio.agora += 60
+    sessao.roteiro = [ValueError("resposta truncada")]
+
+    with pytest.raises(ValueError):
+        get_com_retry("https://api", breaker=breaker)
+    # A requisição de teste falhou: circuito reaberto, não preso em meio-aberto
+    assert breaker.estado == "aberto"
+    relogio.agora += 60
+    breaker.permitir()
+
+
+def test_circuito_aberto_nao_faz_requisicao(relogio, sessao):
+    breaker = CircuitBreaker("api", limiar=1, reset_s=60)
+    breaker.registrar_falha()
+    with pytest.raises(CircuitoAbertoError):
+        get_com_retry("https://api", breaker=breaker)
+    assert sessao.chamadas == 0
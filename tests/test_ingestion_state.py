@@ -0,0 +1,150 @@
+"""Datas pendentes, janela de retry e watermark (handlers/ingestion_state.py)."""
+from datetime import date, timedelta
+
+import pytest
+
+from handlers import ingestion_state
+from handlers.ingestion_state import _classificar_intervalo, obter_datas_pendentes
+
+HOJE = date(2025, 3, 20)
+
+
+def test_classificar_intervalo_separa_pendentes_e_perdidas():
+    estados = {
+        date(2025, 1, 2): "erro",        # aberta, mas fora da janela: já tratada pelo UPDATE
+        date(2025, 1, 5): "erro",
+        date(2025, 1, 6): "iniciada",
+        date(2025, 1, 7): "processada",
+        date(2025, 1, 8): "abandonada",
+    }
+    pendentes, perdidas = _classificar_intervalo(
+        watermark=date(2025, 1, 1), ontem=date(2025, 1, 9),
+        limite_retry=date(2025, 1, 5), estados=estados,
+    )
+    assert pendentes == [date(2025, 1, 5), date(2025, 1, 6), date(2025, 1, 9)]
+    assert perdidas == [date(2025, 1, 3), date(2025, 1, 4)]
+
+
+def test_classificar_intervalo_vazio_quando_watermark_em_ontem():
+    assert _classificar_intervalo(date(2025, 1, 9), date(2025, 1, 9), date(2025, 1, 1), {}) == ([], [])
+
+
+class _Cursor:
+    """Responde às consultas de obter_datas_pendentes e registra os comandos."""
+
+    def __init__(self, watermark, estados, abandonadas=()):
+        self.watermark = watermark
+        self.estados = estados
+        self.abandonadas = list(abandonadas)
+        self.comandos = []
+        self._resultado = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.comandos.append((sql, params))
+        if sql.startswith("SELECT low_watermark"):
+            self._resultado = [(self.watermark,)] if self.watermark else []
+        elif sql.startswith("UPDATE ingestion_state"):
+            self._resultado = [(d,) for d in self.abandonadas]
+        elif sql.startswith("SELECT data, status"):
+            self._resultado = list(self.estados.items())
+        else:
+            self._resultado = []
+
+    def fetchone(self):
+        return self._resultado[0] if self._resultado else None
+
+    def fetchall(self):
+        return self._resultado
+
+    def comando(self, inicio):
+        return [params for sql, params in self.comandos if sql.startswith(inicio)]
+
+
+class _Conexao:
+    def __init__(self, cursor):
+        self.cursor_ = cursor
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conexao(monkeypatch):
+    def criar(watermark, estados=None, abandonadas=()):
+        conn = _Conexao(_Cursor(watermark, estados or {}, abandonadas))
+        monkeypatch.setattr(ingestion_state, "get_db_connection", lambda: conn)
+        return conn
+    monkeypatch.setattr(ingestion_state, "_schema_verificado", True)
+    monkeypatch.setattr(ingestion_state, "JANELA_RETRY_DIAS", 10)
+    return criar
+
+
+def test_obter_datas_pendentes_abandona_datas_fora_da_janela(conexao):
+    # Janela de 10 dias: limite_retry = 10/03; a watermark parou em 05/03
+    conn = conexao(date(2025, 3, 5), estados={date(2025, 3, 12): "processada", date(2025, 3, 13): "erro"})
+
+    datas = obter_datas_pendentes("conta", hoje=HOJE)
+
+    esperadas = [date(2025, 3, 10), date(2025, 3, 11)] + [date(2025, 3, d) for d in range(13, 20)]
+    assert datas == [d.strftime("%d%m%Y") for d in esperadas]
+
+    cursor = conn.cursor_
+    [(process_name, status_erro, perdidas)] = cursor.comando("INSERT INTO ingestion_state")
+    assert process_name == "conta"
+    assert perdidas == [date(2025, 3, d) for d in range(6, 10)]
+    assert "janela de retry" in status_erro
+
+    # Watermark avança até a véspera da primeira pendente, passando pelas perdidas registradas
+    assert cursor.comando("UPDATE ingestion_watermark") == [(date(2025, 3, 9), "conta")]
+    assert conn.commits == 1
+
+
+def test_obter_datas_pendentes_sem_pendentes_avanca_ate_ontem(conexao):
+    estados = {date(2025, 3, 18): "processada", date(2025, 3, 19): "abandonada"}
+    conn = conexao(date(2025, 3, 17), estados=estados)
+
+    assert obter_datas_pendentes("conta", hoje=HOJE) == []
+    assert conn.cursor_.comando("INSERT INTO ingestion_state") == []
+    assert conn.cursor_.comando("UPDATE ingestion_watermark") == [(HOJE - timedelta(days=1), "conta")]
+
+
+def test_obter_datas_pendentes_primeira_execucao_semeia_estado(conexao, monkeypatch):
+    monkeypatch.setattr(ingestion_state, "JANELA_RETRY_DIAS", 31)
+    conn = conexao(None)
+
+    datas = obter_datas_pendentes("conta", hoje=HOJE)
+
+    # Watermark inicial no fim do mês anterior; o mês corrente fica pendente
+    assert datas[0] == "01032025" and datas[-1] == "19032025"
+    assert conn.cursor_.comando("INSERT INTO ingestion_watermark") == [("conta", date(2025, 2, 28))]
+    assert conn.cursor_.comando("INSERT INTO ingestion_state (process_name, data, status) SELECT DISTINCT")
+    assert conn.cursor_.comando("INSERT INTO ingestion_state (process_name, data, status, ultimo_erro)") == []
+
+
+def test_obter_datas_pendentes_desfaz_transacao_em_erro(conexao):
+    conn = conexao(date(2025, 3, 17))
+
+    def falhar(*args, **kwargs):
+        raise RuntimeError("conexão perdida")
+
+    conn.cursor_.fetchall = falhar
+    with pytest.raises(RuntimeError):
+        obter_datas_pendentes("conta", hoje=HOJE)
+    assert (conn.commits, conn.rollbacks) == (0, 1)
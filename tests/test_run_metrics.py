@@ -0,0 +1,88 @@
+"""Detecção de regressões de throughput (services/run_metrics.py)."""
+from datetime import date, datetime, timedelta
+
+from services.run_metrics import detectar_regressoes
+
+INICIO = datetime(2025, 3, 10)
+
+
+def _execucao(dia, linhas=1000, duracao_ms=10_000, status="sucesso", process_name="conta", replay=False,
+              duracoes=None):
+    """Execução registrada `dia` dias após INICIO (negativo: antes do período)."""
+    return {
+        "process_name": process_name, "replay": replay, "linhas": linhas, "duracao_ms": duracao_ms,
+        "status": status, "registrado_em": INICIO + timedelta(days=dia),
+        "data": date(2025, 3, 10) + timedelta(days=dia), "invocacao": f"inv-{dia}",
+        "duracoes": duracoes if duracoes is not None else {
+            "extrato_page": duracao_ms * 0.5, "classificacao": duracao_ms * 0.3, "inserir_no_banco": duracao_ms * 0.2,
+        },
+    }
+
+
+def _baseline(dias=5, **kwargs):
+    return [_execucao(-dia, **kwargs) for dia in range(dias, 0, -1)]
+
+
+def test_queda_de_throughput_acima_do_limiar_e_regressao():
+    # Baseline: 100 lanç/s; atual: 1000 linhas em 20 s = 50 lanç/s
+    lenta = _execucao(0, duracao_ms=20_000, duracoes={
+        "extrato_page": 16_000, "classificacao": 3_000, "inserir_no_banco": 1_000,
+    })
+    [avaliacao] = detectar_regressoes(_baseline() + [lenta], INICIO, limiar=0.3, min_baseline=5)
+
+    assert avaliacao["regressao"]
+    assert (avaliacao["throughput"], avaliacao["baseline"], avaliacao["variacao"]) == (50.0, 100.0, -0.5)
+    # Apenas a API ficou mais lenta por mil lançamentos
+    assert {grupo: e["mais_lento"] for grupo, e in avaliacao["estagios"].items()} == {
+        "api_bb": True, "classificador": False, "banco": False,
+    }
+
+
+def test_queda_dentro_do_limiar_nao_e_regressao():
+    [avaliacao] = detectar_regressoes(_baseline() + [_execucao(0, duracao_ms=12_500)], INICIO, limiar=0.3, min_baseline=5)
+    assert not avaliacao["regressao"]
+    assert avaliacao["variacao"] == -0.2
+
+
+def test_sem_baseline_suficiente_nao_ha_veredito():
+    [avaliacao] = detectar_regressoes(_baseline(dias=4) + [_execucao(0, duracao_ms=50_000)], INICIO, min_baseline=5)
+    assert (avaliacao["regressao"], avaliacao["baseline"], avaliacao["estagios"]) == (False, None, {})
+
+
+def test_execucoes_com_erro_ou_pouco_volume_nao_sao_comparadas():
+    historico = _baseline() + [
+        _execucao(-1, status="erro", duracao_ms=1),       # não entra na baseline
+        _execucao(-1, linhas=10, duracao_ms=100_000),     # idem (fim de semana)
+    ]
+    periodo = [_execucao(0, status="erro"), _execucao(1, linhas=10), _execucao(2)]
+
+    avaliacoes = detectar_regressoes(historico + periodo, INICIO, min_baseline=5)
+
+    assert [a["invocacao"] for a in avaliacoes] == ["inv-2"]
+    assert avaliacoes[0]["baseline"] == 100.0
+
+
+def test_baseline_separada_por_processo_e_replay():
+    outras = _baseline(process_name="outra", duracao_ms=1_000) + _baseline(replay=True, duracao_ms=1_000)
+    avaliacoes = detectar_regressoes(
+        _baseline() + outras + [_execucao(0), _execucao(0, replay=True)], INICIO, min_baseline=5
+    )
+    assert [(a["replay"], a["baseline"], a["regressao"]) for a in avaliacoes] == [
+        (False, 100.0, False), (True, 1000.0, True),
+    ]
+
+
+def test_baseline_usa_apenas_as_execucoes_mais_recentes():
+    # Cinco execuções antigas rápidas seguidas de cinco lentas: a janela de 5 vê só as lentas
+    historico = _baseline(dias=10, duracao_ms=5_000)[:5] + _baseline(dias=5, duracao_ms=20_000)
+    [avaliacao] = detectar_regressoes(historico + [_execucao(0, duracao_ms=20_000)], INICIO,
+                                      baseline=5, min_baseline=5)
+    assert (avaliacao["baseline"], avaliacao["regressao"]) == (50.0, False)
+
+
+def test_execucoes_do_periodo_entram_na_baseline_das_seguintes():
+    periodo = [_execucao(dia) for dia in range(5)] + [_execucao(5, duracao_ms=30_000)]
+    avaliacoes = detectar_regressoes(periodo, INICIO, min_baseline=5)
+
+    assert [a["baseline"] for a in avaliacoes] == [None] * 5 + [100.0]
+    assert avaliacoes[-1]["regressao"]
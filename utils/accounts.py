@@ -0,0 +1,101 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import List
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Arquivo JSON com as contas; sem ele, uma única conta é montada a partir do ambiente
+ACCOUNTS_CONFIG = os.getenv("ACCOUNTS_CONFIG")
+
+_PADRAO_VARIAVEL = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def _limpar_senha(valor):
+    # Tratar senha do certificado: remover espaços, quebras de linha e caracteres de controle
+    return (valor or "").strip().replace('\n', '').replace('\r', '')
+
+
+def _expandir(valor):
+    """Substitui ${VARIAVEL} pelo valor do ambiente (segredos ficam fora do arquivo)."""
+    if not isinstance(valor, str):
+        return valor
+    return _PADRAO_VARIAVEL.sub(lambda m: os.getenv(m.group(1), ""), valor)
+
+
+@dataclass(frozen=True)
+class Conta:
+    """Configuração de uma conta: credenciais, certificado e nome do processo."""
+
+    process_name: str
+    extrato_url: str
+    basic_auth: str
+    developer_application_key: str
+    token_url: str
+    scope: str
+    s3_bucket: str
+    s3_certificate_key: str
+    pfx_password: bytes
+
+    @classmethod
+    def from_dict(cls, dados):
+        """
+        Monta uma conta a partir de um dicionário do arquivo de configuração.
+        Campos ausentes usam as variáveis de ambiente da conta padrão.
+        """
+        padrao = conta_padrao()
+        valores = {chave: _expandir(valor) for chave, valor in dados.items()}
+        return cls(
+            process_name=valores["process_name"],
+            extrato_url=valores["extrato_url"],
+            basic_auth=valores.get("basic_auth", padrao.basic_auth),
+            developer_application_key=valores.get("developer_application_key", padrao.developer_application_key),
+            token_url=valores.get("token_url", padrao.token_url),
+            scope=valores.get("scope", padrao.scope),
+            s3_bucket=valores.get("s3_bucket", padrao.s3_bucket),
+            s3_certificate_key=valores.get("s3_certificate_key", padrao.s3_certificate_key),
+            pfx_password=_limpar_senha(valores["pfx_password"]).encode('utf-8')
+            if "pfx_password" in valores else padrao.pfx_password,
+        )
+
+
+def conta_padrao():
+    """Conta única configurada pelas variáveis de ambiente (comportamento original)."""
+    return Conta(
+        process_name=os.getenv('PROCESS_NAME'),
+        extrato_url=os.getenv('EXTRATO_URL'),
+        basic_auth=os.getenv('BASIC_AUTH'),
+        developer_application_key=os.getenv('DEVELOPER_APPLICATION_KEY'),
+        token_url=os.getenv('TOKEN_URL'),
+        scope=os.getenv('SCOPE'),
+        s3_bucket=os.getenv('S3_BUCKET'),
+        s3_certificate_key=os.getenv('S3_CERTIFICATE_KEY'),
+        pfx_password=_limpar_senha(os.getenv('PFX_PASSWORD')).encode('utf-8'),
+    )
+
+
+def carregar_contas(caminho=None) -> List[Conta]:
+    """
+    Carrega as contas do arquivo de configuração (lista JSON em "contas").
+
+    Args:
+        caminho: Caminho do arquivo (padrão: variável ACCOUNTS_CONFIG)
+
+    Returns:
+        list: Contas configuradas; apenas a conta padrão se não houver arquivo
+    """
+    caminho = caminho or ACCOUNTS_CONFIG
+    if not caminho:
+        return [conta_padrao()]
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    contas = [Conta.from_dict(dados) for dados in config["contas"]]
+    nomes = [conta.process_name for conta in contas]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError(f"process_name repetido no arquivo de contas: {nomes}")
+    return contas
@@ -0,0 +1,115 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Folga antes do fim da invocação: cobre a escrita de status, métricas e logs
+DEADLINE_SAFETY_MARGIN_MS = int(os.getenv("DEADLINE_SAFETY_MARGIN_MS", "30000"))
+# Custo assumido por data quando ainda não há histórico de execuções
+DEFAULT_DATE_COST_MS = int(os.getenv("DEFAULT_DATE_COST_MS", "60000"))
+
+# Prazo em vigor no contexto atual (uma data em processamento), consultado
+# por quem não o recebe como argumento (ex: esperas entre retentativas HTTP)
+_prazo_atual: contextvars.ContextVar[Optional["Prazo"]] = contextvars.ContextVar(
+    "prazo_atual", default=None
+)
+
+
+class Prazo:
+    """
+    Orçamento de tempo de uma invocação. Antes de iniciar uma data, verifica
+    se o custo estimado cabe no tempo restante menos a folga de segurança;
+    uma data nunca é iniciada se puder ser interrompida no meio.
+    """
+
+    def __init__(self, restante_ms, margem_ms=DEADLINE_SAFETY_MARGIN_MS):
+        """
+        Args:
+            restante_ms: Função sem argumentos que retorna o tempo restante em ms
+            margem_ms: Folga mantida até o fim da invocação
+        """
+        self._restante_ms = restante_ms
+        self.margem_ms = margem_ms
+        self._iniciado = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_contexto(cls, context, margem_ms=DEADLINE_SAFETY_MARGIN_MS):
+        """Prazo a partir do context da Lambda, ou None fora da Lambda."""
+        if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+            return None
+        return cls(context.get_remaining_time_in_millis, margem_ms)
+
+    @classmethod
+    def em_ms(cls, duracao_ms, margem_ms=DEADLINE_SAFETY_MARGIN_MS):
+        """Prazo de duração fixa a partir de agora (execução local)."""
+        fim = time.monotonic() + duracao_ms / 1000
+        return cls(lambda: int((fim - time.monotonic()) * 1000), margem_ms)
+
+    def restante_ms(self):
+        return self._restante_ms()
+
+    def cabe(self, custo_ms):
+        """Indica se uma tarefa de custo estimado `custo_ms` termina antes do prazo."""
+        return self.restante_ms() - self.margem_ms >= custo_ms
+
+    def pode_iniciar(self, custo_ms):
+        """
+        Indica se uma data pode ser iniciada. A primeira da invocação (entre
+        todas as contas e threads) sempre é iniciada: ocorre com todo o
+        orçamento disponível, e adiá-la nunca permitiria progresso. As demais
+        só se couberem no tempo restante (ver cabe).
+        """
+        with self._lock:
+            if not self._iniciado:
+                self._iniciado = True
+                return True
+        return self.cabe(custo_ms)
+
+
+def prazo_atual() -> Optional[Prazo]:
+    """Retorna o prazo em vigor no contexto atual, ou None."""
+    return _prazo_atual.get()
+
+
+@contextmanager
+def prazo_vigente(prazo):
+    """
+    Torna `prazo` o prazo do contexto atual enquanto o bloco executa
+    (threads criadas com contextvars.copy_context o herdam).
+    """
+    token = _prazo_atual.set(prazo)
+    try:
+        yield prazo
+    finally:
+        _prazo_atual.reset(token)
+
+
+def priorizar_datas(datas, hoje=None):
+    """
+    Ordena as datas para execução: ontem primeiro (dado mais esperado) e
+    depois as demais da mais antiga para a mais recente, para que falhas
+    antigas não saiam da janela de retry.
+
+    Args:
+        datas: Datas 'DDMMYYYY'
+        hoje: Data de referência (padrão: hoje)
+
+    Returns:
+        list: Datas na ordem de execução
+    """
+    hoje = hoje or datetime.now().date()
+    ontem = (hoje - timedelta(days=1)).strftime('%d%m%Y')
+
+    def chave(data):
+        dia = datetime.strptime(data.zfill(8), '%d%m%Y').date()
+        return (data.zfill(8) != ontem, dia)
+
+    return sorted(datas, key=chave)
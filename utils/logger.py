@@ -1,6 +1,148 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
-from typing import Optional
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Formato de saída: "text" (padrão) ou "json" (estruturado, um objeto por linha)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Quando ativo, a escrita no stdout acontece em uma thread de background
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() not in ("0", "false", "no")
+
+# Atributos padrão de LogRecord, excluídos dos campos extras no JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON, incluindo campos passados via `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        documento = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for chave, valor in record.__dict__.items():
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith("_"):
+                documento[chave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            documento["exception"] = record.exc_text
+        return json.dumps(documento, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar apenas uma fração dos registros abaixo de WARNING."""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.sample_rate >= 1.0:
+            return True
+        return random.random() < self.sample_rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita a quantidade de registros abaixo de WARNING por segundo (token bucket)."""
+
+    def __init__(self, max_per_second: float):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self._tokens = max_per_second
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.max_per_second, self._tokens + (agora - self._ultimo) * self.max_per_second)
+            self._ultimo = agora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo: a interpolação da mensagem e a
+    serialização acontecem na thread do listener, fora do caminho crítico.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Tracebacks são convertidos aqui pois dependem do estado da thread atual
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _DispatchHandler(logging.Handler):
+    """Escreve no stdout usando o formatter registrado para o logger de origem."""
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            formatter = _formatters.get(record.name) or logging.Formatter()
+            self.stream.write(formatter.format(record) + "\n")
+            self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+_formatters: Dict[str, logging.Formatter] = {}
+_log_queue: Optional[queue.Queue] = None
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _get_log_queue() -> queue.Queue:
+    """Inicia (uma única vez) o listener compartilhado que escreve no stdout."""
+    global _log_queue, _listener
+    with _listener_lock:
+        if _listener is None:
+            _log_queue = queue.Queue(-1)
+            _listener = QueueListener(_log_queue, _DispatchHandler(sys.stdout))
+            _listener.start()
+            atexit.register(stop_logging)
+    return _log_queue
+
+
+def flush_logs(timeout: float = 5.0):
+    """
+    Aguarda a thread de background escrever todos os registros pendentes.
+    Deve ser chamado antes do retorno da Lambda, que congela o container.
+    """
+    if _log_queue is None:
+        return
+    limite = time.monotonic() + timeout
+    while _log_queue.unfinished_tasks and time.monotonic() < limite:
+        time.sleep(0.005)
+
+
+def stop_logging():
+    """Esvazia a fila e encerra a thread de background."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
 
 
 def setup_logger(
@@ -8,6 +150,10 @@ def setup_logger(
     level: int = logging.INFO,
     format_str: Optional[str] = None,
     log_file: Optional[str] = None,  # Ignorado - apenas para compatibilidade
+    json_format: Optional[bool] = None,
+    async_output: Optional[bool] = None,
+    sample_rate: float = 1.0,
+    rate_limit: Optional[float] = None,
 ) -> logging.Logger:
     """
     Set up and configure a logger com output apenas para console (CloudWatch).
@@ -17,26 +163,45 @@ def setup_logger(
         level: The logging level (default: INFO)
         format_str: Optional custom format string
         log_file: Ignorado (mantido para compatibilidade)
+        json_format: Saída em JSON estruturado (padrão: variável LOG_FORMAT)
+        async_output: Escrita via fila em thread de background (padrão: variável LOG_ASYNC)
+        sample_rate: Fração dos registros abaixo de WARNING mantidos (1.0 = todos)
+        rate_limit: Máximo de registros abaixo de WARNING por segundo (None = sem limite)
 
     Returns:
         A configured logger instance
     """
     if format_str is None:
         format_str = "%(asctime)s - %(name)s - [%(levelname)s] - %(message)s"
+    if json_format is None:
+        json_format = LOG_FORMAT == "json"
+    if async_output is None:
+        async_output = LOG_ASYNC
 
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
     # Avoid adding handlers if they already exist
     if not logger.handlers:
-        # Console handler apenas (CloudWatch)
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(logging.Formatter(format_str))
-        logger.addHandler(console_handler)
+        formatter = JsonFormatter() if json_format else logging.Formatter(format_str)
+
+        if async_output:
+            _formatters[name] = formatter
+            logger.addHandler(_LazyQueueHandler(_get_log_queue()))
+        else:
+            # Console handler apenas (CloudWatch)
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(formatter)
+            logger.addHandler(console_handler)
+
+        if sample_rate < 1.0:
+            logger.addFilter(SamplingFilter(sample_rate))
+        if rate_limit is not None:
+            logger.addFilter(RateLimitFilter(rate_limit))
 
     logger.propagate = False
     return logger
 
 
 # Create a default app_logger instance that can be imported by other modules
-app_logger = setup_logger("app") 
\ No newline at end of file
+app_logger = setup_logger("app")
@@ -0,0 +1,152 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Namespace das métricas no CloudWatch
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "BBIntegration")
+# Permite desligar a emissão (ex: execução local) sem remover a instrumentação
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Coletor ativo no contexto atual (uma data em processamento)
+_coletor_atual: contextvars.ContextVar[Optional["MetricsCollector"]] = contextvars.ContextVar(
+    "coletor_metricas", default=None
+)
+
+
+class MetricsCollector:
+    """
+    Acumula durações e contadores de uma execução e os serializa no
+    CloudWatch Embedded Metric Format (EMF).
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE, dimensions: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            namespace: Namespace das métricas no CloudWatch
+            dimensions: Dimensões fixas das métricas (ex: {"ProcessName": "extrato_bb"})
+        """
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self.durations: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.properties: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def add_duration(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + elapsed_ms
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_property(self, name: str, value):
+        self.properties[name] = value
+
+    @contextmanager
+    def timer(self, stage: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_duration(stage, (time.perf_counter() - inicio) * 1000)
+
+    def to_emf(self) -> dict:
+        """
+        Monta o documento EMF com as durações (ms) e contadores acumulados.
+
+        Returns:
+            dict: Documento pronto para ser serializado em uma linha de log
+        """
+        with self._lock:
+            durations = dict(self.durations)
+            counters = dict(self.counters)
+
+        metric_defs = [{"Name": f"{stage}_ms", "Unit": "Milliseconds"} for stage in durations]
+        metric_defs += [{"Name": name, "Unit": "Count"} for name in counters]
+
+        documento = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [list(self.dimensions.keys())],
+                    "Metrics": metric_defs,
+                }],
+            },
+        }
+        documento.update(self.properties)
+        documento.update(self.dimensions)
+        documento.update({f"{stage}_ms": round(ms, 3) for stage, ms in durations.items()})
+        documento.update(counters)
+        return documento
+
+    def emit(self, stream=None):
+        """Escreve o documento EMF como uma única linha JSON no stdout (CloudWatch)."""
+        if not METRICS_ENABLED:
+            return
+        stream = stream or sys.stdout
+        stream.write(json.dumps(self.to_emf(), ensure_ascii=False, default=str) + "\n")
+        stream.flush()
+
+
+def coletor_atual() -> Optional[MetricsCollector]:
+    """Retorna o coletor ativo no contexto atual, ou None."""
+    return _coletor_atual.get()
+
+
+@contextmanager
+def coletar_metricas(process_name: str, data: str, ao_finalizar=None, **properties):
+    """
+    Ativa um coletor para o processamento de uma data e emite as métricas
+    em EMF ao final, mesmo em caso de erro.
+
+    Args:
+        process_name: Nome do processo (dimensão das métricas)
+        data: Data em processamento (propriedade, não dimensão, para evitar cardinalidade alta)
+        ao_finalizar: Função chamada com o coletor completo antes da emissão
+            (ex: services.run_metrics.registrar); deve tratar as próprias falhas
+        **properties: Propriedades adicionais incluídas no documento EMF
+    """
+    coletor = MetricsCollector(dimensions={"ProcessName": process_name or "desconhecido"})
+    coletor.set_property("Data", data)
+    for nome, valor in properties.items():
+        coletor.set_property(nome, valor)
+
+    token = _coletor_atual.set(coletor)
+    inicio = time.perf_counter()
+    coletor.set_property("Status", "sucesso")
+    try:
+        yield coletor
+    except BaseException:
+        coletor.set_property("Status", "erro")
+        raise
+    finally:
+        coletor.add_duration("processar_data", (time.perf_counter() - inicio) * 1000)
+        _coletor_atual.reset(token)
+        if ao_finalizar is not None:
+            ao_finalizar(coletor)
+        coletor.emit()
+
+
+@contextmanager
+def timer(stage: str):
+    """Mede a duração de um estágio no coletor ativo; não faz nada se não houver coletor."""
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        yield
+        return
+    with coletor.timer(stage):
+        yield
+
+
+def incr(name: str, value: float = 1):
+    """Incrementa um contador no coletor ativo, se houver."""
+    coletor = _coletor_atual.get()
+    if coletor is not None:
+        coletor.incr(name, value)
@@ -0,0 +1,211 @@
+import contextvars
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# cProfile, pstats e tracemalloc são importados apenas ao perfilar (cold start)
+
+# Configurar o logger específico para este módulo
+logger = setup_logger(
+    "profiling",
+    log_file="logs/profiling.log"
+)
+
+# Data a perfilar em cada execução: 'DDMMYYYY', 'primeira' (a primeira data
+# iniciada) ou vazio (desligado). O evento da Lambda pode sobrepor ('profile').
+PROFILE_DATE = os.getenv("PROFILE_DATE", "")
+# Destino dos arquivos: diretório local (sempre) e, opcionalmente, S3
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_S3_BUCKET = os.getenv("PROFILE_S3_BUCKET")
+PROFILE_S3_PREFIX = os.getenv("PROFILE_S3_PREFIX", "profiles")
+# Linhas do relatório (funções e alocações)
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))
+# Quadros guardados por alocação no tracemalloc
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "5"))
+
+# Sessão ativa no contexto atual (threads do pipeline herdam pela cópia do contexto)
+_sessao_atual: contextvars.ContextVar[Optional["SessaoPerfil"]] = contextvars.ContextVar(
+    "sessao_perfil", default=None
+)
+
+# Pedido de perfil da execução atual: no máximo uma data é perfilada
+_pedido = None
+_pedido_lock = threading.Lock()
+
+
+def solicitar(alvo=None):
+    """
+    Arma o perfil de uma data para a execução atual.
+
+    Args:
+        alvo: 'DDMMYYYY', 'primeira'/True (a primeira data iniciada) ou
+            None para usar PROFILE_DATE; vazio/False desarma
+    """
+    global _pedido
+    if alvo is None:
+        alvo = PROFILE_DATE
+    if not alvo:
+        alvo = None
+    elif alvo is True or alvo == "primeira":
+        alvo = "primeira"
+    else:
+        alvo = str(alvo).lstrip("0")
+    with _pedido_lock:
+        _pedido = alvo
+    if _pedido:
+        logger.info(f"Perfil solicitado para a data: {_pedido}")
+
+
+def reservar(data):
+    """Indica se `data` deve ser perfilada; a reserva consome o pedido."""
+    global _pedido
+    with _pedido_lock:
+        if _pedido and (_pedido == "primeira" or _pedido == data.lstrip("0")):
+            _pedido = None
+            return True
+    return False
+
+
+class SessaoPerfil:
+    """
+    Perfil de CPU (cProfile, uma instância por thread, combinadas ao final)
+    e de memória (tracemalloc: pico e maiores alocações) de um trecho.
+    """
+
+    def __init__(self, nome, diretorio=PROFILE_DIR, top=PROFILE_TOP):
+        self.nome = nome
+        self.diretorio = diretorio
+        self.top = top
+        self.arquivos = {}
+        self._perfis = []
+        self._lock = threading.Lock()
+        self._tracemalloc_proprio = False
+
+    def _novo_perfil(self):
+        import cProfile
+
+        perfil = cProfile.Profile()
+        with self._lock:
+            self._perfis.append(perfil)
+        return perfil
+
+    def instrumentar(self, funcao):
+        """Envolve `funcao` para ser perfilada na thread em que for executada."""
+        def executar(*args, **kwargs):
+            perfil = self._novo_perfil()
+            perfil.enable()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                perfil.disable()
+        return executar
+
+    def iniciar(self):
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self._tracemalloc_proprio = True
+        tracemalloc.reset_peak()
+        self._inicio = time.perf_counter()
+
+    def finalizar(self):
+        import pstats
+        import tracemalloc
+
+        duracao = time.perf_counter() - self._inicio
+        snapshot = tracemalloc.take_snapshot()
+        atual, pico = tracemalloc.get_traced_memory()
+        if self._tracemalloc_proprio:
+            tracemalloc.stop()
+
+        with self._lock:
+            perfis = list(self._perfis)
+        estatisticas = None
+        for perfil in perfis:
+            if estatisticas is None:
+                estatisticas = pstats.Stats(perfil)
+            else:
+                estatisticas.add(perfil)
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        base = os.path.join(self.diretorio, f"{self.nome}_{datetime.now().strftime('%Y%m%dT%H%M%S')}")
+        relatorio = io.StringIO()
+        relatorio.write(f"Perfil: {self.nome}\nDuração: {duracao:.3f} s\nThreads perfiladas: {len(perfis)}\n")
+        relatorio.write(f"Memória rastreada: atual {atual / 1024 / 1024:.1f} MB, pico {pico / 1024 / 1024:.1f} MB\n\n")
+
+        if estatisticas is not None:
+            estatisticas.dump_stats(f"{base}.prof")
+            self.arquivos["perfil"] = f"{base}.prof"
+            for ordem in ("cumulative", "tottime"):
+                relatorio.write(f"=== Funções por {ordem} ===\n")
+                pstats.Stats(f"{base}.prof", stream=relatorio).sort_stats(ordem).print_stats(self.top)
+
+        relatorio.write("=== Maiores alocações (por linha) ===\n")
+        filtro = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        for stat in snapshot.filter_traces(filtro).statistics("lineno")[:self.top]:
+            relatorio.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocos  {stat.traceback}\n")
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(relatorio.getvalue())
+        self.arquivos["relatorio"] = f"{base}.txt"
+        self._enviar_s3()
+        logger.info(f"Perfil de '{self.nome}' gravado em {self.arquivos}")
+
+    def _enviar_s3(self):
+        if not PROFILE_S3_BUCKET:
+            return
+        try:
+            from handlers.aws_handler import S3Handler
+            s3 = S3Handler(region_name=os.getenv("AWS_REGION", "us-east-1"))
+            for tipo in ("perfil", "relatorio"):
+                if tipo not in self.arquivos:
+                    continue
+                caminho = self.arquivos[tipo]
+                chave = f"{PROFILE_S3_PREFIX.strip('/')}/{os.path.basename(caminho)}"
+                with open(caminho, "rb") as f:
+                    s3.upload_bytes(PROFILE_S3_BUCKET, chave, f.read(),
+                                    content_type="text/plain" if tipo == "relatorio" else "application/octet-stream")
+                self.arquivos[f"{tipo}_s3"] = f"s3://{PROFILE_S3_BUCKET}/{chave}"
+        except Exception as e:
+            # O perfil local continua disponível
+            logger.error(f"Erro ao enviar o perfil para o S3: {e}", exc_info=True)
+
+
+@contextmanager
+def perfilar(nome):
+    """
+    Perfila o trecho (e as threads iniciadas com perfilar_thread dentro dele).
+
+    Yields:
+        SessaoPerfil: arquivos gravados ficam em `sessao.arquivos` ao final
+    """
+    sessao = SessaoPerfil(nome)
+    token = _sessao_atual.set(sessao)
+    perfil = sessao._novo_perfil()
+    sessao.iniciar()
+    perfil.enable()
+    try:
+        yield sessao
+    finally:
+        perfil.disable()
+        _sessao_atual.reset(token)
+        try:
+            sessao.finalizar()
+        except Exception as e:
+            logger.error(f"Erro ao gravar o perfil de '{nome}': {e}", exc_info=True)
+
+
+def perfilar_thread(funcao):
+    """`funcao` instrumentada se houver uma sessão ativa no contexto; senão, inalterada."""
+    sessao = _sessao_atual.get()
+    return funcao if sessao is None else sessao.instrumentar(funcao)